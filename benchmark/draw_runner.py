@@ -0,0 +1,79 @@
+"""End-to-end throughput of `DrawRunner` checking all the tickets of an in-memory repository against two
+results, in the current process and with pools of growing size, and the time every worker takes to set up its
+checker, building its tables or attaching to the ones shared by the parent process.
+
+Run it from the root of the repository with `python -m benchmark.draw_runner`.
+"""
+
+import os
+import random
+import time
+
+from benchmark import fake_table
+from cuponazo.application import draw_runner, ticket_checker
+from cuponazo.domain import ticket
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+USERS = 20_000
+TICKETS_PER_USER = 50
+REPEAT = 5
+
+
+def build_repository() -> dynamodb.TicketRepository:
+    rnd = random.Random(42)
+    table = fake_table.InMemoryTable()
+    for i in range(USERS):
+        table.put_item(
+            Item={
+                "Id": f"user-{i}",
+                "TicketList": [
+                    f"{rnd.randrange(100_000_000):08d}" for _ in range(TICKETS_PER_USER)
+                ],
+            }
+        )
+    return dynamodb.TicketRepository(table)
+
+
+def worker_setup(results: list[ticket.Cuponazo]) -> None:
+    parent = ticket_checker.MultiResultChecker(results)
+    shm = parent.share_profile_table()
+    try:
+        setups = {
+            "building": lambda: ticket_checker.MultiResultChecker(results),
+            "attaching": lambda: ticket_checker.MultiResultChecker(
+                results, profile_table=shm.buf, profiles=parent.profiles
+            ),
+        }
+        for name, setup in setups.items():
+            seconds = []
+            for _ in range(REPEAT):
+                start = time.perf_counter()
+                checker = setup()
+                checker.count_prizes(results[:1])
+                seconds.append(time.perf_counter() - start)
+                del checker
+
+            print(f"{name:>9} tables {min(seconds) * 1000:>10,.2f} ms/worker")
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def main() -> None:
+    repo = build_repository()
+    results = [ticket.Cuponazo("12345", "321"), ticket.Cuponazo("54321", "123")]
+
+    worker_setup(results)
+
+    for workers in sorted({0, 1, 2, os.cpu_count() or 1}):
+        runner = draw_runner.DrawRunner(repo, results, workers=workers, page_size=100)
+
+        start = time.perf_counter()
+        checked = sum(summary.tickets for summary in runner.run())
+        elapsed = time.perf_counter() - start
+
+        print(f"{workers:>3} workers {checked / elapsed:>12,.0f} tickets/s")
+
+
+if __name__ == "__main__":
+    main()
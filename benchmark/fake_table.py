@@ -0,0 +1,413 @@
+import collections
+import copy
+import itertools
+import operator
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Callable
+
+comparisons = {
+    "=": operator.eq,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class InMemoryTable:
+    """In-memory stand-in of `dynamodb.DynDBTableWrapper`, keeping the items in a dict keyed by their `Id`. It
+    allows to test and benchmark the DynamoDB repositories without a real table.
+
+    `update_item` and the `ConditionExpression` of `put_item`/`update_item` understand the subset of DynamoDB
+    expressions used by the repositories: `SET` (plain values, `list_append` and `if_not_exists`), `ADD` and
+    `REMOVE` actions, and `attribute_exists`, `attribute_not_exists` and comparisons (also on `size(...)`)
+    joined with `AND`/`OR` as conditions.
+
+    Parameters
+    ----------
+    `name` (`str`)
+        Name of the table.
+
+    `max_batch_processed` (`int | None`)
+        If set, batch requests only process this amount of keys/items and return the rest as unprocessed, like
+        DynamoDB does when a batch exceeds the provisioned throughput.
+    """
+
+    max_batch_get_keys = 100
+    max_batch_write_items = 25
+
+    def __init__(
+        self, name: str = "in-memory", max_batch_processed: int = None
+    ) -> None:
+        self.name = name
+        self.max_batch_processed = max_batch_processed
+        self.items: dict[str, dict] = {}
+        self.calls = collections.Counter()
+        self.__lock = threading.Lock()
+
+    def get_item(self, Key: dict) -> dict:
+        with self.__lock:
+            self.calls["get_item"] += 1
+            item = self.items.get(Key["Id"])
+            return {} if item is None else {"Item": copy.deepcopy(item)}
+
+    def put_item(
+        self,
+        Item: dict,
+        ConditionExpression: str = None,
+        ExpressionAttributeValues: dict = None,
+    ) -> dict:
+        with self.__lock:
+            self.calls["put_item"] += 1
+            self.__check_condition(
+                self.items.get(Item["Id"]),
+                ConditionExpression,
+                ExpressionAttributeValues,
+            )
+            self.items[Item["Id"]] = copy.deepcopy(Item)
+            return {}
+
+    def update_item(
+        self,
+        Key: dict,
+        UpdateExpression: str,
+        ExpressionAttributeValues: dict = None,
+        ConditionExpression: str = None,
+        ReturnValues: str = "NONE",
+    ) -> dict:
+        values = copy.deepcopy(ExpressionAttributeValues or {})
+        with self.__lock:
+            self.calls["update_item"] += 1
+            self.__check_condition(
+                self.items.get(Key["Id"]), ConditionExpression, values
+            )
+
+            item = self.items.setdefault(Key["Id"], dict(Key))
+            updated = self.__apply_update(item, UpdateExpression, values)
+
+            if ReturnValues == "ALL_NEW":
+                return {"Attributes": copy.deepcopy(item)}
+            if ReturnValues == "UPDATED_NEW":
+                return {
+                    "Attributes": {
+                        a: copy.deepcopy(item[a]) for a in updated if a in item
+                    }
+                }
+            return {}
+
+    def scan(
+        self,
+        Limit: int = None,
+        ExclusiveStartKey: dict = None,
+        ProjectionExpression: str = None,
+        Segment: int = 0,
+        TotalSegments: int = 1,
+    ) -> dict:
+        with self.__lock:
+            self.calls["scan"] += 1
+            ids = [
+                item_id
+                for item_id in self.items
+                if zlib.crc32(item_id.encode()) % TotalSegments == Segment
+            ]
+
+        return self.__page(ids, Limit, ExclusiveStartKey, ProjectionExpression)
+
+    def query(
+        self,
+        KeyConditionExpression: str,
+        ExpressionAttributeValues: dict,
+        IndexName: str = None,
+        Limit: int = None,
+        ExclusiveStartKey: dict = None,
+        ProjectionExpression: str = None,
+    ) -> dict:
+        """Only supports equality conditions (`"<attribute> = :value"`) on a single attribute, and it doesn't
+        check that there's an index on it.
+        """
+        attribute, value = [a.strip() for a in KeyConditionExpression.split("=")]
+        with self.__lock:
+            self.calls["query"] += 1
+            ids = [
+                item_id
+                for item_id, item in self.items.items()
+                if item.get(attribute) == ExpressionAttributeValues[value]
+            ]
+
+        return self.__page(ids, Limit, ExclusiveStartKey, ProjectionExpression)
+
+    def batch_get_item(self, keys: list[dict]) -> dict:
+        if len(keys) > self.max_batch_get_keys:
+            raise ValueError(f"Too many keys in a BatchGetItem request: {len(keys)}")
+
+        processed, unprocessed = self.__split_batch(keys)
+        with self.__lock:
+            self.calls["batch_get_item"] += 1
+            items = [
+                copy.deepcopy(self.items[key["Id"]])
+                for key in processed
+                if key["Id"] in self.items
+            ]
+
+        response = {"Responses": {self.name: items}, "UnprocessedKeys": {}}
+        if unprocessed:
+            response["UnprocessedKeys"][self.name] = {"Keys": unprocessed}
+        return response
+
+    def batch_write_item(self, items: list[dict], delete_keys: list[dict] = ()) -> dict:
+        requests = [{"PutRequest": {"Item": item}} for item in items] + [
+            {"DeleteRequest": {"Key": key}} for key in delete_keys
+        ]
+        if len(requests) > self.max_batch_write_items:
+            raise ValueError(
+                f"Too many items in a BatchWriteItem request: {len(requests)}"
+            )
+
+        processed, unprocessed = self.__split_batch(requests)
+        with self.__lock:
+            self.calls["batch_write_item"] += 1
+            for request in processed:
+                if "PutRequest" in request:
+                    item = request["PutRequest"]["Item"]
+                    self.items[item["Id"]] = copy.deepcopy(item)
+                else:
+                    self.items.pop(request["DeleteRequest"]["Key"]["Id"], None)
+
+        response = {"UnprocessedItems": {}}
+        if unprocessed:
+            response["UnprocessedItems"][self.name] = unprocessed
+        return response
+
+    def __page(
+        self,
+        ids: list[str],
+        limit: int | None,
+        exclusive_start_key: dict | None,
+        projection: str | None,
+    ) -> dict:
+        if exclusive_start_key is not None:
+            ids = itertools.dropwhile(
+                lambda item_id: item_id != exclusive_start_key["Id"], ids
+            )
+            next(ids, None)
+        ids = list(itertools.islice(ids, limit))
+
+        with self.__lock:
+            if projection is None:
+                items = [copy.deepcopy(self.items[item_id]) for item_id in ids]
+            else:
+                attributes = [a.strip() for a in projection.split(",")]
+                items = [
+                    {
+                        a: copy.deepcopy(self.items[item_id][a])
+                        for a in attributes
+                        if a in self.items[item_id]
+                    }
+                    for item_id in ids
+                ]
+
+        response = {"Items": items, "Count": len(items)}
+        if limit is not None and len(ids) == limit:
+            response["LastEvaluatedKey"] = {"Id": ids[-1]}
+        return response
+
+    def __apply_update(self, item: dict, expression: str, values: dict) -> list[str]:
+        updated = []
+        for clause, actions in re.findall(
+            r"(SET|ADD|REMOVE)\s+(.*?)(?=\s+(?:SET|ADD|REMOVE)\s|$)", expression
+        ):
+            for action in re.split(r",\s*(?![^()]*\))", actions):
+                if clause == "SET":
+                    attribute, value = [a.strip() for a in action.split("=", 1)]
+                    appended = re.fullmatch(
+                        rf"list_append\(if_not_exists\({attribute}, :\w+\), (:\w+)\)",
+                        value,
+                    )
+                    if appended and attribute in item:
+                        # Appending to the attribute itself, no need to copy the list
+                        item[attribute].extend(values[appended.group(1)])
+                    else:
+                        item[attribute] = self.__eval_value(item, value, values)
+                elif clause == "ADD":
+                    attribute, value = action.split()
+                    item[attribute] = item.get(attribute, 0) + values[value]
+                else:
+                    attribute = action.strip()
+                    item.pop(attribute, None)
+                updated.append(attribute)
+
+        return updated
+
+    def __eval_value(self, item: dict, expression: str, values: dict):
+        expression = expression.strip()
+        if expression.startswith(":"):
+            return values[expression]
+
+        function, args = re.fullmatch(r"(\w+)\((.*)\)", expression).groups()
+        first, second = re.split(r",\s*(?![^()]*\))", args)
+        if function == "if_not_exists":
+            return (
+                item[first]
+                if first in item
+                else self.__eval_value(item, second, values)
+            )
+        if function == "list_append":
+            return self.__eval_value(item, first, values) + self.__eval_value(
+                item, second, values
+            )
+        raise ValueError(f"Unsupported function in update expression: {function}")
+
+    def __check_condition(self, item: dict, condition: str, values: dict) -> None:
+        if condition is None:
+            return
+
+        item = item or {}
+        if not any(
+            all(
+                self.__eval_condition(item, c, values)
+                for c in alternative.split(" AND ")
+            )
+            for alternative in condition.split(" OR ")
+        ):
+            from botocore.exceptions import ClientError
+
+            raise ClientError(
+                operation_name="ConditionalCheck",
+                error_response={
+                    "Error": {
+                        "Code": "ConditionalCheckFailedException",
+                        "Message": "The conditional request failed",
+                    }
+                },
+            )
+
+    def __eval_condition(self, item: dict, condition: str, values: dict) -> bool:
+        condition = condition.strip()
+        match = re.fullmatch(r"attribute_(not_)?exists\((\w+)\)", condition)
+        if match:
+            return (match.group(2) in item) != bool(match.group(1))
+
+        operand, comparison, value = re.fullmatch(
+            r"(.+?)\s*(<>|<=|>=|=|<|>)\s*(:\w+)", condition
+        ).groups()
+        size = re.fullmatch(r"size\((\w+)\)", operand)
+        if size:
+            if size.group(1) not in item:
+                return False
+            current = len(item[size.group(1)])
+        elif operand in item:
+            current = item[operand]
+        else:
+            return False
+
+        return comparisons[comparison](current, values[value])
+
+    def __split_batch(self, requests: list) -> tuple[list, list]:
+        if self.max_batch_processed is None:
+            return requests, []
+        return (
+            requests[: self.max_batch_processed],
+            requests[self.max_batch_processed :],
+        )
+
+
+class ThrottlingTable:
+    """Wrapper of a table (like `InMemoryTable`) failing some of its requests with throttling errors and
+    delaying them, to test how the repositories cope with an overloaded DynamoDB.
+
+    Parameters
+    ----------
+    `table` (`InMemoryTable`)
+
+    `throttle_rate` (`float`)
+        Probability of every request to be throttled.
+
+    `latency` (`Callable[[str], float] | None`)
+        Returns the seconds to delay a request of the given operation.
+
+    `code` (`str`)
+        Error code of the throttled requests.
+
+    `seed` (`int`)
+        Seed of the random throttling, so tests are reproducible.
+    """
+
+    def __init__(
+        self,
+        table: InMemoryTable,
+        throttle_rate: float = 0.0,
+        latency: Callable[[str], float] | None = None,
+        code: str = "ProvisionedThroughputExceededException",
+        seed: int = 0,
+    ) -> None:
+        self.table = table
+        self.throttle_rate = throttle_rate
+        self.latency = latency
+        self.code = code
+        self.throttled = collections.Counter()
+        self.__random = random.Random(seed)
+        self.__forced = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.table.name
+
+    def throttle_next(self, requests: int) -> None:
+        """Throttles the next `requests` requests, whatever the `throttle_rate`."""
+        with self.__lock:
+            self.__forced += requests
+
+    def get_item(self, *args, **kwargs) -> dict:
+        self.__maybe_throttle("get_item")
+        return self.table.get_item(*args, **kwargs)
+
+    def put_item(self, *args, **kwargs) -> dict:
+        self.__maybe_throttle("put_item")
+        return self.table.put_item(*args, **kwargs)
+
+    def update_item(self, *args, **kwargs) -> dict:
+        self.__maybe_throttle("update_item")
+        return self.table.update_item(*args, **kwargs)
+
+    def scan(self, *args, **kwargs) -> dict:
+        self.__maybe_throttle("scan")
+        return self.table.scan(*args, **kwargs)
+
+    def query(self, *args, **kwargs) -> dict:
+        self.__maybe_throttle("query")
+        return self.table.query(*args, **kwargs)
+
+    def batch_get_item(self, keys: list[dict]) -> dict:
+        self.__maybe_throttle("batch_get_item")
+        return self.table.batch_get_item(keys)
+
+    def batch_write_item(self, items: list[dict], delete_keys: list[dict] = ()) -> dict:
+        self.__maybe_throttle("batch_write_item")
+        return self.table.batch_write_item(items, delete_keys)
+
+    def __maybe_throttle(self, operation: str) -> None:
+        if self.latency is not None:
+            time.sleep(self.latency(operation))
+
+        with self.__lock:
+            throttle = self.__forced > 0 or self.__random.random() < self.throttle_rate
+            self.__forced = max(0, self.__forced - 1)
+            if throttle:
+                self.throttled[operation] += 1
+        if not throttle:
+            return
+
+        from botocore.exceptions import ClientError
+
+        raise ClientError(
+            operation_name=operation,
+            error_response={
+                "Error": {"Code": self.code, "Message": "Rate of requests exceeded"}
+            },
+        )
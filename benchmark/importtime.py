@@ -0,0 +1,176 @@
+"""Measures the import time of the modules used by the check job, with `python -X importtime`, and its cold
+start: the time a new interpreter takes to import them and build a checker, a fetcher and a repository on a
+boto3 table (see `cuponazo.infrastructure.ticket_repository.dynamodb.get_table`).
+
+Every measurement runs in a new interpreter several times, keeping the median, alternating with the startup of a
+bare interpreter used as reference. Results have the same JSON format as `benchmark.suite` (one operation per
+import or cold start) and can be compared against a baseline with `--compare` in the same way.
+
+Run it from the root of the repository with `python -m benchmark.importtime`, or `make benchmark-importtime` to
+compare against the stored `benchmark/importtime_baseline.json` (`make benchmark-importtime-baseline` updates
+it).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmark import suite
+
+RUNS = 7
+
+MODULES = [
+    "cuponazo.domain.ticket",
+    "cuponazo.application.ticket_checker",
+    "cuponazo.infrastructure.results_fetcher",
+    "cuponazo.infrastructure.ticket_repository.dynamodb",
+]
+
+COLD_START = """
+from cuponazo.application import ticket_checker
+from cuponazo.domain import ticket
+from cuponazo.infrastructure import results_fetcher
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+fetcher = results_fetcher.ResultsFetcher("https://juegosonce.local/result.xml")
+repository = dynamodb.TicketRepository(dynamodb.get_table("tickets", region_name="eu-west-1"))
+ticket_checker.TicketChecker(ticket.Cuponazo("12345", "321")).check_ticket(ticket.Cuponazo("12345", "000"))
+"""
+
+# The cold start creates the boto3 table like the check job does, but no request is sent: the endpoint is stubbed
+# and the credentials are fake, so botocore doesn't look for them (nor query the instance metadata service)
+COLD_START_ENV = {
+    "AWS_ENDPOINT_URL_DYNAMODB": "http://127.0.0.1:1",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "AWS_EC2_METADATA_DISABLED": "true",
+}
+
+
+def import_seconds(module: str) -> float:
+    """Returns the cumulative import time of `module` reported by `-X importtime`, in a new interpreter."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    for line in stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1e6
+
+    raise ValueError(f"{module} wasn't imported")
+
+
+def cold_start_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", COLD_START],
+        check=True,
+        env={**os.environ, **COLD_START_ENV},
+    )
+    return time.perf_counter() - start
+
+
+def startup_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def measure(name: str, run) -> dict:
+    times = [(run(), startup_seconds()) for _ in range(RUNS)]
+    seconds = statistics.median(t for t, _ in times)
+    reference_seconds = statistics.median(t for _, t in times)
+    print(
+        f"{name:<60} {seconds * 1e3:>10,.1f} ms {seconds / reference_seconds:>6.2f}x startup",
+        file=sys.stderr,
+    )
+    return {
+        "ops": 1,
+        "seconds": seconds,
+        "ops_per_second": 1 / seconds,
+        "relative": reference_seconds / seconds,
+    }
+
+
+def measure_all(names: set[str] | None = None) -> dict[str, dict]:
+    runs = {
+        **{
+            f"import.{module}": lambda module=module: import_seconds(module)
+            for module in MODULES
+        },
+        "cold_start": cold_start_seconds,
+    }
+    return {
+        name: measure(name, run)
+        for name, run in runs.items()
+        if names is None or name in names
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="file to write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="fraction of the baseline throughput a case may lose (default: 0.15)",
+    )
+    parser.add_argument(
+        "--confirm",
+        type=int,
+        default=2,
+        help="runs a slower case has to be slower again to fail (default: 2)",
+    )
+    args = parser.parse_args()
+
+    results = measure_all()
+    report = {**suite.host(), "timestamp": time.time(), "results": results}
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    if args.compare is None:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+
+    changes = suite.environment_changes(report, baseline)
+    if changes:
+        print(
+            f"WARNING not comparing against {args.compare}, it ran on another environment: {', '.join(changes)}",
+            file=sys.stderr,
+        )
+        return 0
+
+    regressions = suite.confirm_regressions(
+        suite.compare(results, baseline["results"], args.tolerance),
+        measure_all,
+        baseline["results"],
+        args.tolerance,
+        args.confirm,
+    )
+    for name, expected, got in regressions:
+        print(
+            f"REGRESSION {name}: {1 / got:,.2f}x startup, baseline {1 / expected:,.2f}x startup",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Compares parse time and peak memory of `ResultsFetcher.fetch_cuponazo` (parsing the whole response with
+xmltodict) against the streaming `ResultsFetcher.iter_cuponazo`, on synthetic feeds of growing size where only
+one out of ten items is a Cuponazo result.
+
+Run it from the root of the repository with `python -m benchmark.results_fetcher`.
+"""
+
+import io
+import time
+import tracemalloc
+import unittest.mock
+
+from cuponazo.infrastructure import results_fetcher
+
+ITEM_COUNTS = [1_000, 10_000, 100_000]
+
+
+class FakeResponse(io.BytesIO):
+    code = 200
+    headers = {}
+
+
+def synthetic_feed(items: int) -> bytes:
+    feed = io.StringIO()
+    feed.write('<?xml version="1.0" encoding="utf-8" ?>\n<items>\n')
+    for i in range(items):
+        tipo = "Cuponazo" if i % 10 == 0 else "Cup&oacute;n Diario"
+        feed.write(
+            f"<item><tipo><![CDATA[{tipo}]]></tipo><fecha><![CDATA[Viernes, 08/09/2023]]></fecha>"
+            f"<numero><![CDATA[{i % 100000:05d}]]></numero><serie><![CDATA[{i % 1000:03d}]]></serie>"
+            "<importebote><![CDATA[0]]></importebote><adic><![CDATA[]]></adic></item>\n"
+        )
+    feed.write("</items>\n")
+    return feed.getvalue().encode()
+
+
+def measure(name: str, feed: bytes, fetch) -> None:
+    fetcher = results_fetcher.ResultsFetcher("https://juegosonce.local/result.xml")
+    with unittest.mock.patch(
+        "urllib.request.urlopen", side_effect=lambda url: FakeResponse(feed)
+    ):
+        start = time.perf_counter()
+        fetch(fetcher)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        fetch(fetcher)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(
+        f"{name:<14} {len(feed):>12,} bytes {elapsed * 1e3:>10,.1f} ms {peak / 2**20:>8,.1f} MiB peak"
+    )
+
+
+def main() -> None:
+    for items in ITEM_COUNTS:
+        feed = synthetic_feed(items)
+        measure("fetch_cuponazo", feed, lambda f: f.fetch_cuponazo())
+        measure("iter_cuponazo", feed, lambda f: list(f.iter_cuponazo()))
+
+
+if __name__ == "__main__":
+    main()
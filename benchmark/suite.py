@@ -0,0 +1,358 @@
+"""Benchmark suite of the hot paths: `Cuponazo` construction, `TicketChecker` throughput, `ResultsFetcher`
+parse time on synthetic feeds of growing size and `TicketRepository` serialization and deserialization at
+growing per-user ticket counts (against an in-memory table).
+
+Every case is timed several times, keeping the best run, and reported as operations per second. Runs of the
+case alternate with runs of a fixed `reference` workload, and every case is also reported relative to it, so
+results measured while the host is slower or busier are still comparable. Results are printed and can be
+written as JSON with `--output`. With `--compare` the relative results are checked against a baseline (the JSON
+output of a previous run) and it exits with an error if any case got slower than the `--tolerance` in the first
+run and in `--confirm` more runs of the case. Baselines of another host (see `host`) aren't comparable, the
+comparison is skipped with a warning.
+
+Run it from the root of the repository with `python -m benchmark.suite`, or `make benchmark-suite` to compare
+against the stored `benchmark/baseline.json` (`make benchmark-baseline` updates it).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+import unittest.mock
+from typing import Callable
+
+from benchmark import fake_table
+from benchmark import results_fetcher as results_fetcher_benchmark
+from cuponazo.application import ticket_checker
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+from cuponazo.infrastructure import results_fetcher
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+REPEAT = 5
+
+# Seconds every timing takes at least, cases faster than that are run several times per timing
+MIN_SECONDS = 0.05
+
+# Every case is a name, the amount of operations done by a run and a function returning the run to time
+cases: list[tuple[str, int, Callable[[], Callable[[], object]]]] = []
+
+
+def case(name: str, ops: int):
+    def register(setup: Callable[[], Callable[[], object]]):
+        cases.append((name, ops, setup))
+        return setup
+
+    return register
+
+
+def reference() -> Callable[[], object]:
+    """Fixed pure Python workload (arithmetic, a list and a sort) the cases are measured relative to."""
+    values = list(range(10_000))
+    return lambda: sorted([(v * 7919) % 10_007 for v in values])
+
+
+def random_codes(n: int) -> list[int]:
+    rnd = random.Random(42)
+    return [rnd.randrange(100_000_000) for _ in range(n)]
+
+
+@case("ticket.construct", ops=100_000)
+def ticket_construct():
+    tickets = [(f"{c // 1000:05d}", f"{c % 1000:03d}") for c in random_codes(100_000)]
+    return lambda: [ticket.Cuponazo(number, serie) for number, serie in tickets]
+
+
+@case("ticket.from_code", ops=100_000)
+def ticket_from_code():
+    codes = random_codes(100_000)
+    return lambda: [ticket.Cuponazo.from_code(code) for code in codes]
+
+
+@case("checker.check_ticket", ops=100_000)
+def checker_check_ticket():
+    checker = ticket_checker.TicketChecker(ticket.Cuponazo("12345", "321"))
+    tickets = [ticket.Cuponazo.from_code(code) for code in random_codes(100_000)]
+    return lambda: [checker.check_ticket(t) for t in tickets]
+
+
+@case("checker.check_tickets", ops=1_000_000)
+def checker_check_tickets():
+    checker = ticket_checker.TicketChecker(ticket.Cuponazo("12345", "321"))
+    batch = ticket_batch.TicketBatch(random_codes(1_000_000))
+    checker.prize_table
+    return lambda: checker.check_tickets(batch)
+
+
+@case("checker.multi_result[4]", ops=1_000_000)
+def checker_multi_result():
+    checker = ticket_checker.MultiResultChecker(
+        [ticket.Cuponazo.from_code(code) for code in random_codes(4)]
+    )
+    batch = ticket_batch.TicketBatch(random_codes(1_000_000))
+    return lambda: checker.check_tickets(batch)
+
+
+@case("checker.count_prizes[repeated]", ops=1_000_000)
+def checker_count_prizes():
+    checker = ticket_checker.MultiResultChecker(
+        [ticket.Cuponazo.from_code(code) for code in random_codes(4)]
+    )
+    # Groups of players sharing tickets: 10k distinct tickets held 100 times each
+    batch = ticket_batch.TicketBatch(random_codes(10_000) * 100)
+    return lambda: checker.count_prizes(batch)
+
+
+for items in [1_000, 10_000, 100_000]:
+
+    @case(f"fetcher.fetch_cuponazo[{items}]", ops=items)
+    def fetcher_fetch_cuponazo(items=items):
+        feed = results_fetcher_benchmark.synthetic_feed(items)
+        fetcher = results_fetcher.ResultsFetcher("https://juegosonce.local/result.xml")
+
+        def run():
+            with unittest.mock.patch(
+                "urllib.request.urlopen",
+                side_effect=lambda url: results_fetcher_benchmark.FakeResponse(feed),
+            ):
+                return fetcher.fetch_cuponazo()
+
+        return run
+
+    @case(f"fetcher.iter_cuponazo[{items}]", ops=items)
+    def fetcher_iter_cuponazo(items=items):
+        feed = results_fetcher_benchmark.synthetic_feed(items)
+        fetcher = results_fetcher.ResultsFetcher("https://juegosonce.local/result.xml")
+
+        def run():
+            with unittest.mock.patch(
+                "urllib.request.urlopen",
+                side_effect=lambda url: results_fetcher_benchmark.FakeResponse(feed),
+            ):
+                return list(fetcher.iter_cuponazo())
+
+        return run
+
+
+for count in [10, 1_000, 10_000]:
+
+    @case(f"repository.add_tickets_to_id[{count}]", ops=count)
+    def repository_serialize(count=count):
+        batch = ticket_batch.TicketBatch(random_codes(count))
+
+        def run():
+            repo = dynamodb.TicketRepository(fake_table.InMemoryTable())
+            repo.add_tickets_to_id("user", batch)
+
+        return run
+
+    @case(f"repository.get_list[{count}]", ops=count)
+    def repository_deserialize_list(count=count):
+        repo = dynamodb.TicketRepository(fake_table.InMemoryTable())
+        repo.add_tickets_to_id("user", ticket_batch.TicketBatch(random_codes(count)))
+        return lambda: repo.get_ticket_batch_by_id("user")
+
+    @case(f"repository.get_binary[{count}]", ops=count)
+    def repository_deserialize_binary(count=count):
+        repo = dynamodb.TicketRepository(fake_table.InMemoryTable())
+        repo.add_tickets_to_id("user", ticket_batch.TicketBatch(random_codes(count)))
+        repo.compact_tickets("user")
+        return lambda: repo.get_ticket_batch_by_id("user")
+
+
+def time_case(ops: int, run: Callable[[], object]) -> dict:
+    """Times `run` `REPEAT` times, keeping the best time, alternating with the reference workload. Its result
+    relative to the reference is the median of the ratios of every pair of consecutive timings, as the speed of
+    the host drifts less between them than along the whole case. Every timing lasts at least `MIN_SECONDS`,
+    running them several times if needed.
+    """
+    reference_run = reference()
+    # A first run to warm up any cache (prize tables, imports...)
+    run()
+    reference_run()
+
+    timers = [timeit.Timer(reference_run), timeit.Timer(run)]
+    numbers = [number_for(timer) for timer in timers]
+    pairs = [
+        [timer.timeit(number) / number for timer, number in zip(timers, numbers)]
+        for _ in range(REPEAT)
+    ]
+
+    seconds = min(case_seconds for _, case_seconds in pairs)
+    return {
+        "ops": ops,
+        "seconds": seconds,
+        "ops_per_second": ops / seconds,
+        # Operations done in the time of a reference run
+        "relative": statistics.median(
+            ops * reference_seconds / case_seconds
+            for reference_seconds, case_seconds in pairs
+        ),
+    }
+
+
+def number_for(timer: timeit.Timer) -> int:
+    """Returns how many runs of `timer` take at least `MIN_SECONDS`."""
+    number = 1
+    while (seconds := timer.timeit(number)) < MIN_SECONDS:
+        number = max(number * 2, int(number * MIN_SECONDS / max(seconds, 1e-9)))
+    return number
+
+
+def run_cases(selected: Callable[[str], bool]) -> dict[str, dict]:
+    results = {}
+    for name, ops, setup in cases:
+        if not selected(name):
+            continue
+
+        results[name] = time_case(ops, setup())
+        print(
+            f"{name:<40} {results[name]['ops_per_second']:>16,.0f} ops/s"
+            f" {results[name]['relative']:>12,.1f} relative",
+            file=sys.stderr,
+        )
+
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float):
+    """Returns the cases slower than in `baseline` by more than `tolerance` (a fraction of the baseline),
+    comparing their results relative to the reference workload.
+    """
+    regressions = []
+    for name, result in results.items():
+        if "relative" not in baseline.get(name, {}):
+            continue
+
+        expected = baseline[name]["relative"]
+        if result["relative"] < expected * (1 - tolerance):
+            regressions.append((name, expected, result["relative"]))
+
+    return regressions
+
+
+def confirm_regressions(
+    regressions: list[tuple[str, float, float]],
+    measure: Callable[[set[str]], dict[str, dict]],
+    baseline: dict[str, dict],
+    tolerance: float,
+    repeats: int,
+) -> list[tuple[str, float, float]]:
+    """Measures the cases in `regressions` again with `measure` up to `repeats` times, returning the ones that are
+    still slower than in `baseline` every time. A single slow run is often noise of the host.
+    """
+    for _ in range(repeats):
+        if not regressions:
+            break
+
+        print(
+            f"Measuring {len(regressions)} slower cases again to confirm them",
+            file=sys.stderr,
+        )
+        regressions = compare(
+            measure({name for name, _, _ in regressions}), baseline, tolerance
+        )
+
+    return regressions
+
+
+def host() -> dict:
+    """Returns what identifies the host a report is measured on: Python version, architecture, CPU model and
+    amount of CPUs. Reports of different hosts can't be compared.
+    """
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu": cpu,
+        "cpus": os.cpu_count(),
+    }
+
+
+def environment_changes(report: dict, baseline: dict) -> list[str]:
+    """Returns how the host (see `host`) of `report` differs from the one of `baseline`."""
+    return [
+        f"{key} {baseline.get(key)} -> {report[key]}"
+        for key in host()
+        if baseline.get(key) != report[key]
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="file to write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="fraction of the baseline throughput a case may lose (default: 0.15)",
+    )
+    parser.add_argument(
+        "--confirm",
+        type=int,
+        default=2,
+        help="runs a slower case has to be slower again to fail (default: 2)",
+    )
+    parser.add_argument("--filter", help="only run the cases containing this text")
+    args = parser.parse_args()
+
+    report = {
+        **host(),
+        "timestamp": time.time(),
+        "results": run_cases(lambda name: args.filter is None or args.filter in name),
+    }
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    if args.compare is None:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+
+    changes = environment_changes(report, baseline)
+    if changes:
+        print(
+            f"WARNING not comparing against {args.compare}, it ran on another environment: {', '.join(changes)}",
+            file=sys.stderr,
+        )
+        return 0
+
+    regressions = confirm_regressions(
+        compare(report["results"], baseline["results"], args.tolerance),
+        lambda names: run_cases(lambda name: name in names),
+        baseline["results"],
+        args.tolerance,
+        args.confirm,
+    )
+    for name, expected, got in regressions:
+        print(
+            f"REGRESSION {name}: {got:,.1f} relative, baseline {expected:,.1f} relative ({got / expected - 1:+.0%})",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
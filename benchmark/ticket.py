@@ -0,0 +1,74 @@
+"""Compares memory usage and construction throughput of `ticket.Cuponazo` against the previous dict based
+implementation, that rebuilt and ran its validation regexes on every instance. Tickets are loaded from a JSON
+payload like the one stored by the DynamoDB `TicketRepository`.
+
+Run it from the root of the repository with `python -m benchmark.ticket`.
+"""
+
+import json
+import random
+import re
+import time
+import tracemalloc
+
+from cuponazo.domain import ticket
+
+TICKETS = 200_000
+
+
+class LegacyCuponazo:
+    number_length = 5
+    serie_length = 3
+
+    def __init__(self, number: str, serie: str) -> None:
+        number_regex = r"^[0-9]{%s}$" % self.number_length
+        serie_regex = r"^[0-9]{%s}$" % self.serie_length
+
+        if not re.match(number_regex, number):
+            raise ticket.InvalidFormatError(number)
+        self.__number = number
+
+        if not re.match(serie_regex, serie):
+            raise ticket.InvalidFormatError(serie)
+        self.__serie = serie
+
+
+def payload(n: int) -> str:
+    rnd = random.Random(42)
+    return json.dumps(
+        [
+            {
+                "number": f"{rnd.randrange(100000):05d}",
+                "serie": f"{rnd.randrange(1000):03d}",
+            }
+            for _ in range(n)
+        ]
+    )
+
+
+def measure(name: str, cls, payload: str) -> None:
+    start = time.perf_counter()
+    tickets = [cls(t["number"], t["serie"]) for t in json.loads(payload)]
+    elapsed = time.perf_counter() - start
+    del tickets
+
+    tracemalloc.start()
+    tickets = [cls(t["number"], t["serie"]) for t in json.loads(payload)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:<24} {len(tickets) / elapsed:>12,.0f} tickets/s {size / len(tickets):>8.1f} bytes/ticket"
+    )
+
+
+def main() -> None:
+    p = payload(TICKETS)
+
+    measure("LegacyCuponazo", LegacyCuponazo, p)
+    measure("Cuponazo", ticket.Cuponazo, p)
+    measure("Cuponazo.from_trusted", ticket.Cuponazo.from_trusted, p)
+
+
+if __name__ == "__main__":
+    main()
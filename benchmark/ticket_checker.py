@@ -0,0 +1,51 @@
+"""Compares the throughput of `TicketChecker.check_ticket` (one ticket at a time) against the bulk
+`TicketChecker.check_tickets`, with and without the prize table.
+
+Run it from the root of the repository with `python -m benchmark.ticket_checker`.
+"""
+
+import random
+import time
+
+from cuponazo.application import ticket_checker
+from cuponazo.domain import ticket
+
+TICKETS = 200_000
+
+
+def random_tickets(n: int) -> list[ticket.Cuponazo]:
+    rnd = random.Random(42)
+    return [
+        ticket.Cuponazo(f"{rnd.randrange(100000):05d}", f"{rnd.randrange(1000):03d}")
+        for _ in range(n)
+    ]
+
+
+def main() -> None:
+    tickets = random_tickets(TICKETS)
+    result = ticket.Cuponazo("12345", "321")
+    checker = ticket_checker.TicketChecker(result, table_threshold=TICKETS + 1)
+    table_checker = ticket_checker.TicketChecker(result, table_threshold=0)
+
+    start = time.perf_counter()
+    scalar = [checker.check_ticket(t) for t in tickets]
+    scalar_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bulk = checker.check_tickets(tickets)
+    bulk_elapsed = time.perf_counter() - start
+
+    # Includes building the prize table
+    start = time.perf_counter()
+    table = table_checker.check_tickets(tickets)
+    table_elapsed = time.perf_counter() - start
+
+    assert scalar == list(bulk) == list(table)
+
+    print(f"check_ticket:                {TICKETS / scalar_elapsed:>12,.0f} tickets/s")
+    print(f"check_tickets:               {TICKETS / bulk_elapsed:>12,.0f} tickets/s")
+    print(f"check_tickets (prize table): {TICKETS / table_elapsed:>12,.0f} tickets/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Measures the cost of appending a ticket to an id that already has a growing amount of tickets, comparing
+the atomic append of the DynamoDB `TicketRepository` against the previous read-modify-write of the whole JSON
+`Tickets` attribute. Both run against an in-memory table, reporting the time and the bytes sent and received
+per append. It also compares the item size and read time of every storage format: legacy JSON `Tickets`, the
+`TicketList` appended codes and the compacted binary `TicketsBin`.
+
+Run it from the root of the repository with `python -m benchmark.ticket_repository`.
+"""
+
+import json
+import time
+
+from benchmark import fake_table
+from cuponazo.domain import ticket
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+APPENDS = 200
+TICKET_COUNTS = [10, 100, 1_000, 10_000, 50_000]
+
+
+class MeteredTable(fake_table.InMemoryTable):
+    """Counts the (JSON encoded) bytes of the requests and responses going through the table."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.bytes = 0
+
+    def get_item(self, **kwargs) -> dict:
+        response = super().get_item(**kwargs)
+        self.bytes += len(json.dumps(kwargs)) + len(json.dumps(response))
+        return response
+
+    def put_item(self, **kwargs) -> dict:
+        self.bytes += len(json.dumps(kwargs))
+        return super().put_item(**kwargs)
+
+    def update_item(self, **kwargs) -> dict:
+        self.bytes += len(json.dumps(kwargs))
+        return super().update_item(**kwargs)
+
+
+def legacy_add_ticket_to_id(
+    table: MeteredTable, ticket_id: str, t: ticket.Cuponazo
+) -> None:
+    item = table.get_item(Key={"Id": ticket_id}).get("Item", {"Tickets": "[]"})
+    tickets = json.loads(item["Tickets"])
+    tickets.append({"number": t.number, "serie": t.serie})
+    table.put_item(Item={"Id": ticket_id, "Tickets": json.dumps(tickets)})
+
+
+def measure(name: str, count: int, add_ticket) -> None:
+    t = ticket.Cuponazo("12345", "321")
+    table = MeteredTable()
+    table.put_item(
+        Item={
+            "Id": "user",
+            "Tickets": json.dumps([{"number": t.number, "serie": t.serie}] * count),
+        }
+    )
+    table.bytes = 0
+
+    start = time.perf_counter()
+    for _ in range(APPENDS):
+        add_ticket(table, "user", t)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<18} {count:>8,} tickets {elapsed / APPENDS * 1e6:>10,.1f} us/append {table.bytes / APPENDS:>12,.0f} bytes/append"
+    )
+
+
+def measure_format(name: str, count: int, compact) -> None:
+    table = fake_table.InMemoryTable()
+    repo = dynamodb.TicketRepository(table)
+    tickets = [ticket.Cuponazo(f"{i % 100_000:05d}", "321") for i in range(count)]
+    table.put_item(
+        Item={
+            "Id": "user",
+            "Tickets": json.dumps(
+                [{"number": t.number, "serie": t.serie} for t in tickets]
+            ),
+        }
+    )
+    compact(repo, table)
+    item = table.items["user"]
+    size = sum(
+        len(v) if isinstance(v, bytes) else len(json.dumps(v)) for v in item.values()
+    )
+
+    runs = max(1, 100_000 // count)
+    start = time.perf_counter()
+    for _ in range(runs):
+        repo.get_ticket_batch_by_id("user")
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<18} {count:>8,} tickets {elapsed / runs * 1e3:>10,.3f} ms/read {size:>12,} bytes/item"
+    )
+
+
+def to_ticket_list(
+    repo: dynamodb.TicketRepository, table: fake_table.InMemoryTable
+) -> None:
+    batch = repo.get_ticket_batch_by_id("user")
+    table.put_item(Item={"Id": "user", "TicketList": [f"{c:08d}" for c in batch.codes]})
+
+
+def main() -> None:
+    for count in TICKET_COUNTS:
+        measure_format("json", count, lambda repo, table: None)
+        measure_format("list", count, to_ticket_list)
+        measure_format(
+            "binary", count, lambda repo, table: repo.compact_tickets("user")
+        )
+
+    for count in TICKET_COUNTS:
+        measure("read-modify-write", count, legacy_add_ticket_to_id)
+        measure(
+            "atomic append",
+            count,
+            lambda table, ticket_id, t: dynamodb.TicketRepository(
+                table
+            ).add_ticket_to_id(ticket_id, t),
+        )
+
+
+if __name__ == "__main__":
+    main()
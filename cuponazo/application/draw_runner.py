@@ -0,0 +1,182 @@
+import collections
+import os
+from concurrent import futures
+from typing import TYPE_CHECKING, Iterator
+
+from cuponazo.application import ticket_checker
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+from cuponazo.domain import ticket_repository
+
+if TYPE_CHECKING:
+    # Only needed by the worker processes, it's imported by `_attach_worker`
+    from multiprocessing import shared_memory
+
+
+class PrizeSummary:
+    """Prizes won by the tickets of an id.
+
+    Parameters
+    ----------
+    `ticket_id` (`str`)
+        The id the tickets belong to.
+
+    `tickets` (`int`)
+        Amount of tickets checked.
+
+    `prizes` (`dict[int, int]`)
+        Amount of prizes won by prize level (see `ticket_checker.TicketChecker.check_ticket`). When checking
+        against several results every ticket can win a prize in each of them. Levels without prizes are omitted.
+    """
+
+    __slots__ = ("ticket_id", "tickets", "prizes")
+
+    def __init__(self, ticket_id: str, tickets: int, prizes: dict[int, int]) -> None:
+        self.ticket_id = ticket_id
+        self.tickets = tickets
+        self.prizes = prizes
+
+    @property
+    def best(self) -> int:
+        """The best prize level won, 0 if none."""
+        return max(self.prizes, default=0)
+
+    def __eq__(self, __value: object) -> bool:
+        if not isinstance(__value, PrizeSummary):
+            return NotImplemented
+        return (self.ticket_id, self.tickets, self.prizes) == (
+            __value.ticket_id,
+            __value.tickets,
+            __value.prizes,
+        )
+
+    def __repr__(self) -> str:
+        return f"PrizeSummary({self.ticket_id!r}, tickets={self.tickets}, prizes={self.prizes})"
+
+
+class DrawRunner:
+    """Checks all the tickets stored in `repository` against the `results` of a draw. Ids are read from the
+    repository in pages, and every page of tickets is checked by a pool of worker processes. The profile table of
+    the `ticket_checker.MultiResultChecker` is built once, in the current process, and shared with the workers
+    through shared memory, so they don't build it again when they start. At most `max_in_flight` pages are being
+    checked at any time, so memory doesn't grow with the amount of tickets.
+
+    Parameters
+    ----------
+    `repository` (`ticket_repository.Interface`)
+        The repository with the tickets to check.
+
+    `results` (`list[ticket.Cuponazo]`)
+        The results of the draw.
+
+    `workers` (`int | None`)
+        Amount of worker processes. With `None` it uses one per CPU; with 0 the tickets are checked in the
+        current process.
+
+    `page_size` (`int`)
+        Amount of ids read from the repository and sent to a worker at once.
+
+    `max_in_flight` (`int | None`)
+        Maximum amount of pages sent to the workers and not yet collected. With `None` it's twice the amount of
+        workers.
+    """
+
+    def __init__(
+        self,
+        repository: ticket_repository.Interface,
+        results: list[ticket.Cuponazo],
+        workers: int | None = None,
+        page_size: int = 100,
+        max_in_flight: int | None = None,
+    ) -> None:
+        self.repository = repository
+        self.results = results
+        self.workers = os.cpu_count() if workers is None else workers
+        self.page_size = page_size
+        self.max_in_flight = (
+            max(2 * self.workers, 1) if max_in_flight is None else max_in_flight
+        )
+
+    def run(self) -> Iterator[PrizeSummary]:
+        """Checks all the tickets in the repository, yielding the `PrizeSummary` of every id (in the order the
+        repository returns them) as soon as its page is checked.
+        """
+        checker = ticket_checker.MultiResultChecker(self.results)
+        if self.workers == 0:
+            _init_worker(checker)
+            for page in self.__iter_pages():
+                yield from _check_page(page)
+            return
+
+        shm = checker.share_profile_table()
+        try:
+            with futures.ProcessPoolExecutor(
+                self.workers,
+                initializer=_attach_worker,
+                initargs=(self.results, shm.name, checker.profiles),
+            ) as executor:
+                in_flight = collections.deque()
+                for page in self.__iter_pages():
+                    if len(in_flight) >= self.max_in_flight:
+                        yield from in_flight.popleft().result()
+                    in_flight.append(executor.submit(_check_page, page))
+
+                while in_flight:
+                    yield from in_flight.popleft().result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def __iter_pages(self) -> Iterator[list[tuple[str, type, bytes]]]:
+        for ticket_ids in self.repository.iter_ticket_ids(self.page_size):
+            tickets = self.repository.get_tickets_by_ids(ticket_ids)
+            # Serialized batches are way cheaper to send to the workers than lists of tickets
+            yield [
+                (
+                    ticket_id,
+                    tickets[ticket_id].ticket_type,
+                    tickets[ticket_id].to_bytes(),
+                )
+                for ticket_id in ticket_ids
+            ]
+
+
+# Checker of the current worker process, set once by `_init_worker`
+_checker: ticket_checker.MultiResultChecker | None = None
+# Shared memory block with the profile table of `_checker`, kept open while the worker lives
+_shared_table: "shared_memory.SharedMemory | None" = None
+
+
+def _init_worker(checker: ticket_checker.MultiResultChecker) -> None:
+    global _checker
+    _checker = checker
+
+
+def _attach_worker(
+    results: list[ticket.Cuponazo], name: str, profiles: list[tuple[int, ...]]
+) -> None:
+    from multiprocessing import shared_memory
+
+    global _shared_table
+    _shared_table = shared_memory.SharedMemory(name)
+    _init_worker(
+        ticket_checker.MultiResultChecker(
+            results, profile_table=_shared_table.buf, profiles=profiles
+        )
+    )
+
+
+def _check_page(page: list[tuple[str, type, bytes]]) -> list[PrizeSummary]:
+    summaries = []
+    for ticket_id, ticket_type, data in page:
+        batch = ticket_batch.TicketBatch.from_bytes(data, ticket_type)
+
+        prizes = collections.Counter()
+        for result_prizes in _checker.count_prizes(batch):
+            prizes.update(result_prizes)
+
+        summaries.append(
+            PrizeSummary(ticket_id, len(batch), dict(sorted(prizes.items())))
+        )
+
+    return summaries
@@ -0,0 +1,166 @@
+import collections
+import threading
+from typing import Iterable
+
+from cuponazo.application import ticket_checker
+from cuponazo.application.draw_runner import PrizeSummary
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+from cuponazo.domain import ticket_repository
+
+
+class PrizeTracker:
+    """Keeps the prizes won by every id against the latest published results, updating them as tickets are
+    added. Every new ticket is checked on its own and merged into the `PrizeSummary` of its id, so the tickets
+    already checked aren't checked again. The tickets of an id without summary yet (not seeded by
+    `publish_results`) are checked once, the first time it's needed.
+
+    Parameters
+    ----------
+    `repository` (`ticket_repository.Interface`)
+        The repository where tickets are stored.
+
+    `results` (`list[ticket.Cuponazo]`)
+        The latest published results, if any.
+
+    `lock_stripes` (`int`)
+        Locks serializing the operations on the same id. Every id uses the lock of its hash, so ids sharing a
+        lock wait for each other, but memory doesn't grow with the ids seen.
+    """
+
+    def __init__(
+        self,
+        repository: ticket_repository.Interface,
+        results: list[ticket.Cuponazo] = (),
+        lock_stripes: int = 64,
+    ) -> None:
+        self.repository = repository
+        self.__lock = threading.Lock()
+        self.__id_locks = [threading.Lock() for _ in range(lock_stripes)]
+        self.publish_results(results)
+
+    @property
+    def results(self) -> list[ticket.Cuponazo]:
+        return [checker.result for checker in self.__checkers]
+
+    def publish_results(
+        self,
+        results: list[ticket.Cuponazo],
+        summaries: Iterable[PrizeSummary] = (),
+    ) -> None:
+        """Replaces the results the tickets are checked against, dropping the current summaries.
+
+        Parameters
+        ----------
+        `results` (`list[ticket.Cuponazo]`)
+            The new results.
+
+        `summaries` (`Iterable[PrizeSummary]`)
+            Summaries already computed against `results`, for instance by `draw_runner.DrawRunner`.
+        """
+        checkers = [ticket_checker.TicketChecker(r) for r in results]
+        with self.__lock:
+            self.__checkers = checkers
+            self.__summaries = {s.ticket_id: s for s in summaries}
+
+    def add_ticket(self, ticket_id: str, t: ticket.Cuponazo) -> list[int]:
+        """Stores `t` in the repository and updates the summary of `ticket_id` with its prizes.
+
+        Returns
+        -------
+        `list[int]`
+            The prize level of `t` against every result.
+        """
+        return self.add_tickets(ticket_id, [t])[0]
+
+    def add_tickets(
+        self,
+        ticket_id: str,
+        tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch,
+    ) -> list[list[int]]:
+        """Same as `add_ticket` for several tickets, returning the prize levels of every ticket.
+
+        Raises
+        ------
+        `TypeError`
+            If any ticket is of another lottery than the results, before storing any of them.
+        """
+        tickets = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        # Operations on the same id are serialized, so the summary always matches what's in the repository
+        with self.__id_lock(ticket_id):
+            checkers, summary = self.__get_state(ticket_id)
+            levels = [[c.check_ticket(t) for c in checkers] for t in tickets]
+            if summary is None:
+                # Loaded before storing the new tickets: reads could miss them right after the write
+                summary = self.__load(ticket_id, checkers)
+
+            if len(tickets) == 1:
+                self.repository.add_ticket_to_id(ticket_id, tickets[0])
+            else:
+                self.repository.add_tickets_to_id(ticket_id, tickets)
+
+            prizes = collections.Counter(summary.prizes)
+            prizes.update(level for t_levels in levels for level in t_levels)
+            del prizes[0]
+            self.__store(
+                checkers,
+                PrizeSummary(
+                    ticket_id,
+                    summary.tickets + len(tickets),
+                    dict(sorted(prizes.items())),
+                ),
+            )
+
+        return levels
+
+    def get_summary(self, ticket_id: str) -> PrizeSummary:
+        """Returns the prizes won by `ticket_id` against the current results."""
+        with self.__id_lock(ticket_id):
+            checkers, summary = self.__get_state(ticket_id)
+            if summary is None:
+                summary = self.__load(ticket_id, checkers)
+
+        return PrizeSummary(summary.ticket_id, summary.tickets, dict(summary.prizes))
+
+    def __id_lock(self, ticket_id: str) -> threading.Lock:
+        return self.__id_locks[hash(ticket_id) % len(self.__id_locks)]
+
+    def __get_state(
+        self, ticket_id: str
+    ) -> tuple[list[ticket_checker.TicketChecker], PrizeSummary | None]:
+        with self.__lock:
+            return self.__checkers, self.__summaries.get(ticket_id)
+
+    def __store(
+        self, checkers: list[ticket_checker.TicketChecker], summary: PrizeSummary
+    ) -> None:
+        with self.__lock:
+            # Results could have been published meanwhile, then it's outdated
+            if checkers is self.__checkers:
+                self.__summaries[summary.ticket_id] = summary
+
+    def __load(
+        self, ticket_id: str, checkers: list[ticket_checker.TicketChecker]
+    ) -> PrizeSummary:
+        batch = self.repository.get_ticket_batch_by_id(ticket_id)
+        # `check_encoded_tickets` doesn't know the lottery of the tickets, it's checked here
+        for checker in checkers:
+            if batch.ticket_type is not checker.ticket_type:
+                raise TypeError(
+                    f"Can't check {batch.ticket_type.__name__} tickets against a "
+                    f"{checker.ticket_type.__name__} result"
+                )
+        # Groups usually hold the same ticket several times, every distinct one is checked once
+        distinct, counts = batch.counts()
+        numbers, series = distinct.split()
+        prizes = collections.Counter()
+        for checker in checkers:
+            levels = checker.check_encoded_tickets(numbers, series)
+            for level, count in zip(levels, counts):
+                prizes[level] += count
+        del prizes[0]
+
+        summary = PrizeSummary(ticket_id, len(batch), dict(sorted(prizes.items())))
+        self.__store(checkers, summary)
+        return summary
@@ -1,4 +1,18 @@
+import array
+import collections
+import datetime
+import itertools
+import threading
+from typing import TYPE_CHECKING, Iterable, Mapping
+
+from cuponazo.domain import metrics
+from cuponazo.domain import results_history
 from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+
+if TYPE_CHECKING:
+    # Only needed to share the prize tables, it's imported by `share_prize_table`
+    from multiprocessing import shared_memory
 
 
 class TicketChecker:
@@ -8,11 +22,47 @@ class TicketChecker:
     Parameters
     ----------
     `result` (`ticket.Cuponazo`)
-        The result of the lottery that we want to check tickets against it.
+        The result of the lottery that we want to check tickets against it. Only tickets of its same lottery
+        (class) can be checked.
+
+    `prize_table` (`bytes | memoryview | None`)
+        An already built prize table for `result` (see `prize_table` property), for instance one attached from
+        shared memory. If `None` it'll be built lazily the first time it's needed.
+
+    `table_threshold` (`int`)
+        Minimum amount of tickets in a `check_tickets` batch to use the prize table instead of computing the
+        coincidences of every ticket.
     """
 
-    def __init__(self, result: ticket.Cuponazo) -> None:
+    table_size = 10**ticket.Cuponazo.number_length
+
+    def __init__(
+        self,
+        result: ticket.Cuponazo,
+        prize_table: bytes | memoryview | None = None,
+        table_threshold: int = 1000,
+    ) -> None:
         self.result = result
+        self.ticket_type = type(result)
+        self.table_threshold = table_threshold
+        self.__prize_table = prize_table
+        self.__prize_table_lock = threading.Lock()
+
+        # Integer encoded result, together with the integer prefixes/suffixes of each length that a ticket number
+        # has to share with it to get the matching prize level.
+        self.__result_number = int(result.number)
+        self.__result_serie = int(result.serie)
+        self.__result_prefixes = [
+            (
+                10 ** (ticket.Cuponazo.number_length - n),
+                self.__result_number // 10 ** (ticket.Cuponazo.number_length - n),
+            )
+            for n in range(1, ticket.Cuponazo.number_length)
+        ]
+        self.__result_suffixes = [
+            (10**n, self.__result_number % 10**n)
+            for n in range(1, ticket.Cuponazo.number_length)
+        ]
 
     def check_ticket(self, t: ticket.Cuponazo) -> int:
         """Returns the prize level of the ticket, that it would be the number of coincident numbers between `t`
@@ -27,9 +77,174 @@ class TicketChecker:
         -------
         `int`
             The prize level, it'll range from 0 to 6 (6 being 5 coincidences and the same serie)
+
+        Raises
+        ------
+        `TypeError`
+            If `t` is a ticket of another lottery than `self.result`.
+        """
+        if type(t) is not self.ticket_type:
+            raise TypeError(
+                f"Can't check {t!r} against a {self.ticket_type.__name__} result"
+            )
+        number, serie = divmod(t.code, 10**ticket.Cuponazo.serie_length)
+
+        return self.__get_prize_level(number, serie)
+
+    def check_tickets(
+        self, tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch
+    ) -> array.array:
+        """Returns the prize level of every ticket in `tickets`, in the same order. The numbers and series are
+        encoded into integer arrays up front and checked with `check_encoded_tickets`. Results are the same as
+        calling `check_ticket` for each ticket.
+
+        Parameters
+        ----------
+        `tickets` (`Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch`)
+            The tickets we want to check the prize level of.
+
+        Returns
+        -------
+        `array.array`
+            Array of unsigned bytes (typecode `"B"`) with the prize level of each ticket, ranging from 0 to 6.
+
+        Raises
+        ------
+        `TypeError`
+            If any ticket is of another lottery than `self.result`.
         """
-        if t.number == self.result.number:
-            if t.serie == self.result.serie:
+        tickets = ticket_batch.TicketBatch.from_tickets(tickets, self.ticket_type)
+        numbers, series = tickets.split()
+
+        return self.check_encoded_tickets(numbers, series)
+
+    def check_encoded_tickets(
+        self, numbers: array.array, series: array.array
+    ) -> array.array:
+        """Same as `check_tickets` but with tickets already encoded as integers: `numbers[i]` and `series[i]`
+        are the number and serie of the i-th ticket.
+
+        Parameters
+        ----------
+        `numbers` (`array.array`)
+            The ticket numbers as integers.
+
+        `series` (`array.array`)
+            The ticket series as integers.
+
+        Returns
+        -------
+        `array.array`
+            Array of unsigned bytes (typecode `"B"`) with the prize level of each ticket, ranging from 0 to 6.
+        """
+        # Only the bulk checks are instrumented (see `metrics.set_recorder`), `check_ticket` is too cheap
+        recorder = metrics.get_recorder()
+        method = "table" if len(numbers) >= self.table_threshold else "scalar"
+        recorder.increment("checker_tickets_total", len(numbers), method=method)
+        with recorder.time("checker_seconds", method=method):
+            if method == "table":
+                return self.__check_with_prize_table(numbers, series)
+
+            levels = array.array("B", bytes(len(numbers)))
+            for i, number in enumerate(numbers):
+                levels[i] = self.__get_prize_level(number, series[i])
+
+            return levels
+
+    def count_prizes(
+        self, tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch
+    ) -> dict[int, int]:
+        """Returns the amount of prizes won by `tickets`, by prize level. Repeated tickets are checked once and
+        their prize counted as many times as they're repeated, so it costs the same as checking the distinct
+        tickets.
+
+        Returns
+        -------
+        `dict[int, int]`
+            The amount of tickets with every prize level. Levels without prizes are omitted.
+        """
+        distinct, counts = ticket_batch.TicketBatch.from_tickets(
+            tickets, self.ticket_type
+        ).counts()
+        prizes = collections.Counter()
+        for level, count in zip(self.check_tickets(distinct), counts):
+            prizes[level] += count
+        del prizes[0]
+
+        return dict(sorted(prizes.items()))
+
+    @property
+    def prize_table(self) -> bytes | memoryview:
+        """Prize level (without taking the serie into account) of every possible ticket number, indexed by the
+        number itself. It's built once, the first time it's accessed, and it's safe to share between threads.
+        """
+        if self.__prize_table is None:
+            with self.__prize_table_lock:
+                if self.__prize_table is None:
+                    self.__prize_table = self.__build_prize_table()
+
+        return self.__prize_table
+
+    def share_prize_table(self) -> "shared_memory.SharedMemory":
+        """Copies the prize table into a new block of shared memory, so other processes can attach to it by
+        name and build their `TicketChecker` with `prize_table=shm.buf` without building the table again.
+        The caller owns the returned block and it's responsible to `close()` and `unlink()` it.
+
+        Returns
+        -------
+        `shared_memory.SharedMemory`
+            The shared memory block holding the prize table.
+        """
+        from multiprocessing import shared_memory
+
+        table = self.prize_table
+        shm = shared_memory.SharedMemory(create=True, size=len(table))
+        shm.buf[: len(table)] = table
+
+        return shm
+
+    def __build_prize_table(self) -> bytes:
+        """Builds the prize table of `self.result`. Numbers sharing the first (or last) `n` digits with the
+        result are a contiguous range (or a strided slice) of the table, so every level is set with a slice
+        assignment. Levels are assigned from lowest to highest, so every number ends up with its best level.
+        """
+        table = bytearray(self.table_size)
+
+        for n in range(1, ticket.Cuponazo.number_length):
+            level = bytes([n])
+
+            divisor, prefix = self.__result_prefixes[n - 1]
+            table[prefix * divisor : (prefix + 1) * divisor] = level * divisor
+
+            modulo, suffix = self.__result_suffixes[n - 1]
+            table[suffix::modulo] = level * len(range(suffix, self.table_size, modulo))
+
+        table[self.__result_number] = ticket.Cuponazo.number_length
+
+        return bytes(table)
+
+    def __check_with_prize_table(
+        self, numbers: array.array, series: array.array
+    ) -> array.array:
+        levels = array.array("B", map(self.prize_table.__getitem__, numbers))
+
+        # Only the tickets with the 5 numbers need to check the serie
+        full_match = ticket.Cuponazo.number_length
+        i = -1
+        while True:
+            try:
+                i = levels.index(full_match, i + 1)
+            except ValueError:
+                break
+            if series[i] == self.__result_serie:
+                levels[i] = full_match + 1
+
+        return levels
+
+    def __get_prize_level(self, number: int, serie: int) -> int:
+        """Returns the prize level of the ticket with integer encoded `number` and `serie`."""
+        if number == self.__result_number:
+            if serie == self.__result_serie:
                 # Prize to the five numbers and serie
                 return ticket.Cuponazo.number_length + 1
             else:
@@ -37,46 +252,338 @@ class TicketChecker:
                 return ticket.Cuponazo.number_length
 
         # In case we don't have the 5 numbers, we'll check how many numbers we coincide (forward and reverse)
-        coincidences_forward = self.__get_coincidences_from_number(
-            self.result.number,
-            t.number,
-        )
-        coincidences_reverse = self.__get_coincidences_from_number(
-            self.__reverse_str(self.result.number),
-            self.__reverse_str(t.number),
-        )
+        coincidences_forward = 0
+        for divisor, prefix in self.__result_prefixes:
+            if number // divisor != prefix:
+                break
+            coincidences_forward += 1
+
+        coincidences_reverse = 0
+        for modulo, suffix in self.__result_suffixes:
+            if number % modulo != suffix:
+                break
+            coincidences_reverse += 1
 
         # We'll keep with the biggest ammount of coincidences
         return max(coincidences_forward, coincidences_reverse)
 
-    def __get_coincidences_from_number(self, result: str, ticket: str) -> int:
-        """Returns the number of coincident numbers between `result` and `ticket` (going from right to left).
-        It assumes that length of `result` and `ticket` is the same, but that it's already checked when
-        called from `check_ticket`.
 
-        Parameters
-        ----------
-        `result` (`str`)
-            The numbers of the result of the lottery.
+# Size in bytes of the profile ids in `MultiResultChecker.profile_table`
+_profile_id_size = array.array("I").itemsize
+
 
-        `ticket` (`str`)
-            The numbers of the ticket we want to check.
+class MultiResultChecker:
+    """Checks tickets against several results at once, like the many Cuponazo draws a feed can carry, instead
+    of checking every ticket once per result.
+
+    The prize tables of all the results are combined into a single table mapping every ticket number to its
+    profile: the tuple with its prize level (without the serie) against every result. There are few distinct
+    profiles, so checking tickets is a single lookup per ticket and the prizes of every result are counted by
+    profile.
+
+    Parameters
+    ----------
+    `results` (`list[ticket.Cuponazo]`)
+        The results we want to check tickets against them, all of the same lottery.
+
+    `profile_table` (`bytes | memoryview | None`), `profiles` (`list[tuple[int, ...]] | None`)
+        An already built profile table for `results` and its profiles (see `profile_table` and `profiles`
+        properties), for instance one attached from shared memory. They must be given together. If `None` they'll
+        be built lazily the first time they're needed.
+
+    Raises
+    ------
+    `TypeError`
+        If the results are of different lotteries.
+
+    `ValueError`
+        If only one of `profile_table` and `profiles` is given.
+    """
+
+    def __init__(
+        self,
+        results: list[ticket.Cuponazo],
+        profile_table: bytes | memoryview | None = None,
+        profiles: list[tuple[int, ...]] | None = None,
+    ) -> None:
+        self.results = list(results)
+        self.ticket_type = type(self.results[0]) if self.results else None
+        if any(type(r) is not self.ticket_type for r in self.results):
+            raise TypeError(f"Results of different lotteries: {self.results!r}")
+        if (profile_table is None) != (profiles is None):
+            raise ValueError("profile_table and profiles must be given together")
+        self.checkers = [TicketChecker(r) for r in self.results]
+        self.__result_series = [
+            r.code % 10**ticket.Cuponazo.serie_length for r in self.results
+        ]
+        self.__profile_table = None
+        self.__profiles: list[tuple[int, ...]] = []
+        self.__best_by_profile = b""
+        self.__lock = threading.Lock()
+        if profile_table is not None:
+            # Shared memory blocks can be bigger than the table, and its ids are native unsigned ints
+            size = TicketChecker.table_size * _profile_id_size
+            self.__set_profiles(
+                memoryview(profile_table).cast("B")[:size].cast("I"), profiles
+            )
+
+    @property
+    def profile_table(self) -> array.array | memoryview:
+        """Profile id (see `profiles`) of every possible ticket number, indexed by the number itself. It's built
+        once, the first time it's accessed, and it's safe to share between threads.
+        """
+        return self.__get_profiles()[0]
+
+    @property
+    def profiles(self) -> list[tuple[int, ...]]:
+        """Prize level (without taking the serie into account) against every result of each profile, indexed
+        by profile id.
+        """
+        return self.__get_profiles()[1]
+
+    def share_profile_table(self) -> "shared_memory.SharedMemory":
+        """Copies the profile table into a new block of shared memory, so other processes can attach to it by
+        name and build their `MultiResultChecker` with `profile_table=shm.buf` (and the `profiles` of this
+        checker) without building the table again. The caller owns the returned block and it's responsible to
+        `close()` and `unlink()` it.
 
         Returns
         -------
-        `int`
-            The number of coincidences (from right to left) of two numbers.
+        `shared_memory.SharedMemory`
+            The shared memory block holding the profile table.
         """
-        for i, r, t in zip(
-            range(len(result)),
-            list(result),
-            list(ticket),
-        ):
-            if r != t:
-                break
+        from multiprocessing import shared_memory
+
+        table = memoryview(self.profile_table).cast("B")
+        shm = shared_memory.SharedMemory(create=True, size=len(table))
+        shm.buf[: len(table)] = table
+
+        return shm
+
+    def check_ticket(self, t: ticket.Cuponazo) -> list[int]:
+        """Returns the prize level of `t` against every result, in the same order as `self.results`."""
+        return [checker.check_ticket(t) for checker in self.checkers]
+
+    def check_tickets(
+        self, tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch
+    ) -> tuple[array.array, list[dict[int, int]]]:
+        """Returns the best prize level of every ticket in `tickets` against all the results, and the amount
+        of prizes won against every result.
+
+        Returns
+        -------
+        `tuple[array.array, list[dict[int, int]]]`
+            Array of unsigned bytes (typecode `"B"`) with the best prize level of each ticket, in the same order,
+            and for every result (in the same order as `self.results`) the amount of prizes won by prize level.
+            Levels without prizes are omitted.
+        """
+        tickets = ticket_batch.TicketBatch.from_tickets(tickets, self.ticket_type)
+        numbers, series = tickets.split()
+
+        return self.check_encoded_tickets(numbers, series)
+
+    def count_prizes(
+        self, tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch
+    ) -> list[dict[int, int]]:
+        """Returns the amount of prizes won by `tickets` against every result, like `check_tickets`. Repeated
+        tickets are checked once and their prizes counted as many times as they're repeated.
+        """
+        distinct, counts = ticket_batch.TicketBatch.from_tickets(
+            tickets, self.ticket_type
+        ).counts()
+        numbers, series = distinct.split()
+
+        return self.check_encoded_tickets(numbers, series, counts)[1]
+
+    def check_encoded_tickets(
+        self,
+        numbers: array.array,
+        series: array.array,
+        counts: array.array | None = None,
+    ) -> tuple[array.array, list[dict[int, int]]]:
+        """Same as `check_tickets` but with tickets already encoded as integers: `numbers[i]` and `series[i]`
+        are the number and serie of the i-th ticket. If `counts` is given, the i-th ticket is counted
+        `counts[i]` times in the prizes (see `ticket_batch.TicketBatch.counts`).
+        """
+        recorder = metrics.get_recorder()
+        recorder.increment("checker_tickets_total", len(numbers), method="multi")
+        with recorder.time("checker_seconds", method="multi"):
+            profile_table, profiles, best_by_profile = self.__get_profiles()
+
+            profile_ids = array.array("I", map(profile_table.__getitem__, numbers))
+            best = array.array("B", map(best_by_profile.__getitem__, profile_ids))
+
+            if counts is None:
+                profile_counts = collections.Counter(profile_ids)
+            else:
+                profile_counts = collections.Counter()
+                for profile_id, count in zip(profile_ids, counts):
+                    profile_counts[profile_id] += count
+
+            prizes = [collections.Counter() for _ in self.results]
+            for profile_id, count in profile_counts.items():
+                for result_prizes, level in zip(prizes, profiles[profile_id]):
+                    result_prizes[level] += count
+
+            # Only the tickets with the 5 numbers of some result need to check the serie
+            full_match = ticket.Cuponazo.number_length
+            i = -1
+            while True:
+                try:
+                    i = best.index(full_match, i + 1)
+                except ValueError:
+                    break
+                count = 1 if counts is None else counts[i]
+                for r, level in enumerate(profiles[profile_ids[i]]):
+                    if level == full_match and series[i] == self.__result_series[r]:
+                        prizes[r][full_match] -= count
+                        prizes[r][full_match + 1] += count
+                        best[i] = full_match + 1
+
+            return best, [
+                {level: n for level, n in sorted(result_prizes.items()) if level and n}
+                for result_prizes in prizes
+            ]
+
+    def __get_profiles(
+        self,
+    ) -> tuple[array.array | memoryview, list[tuple[int, ...]], bytes]:
+        if self.__profile_table is None:
+            with self.__lock:
+                if self.__profile_table is None:
+                    self.__build_profiles()
+
+        return self.__profile_table, self.__profiles, self.__best_by_profile
+
+    def __build_profiles(self) -> None:
+        tables = [checker.prize_table for checker in self.checkers]
+        profile_ids = {}
+        if tables:
+            levels = zip(*tables)
+        else:
+            levels = itertools.repeat((), TicketChecker.table_size)
+
+        profile_table = array.array(
+            "I", (profile_ids.setdefault(p, len(profile_ids)) for p in levels)
+        )
+        self.__set_profiles(profile_table, list(profile_ids))
+
+    def __set_profiles(
+        self, profile_table: array.array | memoryview, profiles: list[tuple[int, ...]]
+    ) -> None:
+        self.__profiles = [tuple(p) for p in profiles]
+        self.__best_by_profile = bytes(max(p, default=0) for p in self.__profiles)
+        self.__profile_table = profile_table
+
+
+class HistoryChecker:
+    """Checks tickets against the results of many draws in a single call, instead of building a `TicketChecker`
+    for every result. The results are indexed by every prefix and suffix of their number, so checking a ticket
+    only looks up its own prefixes and suffixes and visits the results sharing at least one digit with it.
+
+    Draws of several lotteries can be mixed: every lottery (ticket class) has its own index, and tickets are only
+    checked against the results of their own lottery.
+
+    Parameters
+    ----------
+    `draws` (`Iterable[results_history.Draw]`)
+        The draws we want to check tickets against them.
+    """
+
+    def __init__(self, draws: Iterable[results_history.Draw]) -> None:
+        self.draws = list(draws)
+
+        number_length = ticket.Cuponazo.number_length
+        # For every ticket class: its results, and their index by their prefixes (and suffixes) of `n + 1`
+        # digits. A prefix of all the digits is the whole number, there's no need to index the suffixes of that
+        # length.
+        self.__indexes: dict[type[ticket.Cuponazo], tuple[list, list, list]] = {}
+        for draw in self.draws:
+            for result in draw.results:
+                results, prefixes, suffixes = self.__indexes.setdefault(
+                    type(result),
+                    (
+                        [],
+                        [collections.defaultdict(list) for _ in range(number_length)],
+                        [
+                            collections.defaultdict(list)
+                            for _ in range(number_length - 1)
+                        ],
+                    ),
+                )
+                i = len(results)
+                results.append((draw, result))
+                number = result.code // 10**ticket.Cuponazo.serie_length
+                for n, index in enumerate(prefixes):
+                    index[number // 10 ** (number_length - n - 1)].append(i)
+                for n, index in enumerate(suffixes):
+                    index[number % 10 ** (n + 1)].append(i)
+
+    @classmethod
+    def from_history(
+        cls,
+        history: results_history.Interface,
+        start: datetime.date,
+        end: datetime.date,
+        lottery_type: str | None = None,
+    ) -> "HistoryChecker":
+        """Builds a checker for the draws in `history` from `start` to `end` (both included)."""
+        return cls(history.get_draws(start, end, lottery_type))
+
+    def check_ticket(
+        self, t: ticket.Cuponazo
+    ) -> list[tuple[results_history.Draw, ticket.Cuponazo, int]]:
+        """Returns the prize level of `t` against every result of every draw of its lottery, like
+        `TicketChecker.check_ticket`, skipping the results without prize.
+
+        Returns
+        -------
+        `list[tuple[results_history.Draw, ticket.Cuponazo, int]]`
+            The draw, the result and the prize level (from 1 to 6) of every result with prize, in the same order
+            as the draws.
+        """
+        index = self.__indexes.get(type(t))
+        if index is None:
+            return []
+        results, prefixes, suffixes = index
+
+        number_length = ticket.Cuponazo.number_length
+        number = t.code // 10**ticket.Cuponazo.serie_length
+
+        # Longest coincidences first, so every result keeps the best one
+        levels = {}
+        for n in reversed(range(number_length)):
+            for i in prefixes[n].get(number // 10 ** (number_length - n - 1), ()):
+                levels.setdefault(i, n + 1)
+            if n < len(suffixes):
+                for i in suffixes[n].get(number % 10 ** (n + 1), ()):
+                    levels.setdefault(i, n + 1)
+
+        prizes = []
+        for i in sorted(levels):
+            draw, result = results[i]
+            level = levels[i]
+            if level == number_length and result.code == t.code:
+                # Prize to the five numbers and serie
+                level += 1
+            prizes.append((draw, result, level))
+
+        return prizes
 
-        return i
+    def check_tickets(
+        self, tickets: Iterable[ticket.Cuponazo]
+    ) -> list[list[tuple[results_history.Draw, ticket.Cuponazo, int]]]:
+        """Same as `check_ticket` for every ticket in `tickets`, in the same order."""
+        return [self.check_ticket(t) for t in tickets]
 
-    def __reverse_str(self, s: str) -> str:
-        """Returns the string reversed: 'asdf' -> 'fdsa'"""
-        return s[::-1]
+
+def checkers_by_lottery(
+    results: Mapping[str, list[ticket.Cuponazo]],
+) -> dict[str, list[TicketChecker]]:
+    """Returns a `TicketChecker` for every result of every lottery, as returned by
+    `results_fetcher.Interface.fetch_all`.
+    """
+    return {
+        lottery_type: [TicketChecker(result) for result in lottery_results]
+        for lottery_type, lottery_results in results.items()
+    }
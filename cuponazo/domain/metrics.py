@@ -0,0 +1,39 @@
+import contextlib
+from typing import ContextManager
+
+
+class Recorder:
+    """Receives the measurements of the instrumented operations: counters (`increment`) and distributions of
+    values, like latencies (`observe`, `time`). Every measurement has a name and optional labels.
+
+    This base class discards everything, so instrumentation costs a method call while no other recorder is set
+    with `set_recorder`.
+    """
+
+    def increment(self, name: str, value: float = 1, /, **labels: str) -> None:
+        """Adds `value` to the counter `name`."""
+        pass
+
+    def observe(self, name: str, value: float, /, **labels: str) -> None:
+        """Records `value` in the distribution `name`."""
+        pass
+
+    def time(self, name: str, /, **labels: str) -> ContextManager:
+        """Returns a context manager recording the seconds spent in it in the distribution `name`."""
+        return _null_timer
+
+
+_null_timer = contextlib.nullcontext()
+_recorder = Recorder()
+
+
+def get_recorder() -> Recorder:
+    """Returns the recorder used by the instrumented operations."""
+    return _recorder
+
+
+def set_recorder(recorder: Recorder) -> Recorder:
+    """Sets the recorder used by the instrumented operations, returning the previous one."""
+    global _recorder
+    previous, _recorder = _recorder, recorder
+    return previous
@@ -1,5 +1,6 @@
 import abc
 
+from cuponazo.domain import results_history
 from cuponazo.domain import ticket
 
 
@@ -13,3 +14,18 @@ class Interface(metaclass=abc.ABCMeta):
     @abc.abstractclassmethod
     def fetch_cuponazo(self) -> list[ticket.Cuponazo]:
         raise NotImplementedError
+
+    @abc.abstractmethod
+    def fetch_all(self) -> dict[str, list[ticket.Cuponazo]]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fetch_draws(self) -> list[results_history.Draw]:
+        """Returns the latest draw of every lottery, with its date, to be kept in a `results_history`."""
+        raise NotImplementedError
+
+
+class AsyncInterface(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    async def fetch_cuponazo(self) -> list[ticket.Cuponazo]:
+        raise NotImplementedError
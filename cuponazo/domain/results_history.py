@@ -0,0 +1,74 @@
+import abc
+import datetime
+from typing import Iterable
+
+from cuponazo.domain import ticket
+
+
+class Error(Exception):
+    """Raised whenever `ResultsHistory` encountered an issue to read/write draws."""
+
+    pass
+
+
+class Draw:
+    """The results of a single draw of a lottery.
+
+    Parameters
+    ----------
+    `lottery_type` (`str`)
+        The lottery of the draw (`"cuponazo"`, `"cupon_diario"`).
+
+    `date` (`datetime.date`)
+        The day the draw took place.
+
+    `results` (`list[ticket.Cuponazo]`)
+        The winning combinations of the draw.
+    """
+
+    __slots__ = ("lottery_type", "date", "results")
+
+    def __init__(
+        self, lottery_type: str, date: datetime.date, results: list[ticket.Cuponazo]
+    ) -> None:
+        self.lottery_type = lottery_type
+        self.date = date
+        self.results = results
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Draw):
+            return NotImplemented
+        return (self.lottery_type, self.date, self.results) == (
+            other.lottery_type,
+            other.date,
+            other.results,
+        )
+
+    def __repr__(self) -> str:
+        return f"Draw({self.lottery_type!r}, {self.date!r}, {self.results!r})"
+
+
+class Interface(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def add_draws(self, draws: Iterable[Draw]) -> None:
+        """Stores every draw in `draws`, replacing the results of any draw already stored for the same lottery
+        and date.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_draws(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        lottery_type: str | None = None,
+    ) -> list[Draw]:
+        """Returns the draws from `start` to `end` (both included), sorted by date, only of `lottery_type` if
+        it's not `None`.
+        """
+        raise NotImplementedError
+
+    def get_draw(self, date: datetime.date, lottery_type: str) -> Draw | None:
+        """Returns the draw of `lottery_type` on `date`, if it's stored."""
+        draws = self.get_draws(date, date, lottery_type)
+        return draws[0] if draws else None
@@ -8,7 +8,7 @@ class InvalidFormatError(Exception):
 
 
 class Cuponazo:
-    """Represents a ticket of Cuponazo lottery.
+    """Represents a ticket of Cuponazo lottery. Internally the ticket is stored as a single integer (see `code`).
 
     Parameters
     ----------
@@ -24,32 +24,93 @@ class Cuponazo:
         If the parameters doesn't fit the specifications.
     """
 
+    __slots__ = ("__code",)
+
     number_length = 5
     serie_length = 3
 
-    def __init__(self, number: str, serie: str) -> None:
-        number_regex = r"^[0-9]{%s}$" % self.number_length
-        serie_regex = r"^[0-9]{%s}$" % self.serie_length
+    number_regex = r"^[0-9]{%s}$" % number_length
+    serie_regex = r"^[0-9]{%s}$" % serie_length
 
-        if not re.match(number_regex, number):
+    __number_pattern = re.compile(number_regex)
+    __serie_pattern = re.compile(serie_regex)
+    __serie_base = 10**serie_length
+
+    def __init__(self, number: str, serie: str) -> None:
+        if not self.__number_pattern.match(number):
             raise InvalidFormatError(
-                f"Number '{number}' has an invalid format. Number should match r'{number_regex}' regex."
+                f"Number '{number}' has an invalid format. Number should match r'{self.number_regex}' regex."
             )
-        self.__number = number
 
-        if not re.match(serie_regex, serie):
+        if not self.__serie_pattern.match(serie):
             raise InvalidFormatError(
-                f"Serie '{serie}' has an invalid format. Serie should match r'{serie_regex}' regex."
+                f"Serie '{serie}' has an invalid format. Serie should match r'{self.serie_regex}' regex."
             )
-        self.__serie = serie
+
+        self.__code = int(number) * self.__serie_base + int(serie)
+
+    @classmethod
+    def from_trusted(cls, number: str, serie: str) -> "Cuponazo":
+        """Builds a ticket skipping the format validation. Only meant for data that it's already been validated,
+        like the tickets we stored ourselves.
+        """
+        return cls.from_code(int(number) * cls.__serie_base + int(serie))
+
+    @classmethod
+    def from_code(cls, code: int) -> "Cuponazo":
+        """Builds a ticket from its integer encoding (see `code`), skipping the format validation."""
+        t = cls.__new__(cls)
+        t.__code = code
+        return t
 
     def __eq__(self, __value: object) -> bool:
-        return self.number == __value.number and self.serie == __value.serie
+        # Tickets of different lotteries are never equal
+        if type(__value) is not type(self):
+            return NotImplemented
+        return self.__code == __value.__code
+
+    def __hash__(self) -> int:
+        return hash(self.__code)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.number!r}, {self.serie!r})"
+
+    def __reduce__(self):
+        return (type(self).from_code, (self.__code,))
+
+    @property
+    def code(self) -> int:
+        """The ticket encoded as an integer: `number * 1000 + serie`."""
+        return self.__code
 
     @property
     def number(self) -> str:
-        return self.__number
+        return f"{self.__code // self.__serie_base:0{self.number_length}d}"
 
     @property
     def serie(self) -> str:
-        return self.__serie
+        return f"{self.__code % self.__serie_base:0{self.serie_length}d}"
+
+
+class CuponDiario(Cuponazo):
+    """Represents a ticket of Cupón Diario lottery. It has the same format as `Cuponazo`.
+
+    Parameters
+    ----------
+    `number` (`str`)
+        A string of 5 numbers, represents the main extractions of the lottery.
+
+    `serie` (`str`)
+        A string of 3 numbers, represent the extra extraction required for the main prize.
+
+    Raises
+    ------
+    `InvalidFormatError`
+        If the parameters doesn't fit the specifications.
+    """
+
+    __slots__ = ()
+
+
+# Ticket type of every lottery, by the name used to store and fetch its results
+lottery_tickets = {"cuponazo": Cuponazo, "cupon_diario": CuponDiario}
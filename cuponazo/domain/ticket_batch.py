@@ -0,0 +1,158 @@
+import array
+import collections
+import sys
+from typing import Iterable, Iterator
+
+from cuponazo.domain import ticket
+
+# Every Cuponazo code (see `ticket.Cuponazo.code`) fits in 4 bytes
+typecode = next(tc for tc in "IL" if array.array(tc).itemsize == 4)
+
+
+class TicketBatch:
+    """Columnar container of `ticket.Cuponazo` tickets. Instead of one Python object per ticket it keeps the
+    integer code of every ticket (see `ticket.Cuponazo.code`) in a contiguous `array.array`, using 4 bytes per
+    ticket. Tickets are only materialized when iterating or indexing the batch.
+
+    All the tickets of a batch belong to the same lottery: they're materialized as `ticket_type`.
+
+    Parameters
+    ----------
+    `codes` (`Iterable[int]`)
+        The integer codes of the tickets in the batch.
+
+    `ticket_type` (`type[ticket.Cuponazo]`)
+        The class of the tickets in the batch, like `ticket.Cuponazo` or `ticket.CuponDiario`.
+    """
+
+    def __init__(
+        self,
+        codes: Iterable[int] = (),
+        ticket_type: type[ticket.Cuponazo] = ticket.Cuponazo,
+    ) -> None:
+        self.codes = array.array(typecode, codes)
+        self.ticket_type = ticket_type
+
+    @classmethod
+    def from_tickets(
+        cls,
+        tickets: Iterable[ticket.Cuponazo],
+        ticket_type: type[ticket.Cuponazo] | None = None,
+    ) -> "TicketBatch":
+        """Builds a batch from a list (or any iterable) of tickets of the same lottery.
+
+        Parameters
+        ----------
+        `ticket_type` (`type[ticket.Cuponazo] | None`)
+            The class of the tickets. If `None`, the class of the first ticket (`ticket.Cuponazo` for no
+            tickets).
+
+        Raises
+        ------
+        `TypeError`
+            If any ticket isn't a `ticket_type`.
+        """
+        if isinstance(tickets, TicketBatch):
+            if ticket_type is not None and tickets.ticket_type is not ticket_type:
+                raise TypeError(
+                    f"Expected {ticket_type.__name__} tickets, got {tickets.ticket_type.__name__} ones"
+                )
+            return cls(tickets.codes, tickets.ticket_type)
+
+        if not isinstance(tickets, (list, tuple)):
+            tickets = list(tickets)
+        if ticket_type is None:
+            ticket_type = type(tickets[0]) if tickets else ticket.Cuponazo
+        for t in tickets:
+            if type(t) is not ticket_type:
+                raise TypeError(f"Expected {ticket_type.__name__} tickets, got {t!r}")
+        return cls((t.code for t in tickets), ticket_type)
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data: bytes | memoryview,
+        ticket_type: type[ticket.Cuponazo] = ticket.Cuponazo,
+    ) -> "TicketBatch":
+        """Builds a batch from the output of `to_bytes` (or any buffer with the same layout)."""
+        batch = cls(ticket_type=ticket_type)
+        batch.codes.frombytes(data)
+        if sys.byteorder == "big":
+            batch.codes.byteswap()
+        return batch
+
+    def to_list(self) -> list[ticket.Cuponazo]:
+        """Returns the tickets of the batch as a list of `ticket.Cuponazo`."""
+        return list(self)
+
+    def to_bytes(self) -> bytes:
+        """Serializes the batch as 4 bytes little endian unsigned integers, one per ticket."""
+        if sys.byteorder == "big":
+            codes = array.array(typecode, self.codes)
+            codes.byteswap()
+            return codes.tobytes()
+        return self.codes.tobytes()
+
+    def memoryview(self) -> memoryview:
+        """Returns a read-only view on the codes buffer, to write the batch somewhere without copying it. The
+        view has the byte order of the running platform (`to_bytes` always uses little endian).
+        """
+        return memoryview(self.codes).toreadonly()
+
+    def split(self) -> tuple[array.array, array.array]:
+        """Returns the numbers and the series of the tickets in the batch, as two integer arrays."""
+        serie_base = 10**ticket.Cuponazo.serie_length
+        return (
+            array.array("L", [code // serie_base for code in self.codes]),
+            array.array("H", [code % serie_base for code in self.codes]),
+        )
+
+    def dedup(self) -> "TicketBatch":
+        """Returns a new batch without repeated tickets, keeping the order of their first appearance."""
+        return TicketBatch(dict.fromkeys(self.codes), self.ticket_type)
+
+    def counts(self) -> tuple["TicketBatch", array.array]:
+        """Collapses the batch into a multiset: the tickets without repetitions, in order of first appearance,
+        and how many times every one of them appears in the batch.
+
+        Returns
+        -------
+        `tuple[TicketBatch, array.array]`
+            The distinct tickets and an integer array with the count of each of them, in the same order.
+        """
+        counter = collections.Counter(self.codes)
+        return (
+            TicketBatch(counter.keys(), self.ticket_type),
+            array.array(typecode, counter.values()),
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[ticket.Cuponazo]:
+        return map(self.ticket_type.from_code, self.codes)
+
+    def __getitem__(self, key: int | slice) -> "ticket.Cuponazo | TicketBatch":
+        if isinstance(key, slice):
+            return TicketBatch(self.codes[key], self.ticket_type)
+        return self.ticket_type.from_code(self.codes[key])
+
+    def __contains__(self, t: object) -> bool:
+        return type(t) is self.ticket_type and t.code in self.codes
+
+    def __add__(self, other: "TicketBatch") -> "TicketBatch":
+        if not isinstance(other, TicketBatch):
+            return NotImplemented
+        if other.ticket_type is not self.ticket_type:
+            raise TypeError(
+                f"Can't join {self.ticket_type.__name__} and {other.ticket_type.__name__} tickets"
+            )
+        return TicketBatch(self.codes + other.codes, self.ticket_type)
+
+    def __eq__(self, __value: object) -> bool:
+        if not isinstance(__value, TicketBatch):
+            return NotImplemented
+        return self.ticket_type is __value.ticket_type and self.codes == __value.codes
+
+    def __repr__(self) -> str:
+        return f"TicketBatch({len(self)} {self.ticket_type.__name__} tickets)"
@@ -0,0 +1,65 @@
+import abc
+from typing import Iterable
+
+from cuponazo.domain import ticket
+
+
+class Error(Exception):
+    """Raised whenever `TicketIndex` encountered an issue to read/write the index."""
+
+    pass
+
+
+def index_keys(t: ticket.Cuponazo) -> list[str]:
+    """Returns the keys a ticket is indexed under: every prefix (`p<n>:`) and suffix (`s<n>:`) of its number
+    that gives a prize when matching the result (see `ticket_checker.TicketChecker`), its full number (`n:`)
+    and its number and serie (`c:`).
+    """
+    number = t.number
+    keys = []
+    for n in range(1, ticket.Cuponazo.number_length):
+        keys.append(f"p{n}:{number[:n]}")
+        keys.append(f"s{n}:{number[-n:]}")
+    keys.append(f"n:{number}")
+    keys.append(f"c:{number}{t.serie}")
+
+    return keys
+
+
+def winner_keys(result: ticket.Cuponazo, min_level: int) -> list[str]:
+    """Returns the keys under which are indexed all the tickets winning a prize level of `min_level` or better
+    against `result`.
+    """
+    if min_level <= ticket.Cuponazo.number_length - 1 and min_level > 0:
+        return [
+            f"p{min_level}:{result.number[:min_level]}",
+            f"s{min_level}:{result.number[-min_level:]}",
+        ]
+    if min_level == ticket.Cuponazo.number_length:
+        return [f"n:{result.number}"]
+    if min_level == ticket.Cuponazo.number_length + 1:
+        return [f"c:{result.number}{result.serie}"]
+
+    raise ValueError(
+        f"Prize level should be between 1 and {ticket.Cuponazo.number_length + 1}, got {min_level}"
+    )
+
+
+class Interface(metaclass=abc.ABCMeta):
+    """Secondary index from the keys of the tickets (see `index_keys`) to the ids owning them."""
+
+    @abc.abstractmethod
+    def add_tickets(self, ticket_id: str, tickets: Iterable[ticket.Cuponazo]) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_ids_by_key(self, key: str) -> set[str]:
+        raise NotImplementedError
+
+    def find_winners(self, result: ticket.Cuponazo, min_level: int) -> set[str]:
+        """Returns the ids owning a ticket that wins a prize level of `min_level` or better against `result`."""
+        winners = set()
+        for key in winner_keys(result, min_level):
+            winners |= self.get_ids_by_key(key)
+
+        return winners
@@ -1,6 +1,8 @@
 import abc
+from typing import Iterable, Iterator, Mapping
 
 from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
 
 
 class Error(Exception):
@@ -17,3 +19,46 @@ class Interface(metaclass=abc.ABCMeta):
     @abc.abstractclassmethod
     def add_ticket_to_id(self, ticket_id: str, ticket: ticket.Cuponazo) -> None:
         raise NotImplementedError
+
+    def get_ticket_batch_by_id(self, ticket_id: str) -> ticket_batch.TicketBatch:
+        """Same as `get_tickets_by_id` but returning a `ticket_batch.TicketBatch`. Implementations able to
+        decode their storage straight into a batch should override it.
+        """
+        return ticket_batch.TicketBatch.from_tickets(self.get_tickets_by_id(ticket_id))
+
+    def add_tickets_to_id(
+        self,
+        ticket_id: str,
+        tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch,
+    ) -> None:
+        """Adds all the `tickets` to `ticket_id`. Implementations able to store several tickets at once should
+        override it.
+        """
+        for t in tickets:
+            self.add_ticket_to_id(ticket_id, t)
+
+    def get_tickets_by_ids(
+        self, ticket_ids: Iterable[str]
+    ) -> dict[str, ticket_batch.TicketBatch]:
+        """Returns the tickets of every id in `ticket_ids`. Implementations able to read several ids at once
+        should override it.
+        """
+        return {
+            ticket_id: self.get_ticket_batch_by_id(ticket_id)
+            for ticket_id in ticket_ids
+        }
+
+    def add_tickets(
+        self,
+        tickets: Mapping[str, Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch],
+    ) -> None:
+        """Adds the tickets of every id in `tickets`. Implementations able to write several ids at once should
+        override it.
+        """
+        for ticket_id, id_tickets in tickets.items():
+            self.add_tickets_to_id(ticket_id, id_tickets)
+
+    @abc.abstractmethod
+    def iter_ticket_ids(self, page_size: int = 100) -> Iterator[list[str]]:
+        """Yields all the ids with tickets, in pages of up to `page_size` ids."""
+        raise NotImplementedError
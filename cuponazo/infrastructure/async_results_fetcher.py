@@ -0,0 +1,118 @@
+import asyncio
+import random
+import urllib.parse
+
+from cuponazo.domain import results_fetcher
+from cuponazo.domain import ticket
+from cuponazo.infrastructure.results_fetcher import ResultsFetcher
+
+
+def is_retryable(err: results_fetcher.Error) -> bool:
+    """Returns whether the request failing with `err` could succeed if it's done again: it failed because of the
+    network, a timeout, a malformed response or a 5xx response.
+    """
+    import http.client
+    import urllib.error
+
+    cause = err.__cause__
+    if isinstance(cause, urllib.error.HTTPError):
+        return cause.code >= http.HTTPStatus.INTERNAL_SERVER_ERROR.value
+    return isinstance(cause, (OSError, http.client.HTTPException))
+
+
+class AsyncResultsFetcher(results_fetcher.AsyncInterface):
+    """asyncio counterpart of `results_fetcher.ResultsFetcher`. Requests are done by a `ResultsFetcher` in a
+    worker thread (see `asyncio.to_thread`), so they don't block the event loop, and the ones failing because of
+    the network, a timeout or a 5xx response (see `is_retryable`) are retried with a jittered exponential
+    backoff. Fetches don't wait for each other, even on the same fetcher (see `gather_cuponazo`).
+
+    Parameters
+    ----------
+    `url` (`str`)
+        URL for the Juegosonce endpoint with latests results.
+
+    `timeout` (`float`)
+        Seconds to wait for the connection and for every read of the response.
+
+    `retries` (`int`)
+        Times a request is retried when it fails because of the network, a timeout or a 5xx response.
+
+    `backoff` (`float`)
+        Upper bound, in seconds, of the random wait before the first retry. It's doubled on every retry.
+
+    `max_age` (`float`), `cache_path` (`str | None`)
+        Caching of the results, see `ResultsFetcher`.
+
+    Raises
+    ------
+    `ValueError`
+        If the scheme of `url` isn't HTTP(S).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 10,
+        retries: int = 3,
+        backoff: float = 0.2,
+        max_age: float = 0,
+        cache_path: str | None = None,
+    ) -> None:
+        scheme = urllib.parse.urlsplit(url).scheme
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: '{scheme}'")
+
+        self.url = url
+        self.retries = retries
+        self.backoff = backoff
+        self.fetcher = ResultsFetcher(
+            url, max_age=max_age, cache_path=cache_path, timeout=timeout
+        )
+
+    async def __aenter__(self) -> "AsyncResultsFetcher":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def fetch_cuponazo(self) -> list[ticket.Cuponazo]:
+        """Fetches restulsts from `self.url` and returns a list of `ticket.Cuponazo` with the winning combination.
+
+        Returns
+        -------
+        `list[ticket.Cuponazo]`
+            List with the result of the latest Cuponazo lottery.
+        """
+        return await self.__retry(self.fetcher.fetch_cuponazo)
+
+    async def close(self) -> None:
+        """Kept for the callers closing their fetchers, there's nothing to release as every request uses its own
+        connection.
+        """
+        pass
+
+    async def __retry(self, fetch):
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(
+                    random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                )
+
+            try:
+                return await asyncio.to_thread(fetch)
+            except results_fetcher.Error as err:
+                if attempt == self.retries or not is_retryable(err):
+                    raise
+
+
+async def gather_cuponazo(
+    *fetchers: results_fetcher.AsyncInterface,
+) -> list[list[ticket.Cuponazo]]:
+    """Fetches the Cuponazo results of all the `fetchers` concurrently.
+
+    Returns
+    -------
+    `list[list[ticket.Cuponazo]]`
+        The results of every fetcher, in the same order as `fetchers`.
+    """
+    return await asyncio.gather(*(f.fetch_cuponazo() for f in fetchers))
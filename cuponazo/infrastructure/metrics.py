@@ -0,0 +1,179 @@
+import bisect
+import socket
+import threading
+import time
+
+from cuponazo.domain import metrics
+
+# Upper bounds (in seconds) of the buckets of the histograms, like the default ones of Prometheus clients
+default_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Timer:
+    """Context manager observing the seconds spent in it with `recorder.observe`."""
+
+    __slots__ = ("recorder", "name", "labels", "start")
+
+    def __init__(self, recorder: metrics.Recorder, name: str, labels: dict) -> None:
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.recorder.observe(
+            self.name, time.perf_counter() - self.start, **self.labels
+        )
+
+
+class Registry(metrics.Recorder):
+    """In-process recorder aggregating the measurements: a total for every counter and a histogram for every
+    distribution, for every set of labels. They're exported with `export_prometheus`.
+
+    Parameters
+    ----------
+    `buckets` (`tuple[float, ...]`)
+        Sorted upper bounds of the buckets of the histograms.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = default_buckets) -> None:
+        self.buckets = buckets
+        self.__lock = threading.Lock()
+        self.__counters: dict[tuple[str, tuple], float] = {}
+        # Count of every bucket (the last one is +Inf), sum and count of every histogram
+        self.__histograms: dict[tuple[str, tuple], list] = {}
+
+    def increment(self, name: str, value: float = 1, /, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, /, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            histogram[0][bucket] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def time(self, name: str, /, **labels: str) -> Timer:
+        return Timer(self, name, labels)
+
+    def get_counter(self, name: str, /, **labels: str) -> float:
+        """Returns the total of the counter `name` with exactly `labels`."""
+        with self.__lock:
+            return self.__counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def get_histogram(self, name: str, /, **labels: str) -> tuple[int, float]:
+        """Returns the amount and the sum of the values observed in `name` with exactly `labels`."""
+        with self.__lock:
+            histogram = self.__histograms.get((name, tuple(sorted(labels.items()))))
+            if histogram is None:
+                return 0, 0.0
+            return histogram[2], histogram[1]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__counters.clear()
+            self.__histograms.clear()
+
+    def export_prometheus(self) -> str:
+        """Returns all the measurements in the Prometheus text exposition format."""
+        with self.__lock:
+            counters = sorted(self.__counters.items())
+            histograms = sorted(
+                (key, ([*counts], total, count))
+                for key, (counts, total, count) in self.__histograms.items()
+            )
+
+        lines = []
+        last_name = None
+        for (name, labels), value in counters:
+            if name != last_name:
+                lines.append(f"# TYPE {name} counter")
+                last_name = name
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), (counts, total, count) in histograms:
+            if name != last_name:
+                lines.append(f"# TYPE {name} histogram")
+                last_name = name
+            cumulative = 0
+            for bound, bucket_count in zip(
+                [*map("{:g}".format, self.buckets), "+Inf"], counts
+            ):
+                cumulative += bucket_count
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+class StatsdRecorder(metrics.Recorder):
+    """Recorder sending every measurement to a StatsD server over UDP, as they happen. Counters are sent as
+    `c`, durations (distributions named `*_seconds`) as `ms` and any other distribution as `h`. Labels are sent
+    as DogStatsD tags. Errors sending are ignored, metrics never break the instrumented operation.
+
+    Parameters
+    ----------
+    `host` (`str`)
+
+    `port` (`int`)
+
+    `prefix` (`str`)
+        Prepended to the name of every measurement.
+    """
+
+    def __init__(
+        self, host: str = "localhost", port: int = 8125, prefix: str = "cuponazo."
+    ) -> None:
+        self.address = (host, port)
+        self.prefix = prefix
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def close(self) -> None:
+        self.__socket.close()
+
+    def increment(self, name: str, value: float = 1, /, **labels: str) -> None:
+        self.__send(name, value, "c", labels)
+
+    def observe(self, name: str, value: float, /, **labels: str) -> None:
+        if name.endswith("_seconds"):
+            self.__send(name[: -len("_seconds")], value * 1000, "ms", labels)
+        else:
+            self.__send(name, value, "h", labels)
+
+    def time(self, name: str, /, **labels: str) -> Timer:
+        return Timer(self, name, labels)
+
+    def __send(self, name: str, value: float, metric_type: str, labels: dict) -> None:
+        line = f"{self.prefix}{name}:{value:g}|{metric_type}"
+        if labels:
+            line += "|#" + ",".join(f"{k}:{v}" for k, v in sorted(labels.items()))
+        try:
+            self.__socket.sendto(line.encode(), self.address)
+        except OSError:
+            pass
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
@@ -1,13 +1,54 @@
+import datetime
 import http
-import urllib.error
-import urllib.request
-
-import xmltodict
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Iterator
 
+from cuponazo.domain import metrics
 from cuponazo.domain import results_fetcher
+from cuponazo.domain import results_history
 from cuponazo.domain import ticket
 
+if TYPE_CHECKING:
+    # Imported when a request is done, importing urllib.request takes longer than the rest of this module
+    import urllib.request
+
 lottery_names = {"cuponazo": "Cuponazo", "cupon_diario": "Cup&oacute;n Diario"}
+lottery_types = {name: lottery_type for lottery_type, name in lottery_names.items()}
+
+
+def get_items_from_response(r: bytes) -> list[dict[str, str]]:
+    """Returns the `item` elements of a juegosonce XML response as dicts."""
+    # Imported when needed, like urllib and ElementTree, so importing this module stays cheap
+    import xmltodict
+
+    try:
+        items = xmltodict.parse(r)["items"]["item"]
+
+    # This raises too many kinds of Exceptions... Let's catch all.
+    except Exception as err:
+        raise results_fetcher.Error(
+            f"Got an issue parsing juegosonce XML response: {str(err)}"
+        )
+
+    if type(items) is not type([]):
+        return [items]
+    else:
+        return items
+
+
+def parse_draw_date(fecha: str) -> datetime.date:
+    """Returns the date of a juegosonce `fecha` element, like `"Viernes, 08/09/2023"`."""
+    try:
+        return datetime.datetime.strptime(
+            fecha.rpartition(",")[2].strip(), "%d/%m/%Y"
+        ).date()
+    except ValueError as err:
+        raise results_fetcher.Error(
+            f"Got an invalid draw date from juegosonce: {fecha!r}"
+        ) from err
 
 
 class ResultsFetcher(results_fetcher.Interface):
@@ -17,10 +58,39 @@ class ResultsFetcher(results_fetcher.Interface):
     ----------
     `url` (`str`)
         URL for the Juegosonce endpoint with latests results.
+
+    `max_age` (`float`)
+        Seconds the parsed results are considered fresh and returned without requesting them again. Once they
+        are stale they're revalidated with a conditional request (using the `ETag`/`Last-Modified` of the last
+        response), and reused if the server answers with `304 Not Modified`.
+
+    `cache_path` (`str | None`)
+        File where the parsed results and their validators are kept, so they survive between processes. If
+        `None` they're only kept in memory.
+
+    `timeout` (`float | None`)
+        Seconds to wait for the connection and for every read of the response, or the default socket timeout if
+        `None`.
+
+    `clock` (`Callable[[], float]`)
+        Returns the current time in seconds, only meant to be replaced in tests.
     """
 
-    def __init__(self, url: str) -> None:
+    def __init__(
+        self,
+        url: str,
+        max_age: float = 0,
+        cache_path: str | None = None,
+        timeout: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
         self.url = url
+        self.max_age = max_age
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self.clock = clock
+        self.__cache = None
+        self.__cache_lock = threading.Lock()
 
     def fetch_cuponazo(self) -> list[ticket.Cuponazo]:
         """Fetches restulsts from `self.url` and returns a list of `ticket.Cuponazo` with the winning combination.
@@ -35,36 +105,242 @@ class ResultsFetcher(results_fetcher.Interface):
             for item in self.__fetch("cuponazo")
         ]
 
-    def __fetch(self, lottery_type: str) -> list[dict[str, str]]:
+    def fetch_cupon_diario(self) -> list[ticket.CuponDiario]:
+        """Fetches restulsts from `self.url` and returns a list of `ticket.CuponDiario` with the winning
+        combination.
+
+        Returns
+        -------
+        `list[ticket.CuponDiario]`
+            List with the result of the latest Cupón Diario lottery.
+        """
+        return self.fetch_all()["cupon_diario"]
+
+    def fetch_all(self) -> dict[str, list[ticket.Cuponazo]]:
+        """Fetches restulsts from `self.url` once and returns the results of every lottery in `lottery_names`,
+        routing every item of the feed to the ticket type of its lottery in `ticket.lottery_tickets`. Items of
+        other lotteries are ignored.
+
+        Returns
+        -------
+        `dict[str, list[ticket.Cuponazo]]`
+            The results of the latest draw of every lottery, by lottery type (`"cuponazo"`, `"cupon_diario"`).
+            Lotteries missing in the feed have an empty list.
+        """
+        results = {lottery_type: [] for lottery_type in lottery_names}
+        for item in self.__fetch_items():
+            lottery_type = lottery_types.get(item["tipo"])
+            if lottery_type is not None:
+                results[lottery_type].append(
+                    ticket.lottery_tickets[lottery_type](item["numero"], item["serie"])
+                )
+
+        return results
+
+    def fetch_draws(self) -> list[results_history.Draw]:
+        """Same as `fetch_all`, but grouping the results of every lottery by the date of their draw.
+
+        Returns
+        -------
+        `list[results_history.Draw]`
+            The draws in the feed, in the order they appear on it.
+        """
+        draws = {}
+        for item in self.__fetch_items():
+            lottery_type = lottery_types.get(item["tipo"])
+            if lottery_type is None:
+                continue
+
+            date = parse_draw_date(item["fecha"])
+            draw = draws.setdefault(
+                (lottery_type, date), results_history.Draw(lottery_type, date, [])
+            )
+            draw.results.append(
+                ticket.lottery_tickets[lottery_type](item["numero"], item["serie"])
+            )
+
+        return list(draws.values())
+
+    def iter_cuponazo(self) -> Iterator[ticket.Cuponazo]:
+        """Same as `fetch_cuponazo`, but the response is parsed incrementally while it's read, yielding every
+        result as soon as its `item` is parsed and discarding the items of other lotteries on the way.
+
+        The results are always requested, and not cached, as this is meant for big feeds.
+
+        Yields
+        ------
+        `ticket.Cuponazo`
+            The results of the latest Cuponazo lottery.
+        """
+        for item in self.__iter_items("cuponazo"):
+            yield ticket.Cuponazo(item["numero"], item["serie"])
+
+    def __open(self, request: "str | urllib.request.Request"):
+        import http.client
+        import urllib.request
+
         try:
-            resp = urllib.request.urlopen(self.url)
-        except urllib.error.URLError as err:
+            if self.timeout is None:
+                resp = urllib.request.urlopen(request)
+            else:
+                resp = urllib.request.urlopen(request, timeout=self.timeout)
+        # URLError and HTTPError are OSErrors too, HTTPException is raised on malformed responses
+        except (OSError, http.client.HTTPException) as err:
             raise results_fetcher.Error(
-                f"Unable to request juegosonce results: {str(err)}"
+                f"Unable to request juegosonce results: {type(err).__name__}: {str(err)}"
+            ) from err
+
+        if resp.code != http.HTTPStatus.OK.value:
+            resp.close()
+            raise results_fetcher.Error(
+                f"Invalid response from juegosonce:{resp.reason}({resp.code})"
             )
 
-        if resp.code is not http.HTTPStatus.OK.value:
+        return resp
+
+    def __read(self, resp) -> bytes:
+        import http.client
+
+        try:
+            return resp.read()
+        except (OSError, http.client.HTTPException) as err:
+            raise results_fetcher.Error(
+                f"Unable to read juegosonce results: {type(err).__name__}: {str(err)}"
+            ) from err
+        finally:
+            resp.close()
+
+    def __iter_items(self, lottery_type: str) -> Iterator[dict[str, str]]:
+        import http.client
+        from xml.etree import ElementTree
+
+        resp = self.__open(self.url)
+        try:
+            events = ElementTree.iterparse(resp, events=("start", "end"))
+            _, root = next(events)
+            for event, element in events:
+                if event != "end" or element.tag != "item":
+                    continue
+
+                item = {child.tag: child.text or "" for child in element}
+                # Drop the parsed items, we only keep the ones we yield
+                root.clear()
+                if item.get("tipo") == lottery_names[lottery_type]:
+                    yield item
+
+        except ElementTree.ParseError as err:
             raise results_fetcher.Error(
-                f"Invalid response from juegosonce:{resp.reason}({resp.status_code})"
+                f"Got an issue parsing juegosonce XML response: {str(err)}"
             )
+        except (OSError, http.client.HTTPException) as err:
+            raise results_fetcher.Error(
+                f"Unable to read juegosonce results: {type(err).__name__}: {str(err)}"
+            ) from err
+        finally:
+            resp.close()
 
+    def __fetch(self, lottery_type: str) -> list[dict[str, str]]:
         return [
             item
-            for item in self.__get_items_from_response(resp.read())
+            for item in self.__fetch_items()
             if item["tipo"] == lottery_names[lottery_type]
         ]
 
-    def __get_items_from_response(self, r: bytes) -> list[dict[str, str]]:
+    def __fetch_items(self) -> list[dict[str, str]]:
+        """Returns all the items of the feed, from the cache if they're fresh or still valid.
+
+        It's instrumented (see `metrics.set_recorder`): the time to request and read the feed is recorded in
+        `results_fetch_seconds`, the time to parse it in `results_parse_seconds`, its size and items in
+        `results_bytes_total` and `results_items_total`, and how the cache was used in `results_cache_total`.
+        """
+        import urllib.error
+        import urllib.request
+
+        recorder = metrics.get_recorder()
+        # The lock only guards the cache, concurrent callers don't wait for each other's requests
+        with self.__cache_lock:
+            cache = self.__load_cache()
+            now = self.clock()
+            if cache is not None and now - cache["fetched_at"] < self.max_age:
+                recorder.increment("results_cache_total", result="fresh")
+                return cache["items"]
+
+        request = self.url
+        if cache is not None:
+            headers = {}
+            if cache["etag"] is not None:
+                headers["If-None-Match"] = cache["etag"]
+            if cache["last_modified"] is not None:
+                headers["If-Modified-Since"] = cache["last_modified"]
+            if headers:
+                request = urllib.request.Request(self.url, headers=headers)
+
         try:
-            items = xmltodict.parse(r)["items"]["item"]
+            with recorder.time("results_fetch_seconds"):
+                resp = self.__open(request)
+                body = self.__read(resp)
+        except results_fetcher.Error as err:
+            if (
+                isinstance(err.__cause__, urllib.error.HTTPError)
+                and err.__cause__.code == http.HTTPStatus.NOT_MODIFIED.value
+                and cache is not None
+            ):
+                recorder.increment("results_cache_total", result="not_modified")
+                self.__store_newer_cache({**cache, "fetched_at": now})
+                return cache["items"]
+            recorder.increment("results_errors_total", stage="fetch")
+            raise
 
-        # This raises too many kinds of Exceptions... Let's catch all.
-        except Exception as err:
-            raise results_fetcher.Error(
-                f"Got an issue parsing juegosonce XML response: {str(err)}"
-            )
+        recorder.increment("results_cache_total", result="miss")
+        recorder.increment("results_bytes_total", len(body))
+        try:
+            with recorder.time("results_parse_seconds"):
+                items = get_items_from_response(body)
+        except results_fetcher.Error:
+            recorder.increment("results_errors_total", stage="parse")
+            raise
+        recorder.increment("results_items_total", len(items))
+        self.__store_newer_cache(
+            {
+                "url": self.url,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "fetched_at": now,
+                "items": items,
+            }
+        )
+        return items
+
+    def __store_newer_cache(self, cache: dict) -> None:
+        with self.__cache_lock:
+            # Another caller could have stored a newer response while this one was requested
+            current = self.__cache
+            if current is None or current["fetched_at"] <= cache["fetched_at"]:
+                self.__store_cache(cache)
 
-        if type(items) is not type([]):
-            return [items]
-        else:
-            return items
+    def __load_cache(self) -> dict | None:
+        if self.__cache is None and self.cache_path is not None:
+            try:
+                with open(self.cache_path) as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                # A missing or broken cache is just a cache miss
+                return None
+            if cache.get("url") == self.url:
+                self.__cache = cache
+
+        return self.__cache
+
+    def __store_cache(self, cache: dict) -> None:
+        self.__cache = cache
+        if self.cache_path is None:
+            return
+
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # We still have the in-memory cache
+            pass
@@ -0,0 +1,117 @@
+import datetime
+import itertools
+import sqlite3
+import threading
+from typing import Iterable
+
+from cuponazo.domain import results_history
+from cuponazo.domain import ticket
+
+
+class ResultsHistory(results_history.Interface):
+    """Keeps the results of every draw in a local SQLite database.
+
+    Every result is a row keyed by the date of the draw, its lottery and its position in the draw, so the
+    primary key is a B-tree sorted by date: looking up a date (or the start of a range) is O(log n). Another
+    index by lottery and date does the same for ranges of a single lottery.
+
+    Parameters
+    ----------
+    `path` (`str`)
+        Path of the database file, created if it doesn't exist. Use `":memory:"` for a database that only lives
+        as long as the history.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS results (
+            draw_date TEXT NOT NULL,
+            lottery_type TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            code INTEGER NOT NULL,
+            PRIMARY KEY (draw_date, lottery_type, position)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS results_by_lottery ON results (lottery_type, draw_date);
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # The connection is shared by every thread, serialized by the lock
+        self.__lock = threading.Lock()
+        try:
+            self.__db = sqlite3.connect(path, check_same_thread=False)
+            self.__db.execute("PRAGMA journal_mode = WAL")
+            self.__db.executescript(self.schema)
+        except sqlite3.Error as err:
+            raise results_history.Error(f"Problem opening '{path}': {err}")
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__db.close()
+
+    def __enter__(self) -> "ResultsHistory":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add_draws(self, draws: Iterable[results_history.Draw]) -> None:
+        """Stores every draw in `draws` in a single transaction, replacing the results of any draw already
+        stored for the same lottery and date.
+        """
+        draws = list(draws)
+        with self.__lock:
+            try:
+                with self.__db:
+                    self.__db.executemany(
+                        "DELETE FROM results WHERE draw_date = ? AND lottery_type = ?",
+                        [(d.date.isoformat(), d.lottery_type) for d in draws],
+                    )
+                    self.__db.executemany(
+                        "INSERT INTO results (draw_date, lottery_type, position, code) VALUES (?, ?, ?, ?)",
+                        [
+                            (d.date.isoformat(), d.lottery_type, position, r.code)
+                            for d in draws
+                            for position, r in enumerate(d.results)
+                        ],
+                    )
+            except sqlite3.Error as err:
+                raise results_history.Error(
+                    f"Problem saving draws to '{self.path}': {err}"
+                )
+
+    def get_draws(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        lottery_type: str | None = None,
+    ) -> list[results_history.Draw]:
+        query = "SELECT draw_date, lottery_type, code FROM results WHERE draw_date BETWEEN ? AND ?"
+        parameters = [start.isoformat(), end.isoformat()]
+        if lottery_type is not None:
+            query += " AND lottery_type = ?"
+            parameters.append(lottery_type)
+        query += " ORDER BY draw_date, lottery_type, position"
+
+        with self.__lock:
+            try:
+                rows = self.__db.execute(query, parameters).fetchall()
+            except sqlite3.Error as err:
+                raise results_history.Error(
+                    f"Problem getting draws from '{self.path}': {err}"
+                )
+
+        return [
+            results_history.Draw(
+                draw_lottery_type,
+                datetime.date.fromisoformat(draw_date),
+                [
+                    ticket.lottery_tickets.get(
+                        draw_lottery_type, ticket.Cuponazo
+                    ).from_code(code)
+                    for _, _, code in draw_rows
+                ],
+            )
+            for (draw_date, draw_lottery_type), draw_rows in itertools.groupby(
+                rows, key=lambda row: row[:2]
+            )
+        ]
@@ -0,0 +1,98 @@
+import time
+from typing import Iterable
+
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_index
+from cuponazo.infrastructure.ticket_repository.dynamodb import (
+    DynDBTableWrapper,
+    client_error,
+)
+
+
+class TicketIndex(ticket_index.Interface):
+    """`ticket_index.Interface` stored in DynamoDB. Every (key, id) pair is an item with `Id` `"<key>#<id>"`
+    and the `IndexKey` and `TicketId` attributes, and ids are looked up with a Query on a Global Secondary Index
+    with `IndexKey` as partition key. The table can be shared with a `ticket_repository.dynamodb.TicketRepository`,
+    which skips the items with an `IndexKey` when scanning its ids.
+
+    Parameters
+    ----------
+    `table` (`DynDBTable`)
+
+    `index_name` (`str`)
+        Name of the Global Secondary Index on `IndexKey`.
+
+    `max_retries` (`int`)
+        Times the items that DynamoDB left unprocessed are retried before giving up.
+
+    `backoff` (`float`)
+        Seconds to wait before the first retry of unprocessed items, doubled on every retry.
+    """
+
+    # DynamoDB limit for BatchWriteItem
+    batch_write_size = 25
+
+    def __init__(
+        self,
+        table: DynDBTableWrapper,
+        index_name: str = "IndexKey-index",
+        max_retries: int = 5,
+        backoff: float = 0.05,
+    ) -> None:
+        self.table = table
+        self.index_name = index_name
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def add_tickets(self, ticket_id: str, tickets: Iterable[ticket.Cuponazo]) -> None:
+        # Duplicated entries aren't allowed in the same BatchWriteItem
+        keys = dict.fromkeys(key for t in tickets for key in ticket_index.index_keys(t))
+        db_items = [
+            {"Id": f"{key}#{ticket_id}", "IndexKey": key, "TicketId": ticket_id}
+            for key in keys
+        ]
+
+        for i in range(0, len(db_items), self.batch_write_size):
+            self.__batch_write(ticket_id, db_items[i : i + self.batch_write_size])
+
+    def __batch_write(self, ticket_id: str, db_items: list[dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+            try:
+                response = self.table.batch_write_item(db_items)
+            except client_error() as err:
+                raise ticket_index.Error(
+                    f"Problem indexing tickets for '{ticket_id}' on '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+
+            unprocessed = response.get("UnprocessedItems", {}).get(self.table.name, [])
+            db_items = [request["PutRequest"]["Item"] for request in unprocessed]
+            if not db_items:
+                return
+
+        raise ticket_index.Error(
+            f"Problem indexing tickets for '{ticket_id}' on '{self.table.name}': {len(db_items)} items still unprocessed after {self.max_retries} retries"
+        )
+
+    def get_ids_by_key(self, key: str) -> set[str]:
+        query_kwargs = {
+            "IndexName": self.index_name,
+            "KeyConditionExpression": "IndexKey = :key",
+            "ExpressionAttributeValues": {":key": key},
+            "ProjectionExpression": "TicketId",
+        }
+        ids = set()
+        while True:
+            try:
+                response = self.table.query(**query_kwargs)
+            except client_error() as err:
+                raise ticket_index.Error(
+                    f"Problem querying '{key}' on '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+
+            ids.update(db_item["TicketId"] for db_item in response["Items"])
+            if "LastEvaluatedKey" not in response:
+                return ids
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
@@ -0,0 +1,26 @@
+import collections
+import threading
+from typing import Iterable
+
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_index
+
+
+class TicketIndex(ticket_index.Interface):
+    """In-memory `ticket_index.Interface`, keeping a set of ids for every key."""
+
+    def __init__(self) -> None:
+        self.__ids: collections.defaultdict[str, set[str]] = collections.defaultdict(
+            set
+        )
+        self.__lock = threading.Lock()
+
+    def add_tickets(self, ticket_id: str, tickets: Iterable[ticket.Cuponazo]) -> None:
+        keys = [key for t in tickets for key in ticket_index.index_keys(t)]
+        with self.__lock:
+            for key in keys:
+                self.__ids[key].add(ticket_id)
+
+    def get_ids_by_key(self, key: str) -> set[str]:
+        with self.__lock:
+            return set(self.__ids.get(key, ()))
@@ -0,0 +1,190 @@
+import collections
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Mapping
+
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+from cuponazo.domain import ticket_repository
+
+
+class CachingTicketRepository(ticket_repository.Interface):
+    """Read-through cache in front of another `ticket_repository.Interface`. Tickets read are kept in memory
+    for `ttl` seconds, up to `max_size` ids (evicting the least recently used), and every write goes to the
+    wrapped repository and invalidates the cached tickets of the ids written.
+
+    Parameters
+    ----------
+    `repository` (`ticket_repository.Interface`)
+        The repository being cached.
+
+    `max_size` (`int`)
+        Maximum amount of ids with their tickets in the cache.
+
+    `ttl` (`float`)
+        Seconds the tickets of an id are kept in the cache.
+
+    `clock` (`Callable[[], float]`)
+        Returns the current time in seconds, only meant to be replaced in tests.
+    """
+
+    def __init__(
+        self,
+        repository: ticket_repository.Interface,
+        max_size: int = 10_000,
+        ttl: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.repository = repository
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.__entries: collections.OrderedDict[
+            str, tuple[float, ticket_batch.TicketBatch]
+        ] = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        # Ids being read from `repository` right now, and the ones invalidated while being read, that shouldn't
+        # be cached because what was read could be already outdated.
+        self.__loading: collections.Counter[str] = collections.Counter()
+        self.__outdated: set[str] = set()
+
+    def get_tickets_by_id(self, ticket_id: str) -> list[ticket.Cuponazo]:
+        return self.get_ticket_batch_by_id(ticket_id).to_list()
+
+    def get_ticket_batch_by_id(self, ticket_id: str) -> ticket_batch.TicketBatch:
+        batch = self.__get_cached(ticket_id)
+        if batch is not None:
+            return batch
+
+        self.__start_loading([ticket_id])
+        loaded = {}
+        try:
+            batch = loaded[ticket_id] = self.repository.get_ticket_batch_by_id(
+                ticket_id
+            )
+        finally:
+            self.__finish_loading([ticket_id], loaded)
+
+        return ticket_batch.TicketBatch.from_tickets(batch)
+
+    def get_tickets_by_ids(
+        self, ticket_ids: Iterable[str]
+    ) -> dict[str, ticket_batch.TicketBatch]:
+        tickets = {}
+        missing = []
+        for ticket_id in dict.fromkeys(ticket_ids):
+            batch = self.__get_cached(ticket_id)
+            if batch is None:
+                missing.append(ticket_id)
+            tickets[ticket_id] = batch
+
+        if missing:
+            self.__start_loading(missing)
+            loaded = {}
+            try:
+                loaded = self.repository.get_tickets_by_ids(missing)
+            finally:
+                self.__finish_loading(missing, loaded)
+            for ticket_id in missing:
+                tickets[ticket_id] = ticket_batch.TicketBatch.from_tickets(
+                    loaded[ticket_id]
+                )
+
+        return tickets
+
+    def add_ticket_to_id(self, ticket_id: str, t: ticket.Cuponazo) -> None:
+        try:
+            self.repository.add_ticket_to_id(ticket_id, t)
+        finally:
+            self.invalidate([ticket_id])
+
+    def add_tickets_to_id(
+        self,
+        ticket_id: str,
+        tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch,
+    ) -> None:
+        try:
+            self.repository.add_tickets_to_id(ticket_id, tickets)
+        finally:
+            self.invalidate([ticket_id])
+
+    def add_tickets(
+        self,
+        tickets: Mapping[str, Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch],
+    ) -> None:
+        try:
+            self.repository.add_tickets(tickets)
+        finally:
+            self.invalidate(tickets.keys())
+
+    def iter_ticket_ids(self, page_size: int = 100) -> Iterator[list[str]]:
+        return self.repository.iter_ticket_ids(page_size)
+
+    def invalidate(self, ticket_ids: Iterable[str]) -> None:
+        """Removes the tickets of `ticket_ids` from the cache."""
+        with self.__lock:
+            for ticket_id in ticket_ids:
+                self.__entries.pop(ticket_id, None)
+                if ticket_id in self.__loading:
+                    self.__outdated.add(ticket_id)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__outdated.update(self.__loading)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __get_cached(self, ticket_id: str) -> ticket_batch.TicketBatch | None:
+        with self.__lock:
+            entry = self.__entries.get(ticket_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, batch = entry
+            if expires_at <= self.clock():
+                del self.__entries[ticket_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.__entries.move_to_end(ticket_id)
+            self.hits += 1
+            # Copy it, so callers can't modify the cached tickets
+            return ticket_batch.TicketBatch.from_tickets(batch)
+
+    def __start_loading(self, ticket_ids: list[str]) -> None:
+        with self.__lock:
+            self.__loading.update(ticket_ids)
+
+    def __finish_loading(
+        self, ticket_ids: list[str], loaded: Mapping[str, ticket_batch.TicketBatch]
+    ) -> None:
+        with self.__lock:
+            expires_at = self.clock() + self.ttl
+            for ticket_id, batch in loaded.items():
+                if ticket_id not in self.__outdated:
+                    self.__entries[ticket_id] = (
+                        expires_at,
+                        ticket_batch.TicketBatch.from_tickets(batch),
+                    )
+                    self.__entries.move_to_end(ticket_id)
+
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+            self.__loading.subtract(ticket_ids)
+            for ticket_id in ticket_ids:
+                if self.__loading[ticket_id] <= 0:
+                    del self.__loading[ticket_id]
+                    self.__outdated.discard(ticket_id)
@@ -1,12 +1,104 @@
 import json
-from botocore.exceptions import ClientError
+import struct
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, Mapping
 
+from cuponazo.domain import metrics
 from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
 from cuponazo.domain import ticket_repository
 
 
+class _NeverRaised(Exception):
+    pass
+
+
+def client_error() -> type[Exception]:
+    """Returns `botocore.exceptions.ClientError`, to catch it without importing botocore when this module is
+    imported. It's only evaluated once an exception is raised: if botocore wasn't imported yet, it couldn't raise
+    it, so an exception class that is never raised is returned instead.
+    """
+    exceptions = sys.modules.get("botocore.exceptions")
+    if exceptions is None:
+        return _NeverRaised
+    return exceptions.ClientError
+
+
+def attribute_size(value) -> int:
+    """Returns the approximate size in bytes of `value` serialized as a DynamoDB attribute (or of a whole
+    request or response): strings and binaries count their bytes, numbers a byte every two digits, and maps and
+    lists their elements (and names) plus a few bytes of overhead.
+    """
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, Mapping):
+        return 3 + sum(attribute_size(k) + attribute_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return 3 + sum(map(attribute_size, value))
+    if hasattr(value, "value"):
+        # boto3.dynamodb.types.Binary
+        return attribute_size(value.value)
+    return len(str(value)) // 2 + 1
+
+
+# Tables created by `get_table`, kept for the whole life of the process
+_tables: dict[tuple, "DynDBTableWrapper"] = {}
+_tables_lock = threading.Lock()
+
+
+def get_table(
+    table_name: str,
+    region_name: str | None = None,
+    max_pool_connections: int = 10,
+    max_attempts: int | None = None,
+) -> "DynDBTableWrapper":
+    """Returns the table `table_name`, creating its boto3 resource the first time and returning the same table
+    afterwards. Serverless functions keep the state of the modules between warm invocations, so only the first
+    (cold) invocation pays for importing boto3 and creating the resource.
+
+    Parameters
+    ----------
+    `max_pool_connections` (`int`)
+        Connections kept by the boto3 client, see `TicketRepository` `max_workers`.
+
+    `max_attempts` (`int | None`)
+        Attempts of every request (including the first one) done by botocore, or its default if `None`. Use `1`
+        to leave the retries to a `resilient.ResilientTable` wrapping the table.
+    """
+    key = (table_name, region_name, max_pool_connections, max_attempts)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is None:
+            import boto3
+            from botocore.config import Config
+
+            config = Config(max_pool_connections=max_pool_connections)
+            if max_attempts is not None:
+                config = config.merge(
+                    Config(retries={"max_attempts": max_attempts, "mode": "standard"})
+                )
+            resource = boto3.resource(
+                "dynamodb", region_name=region_name, config=config
+            )
+            table = _tables[key] = DynDBTableWrapper(resource.Table(table_name))
+
+    return table
+
+
 class DynDBTableWrapper:
-    """Wrapper of [boto3 Table Resource](https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/dynamodb/table/index.html)"""
+    """Wrapper of [boto3 Table Resource](https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/dynamodb/table/index.html)
+
+    Every request is instrumented (see `metrics.set_recorder`): its latency is recorded in
+    `dynamodb_request_seconds`, the items it read in `dynamodb_items_total`, the size of its parameters and of
+    its response (see `attribute_size`) in `dynamodb_request_bytes_total` and `dynamodb_response_bytes_total`,
+    and its failures in `dynamodb_errors_total`, labeled by `operation` and `table`.
+    """
 
     def __init__(self, dyndb_table) -> None:
         self.table = dyndb_table
@@ -16,50 +108,660 @@ class DynDBTableWrapper:
         return self.table.name
 
     def get_item(self, *args, **kwargs) -> dict:
-        return self.table.get_item(*args, **kwargs)
+        return self.__request("get_item", self.table.get_item, *args, **kwargs)
 
     def put_item(self, *args, **kwargs) -> dict:
-        return self.table.put_item(*args, **kwargs)
+        return self.__request("put_item", self.table.put_item, *args, **kwargs)
+
+    def update_item(self, *args, **kwargs) -> dict:
+        return self.__request("update_item", self.table.update_item, *args, **kwargs)
+
+    def scan(self, *args, **kwargs) -> dict:
+        return self.__request("scan", self.table.scan, *args, **kwargs)
+
+    def query(self, *args, **kwargs) -> dict:
+        return self.__request("query", self.table.query, *args, **kwargs)
+
+    def batch_get_item(self, keys: list[dict]) -> dict:
+        return self.__request(
+            "batch_get_item",
+            self.table.meta.client.batch_get_item,
+            RequestItems={self.name: {"Keys": keys}},
+        )
+
+    def batch_write_item(self, items: list[dict], delete_keys: list[dict] = ()) -> dict:
+        return self.__request(
+            "batch_write_item",
+            self.table.meta.client.batch_write_item,
+            RequestItems={
+                self.name: [{"PutRequest": {"Item": i}} for i in items]
+                + [{"DeleteRequest": {"Key": k}} for k in delete_keys]
+            },
+        )
+
+    def __request(self, operation: str, method, *args, **kwargs) -> dict:
+        recorder = metrics.get_recorder()
+        try:
+            with recorder.time(
+                "dynamodb_request_seconds", operation=operation, table=self.name
+            ):
+                response = method(*args, **kwargs)
+        except client_error() as err:
+            recorder.increment(
+                "dynamodb_errors_total",
+                operation=operation,
+                table=self.name,
+                code=err.response["Error"]["Code"],
+            )
+            raise
+
+        if "Item" in response:
+            items = 1
+        elif "Items" in response:
+            items = len(response["Items"])
+        else:
+            items = sum(map(len, response.get("Responses", {}).values()))
+        if items:
+            recorder.increment(
+                "dynamodb_items_total", items, operation=operation, table=self.name
+            )
+
+        # Measuring the sizes walks the whole request and response, skipped while nothing is recorded
+        if type(recorder) is not metrics.Recorder:
+            recorder.increment(
+                "dynamodb_request_bytes_total",
+                attribute_size(args) + attribute_size(kwargs),
+                operation=operation,
+                table=self.name,
+            )
+            recorder.increment(
+                "dynamodb_response_bytes_total",
+                sum(
+                    attribute_size(value)
+                    for key, value in response.items()
+                    if key != "ResponseMetadata"
+                ),
+                operation=operation,
+                table=self.name,
+            )
+
+        return response
 
 
 class TicketRepository(ticket_repository.Interface):
     """Repository for the stored Cuponazo tickets played.
 
+    Every id is stored in a single item. New tickets are appended atomically with an update expression to the
+    `TicketList` list attribute (every ticket as its zero padded `ticket.Cuponazo.code`), instead of rewriting
+    the whole item. `compact_tickets` moves them to the `TicketsBin` binary attribute, packing every code in 4
+    bytes after a versioned header, which is smaller and decoded without parsing nor validating every ticket.
+    `Version` is increased on every write. Items from the previous layout, with the tickets in a JSON `Tickets`
+    string, are still read (see `migrate_legacy_tickets`).
+
+    With a `shard_size`, the tickets of an id are split in shards of up to that amount of tickets, so heavy ids
+    don't reach the 400 KB limit of a DynamoDB item. The item of the id is the first shard and keeps the amount
+    of shards in `Shards`, every other shard is an item with id `"<id>#<shard>"` (see `shard_key`) and the owner
+    id in `ShardOf`. Tickets are only appended to the last shard, creating a new one once it's full. The extra
+    shards are read with a single BatchGetItem, and items without `Shards` (previous layouts) are read as a
+    single shard.
+
+    The table can be shared with a `ticket_index.dynamodb.TicketIndex`: its items (the ones with an `IndexKey`)
+    are skipped when scanning ids or tickets.
+
     Parameters
     ----------
     `table` (`DynDBTable`)
+
+    `max_workers` (`int`)
+        Maximum amount of concurrent requests done by the batch methods. boto3 clients keep up to 10 connections
+        by default, so the table should be created with a `botocore.config.Config(max_pool_connections=...)` of
+        at least this size.
+
+    `max_retries` (`int`)
+        Times the batch methods retry the keys (or items) that DynamoDB left unprocessed (and `migrate_legacy_tickets`
+        retries a write that raced with another one) before giving up.
+
+    `backoff` (`float`)
+        Seconds to wait before the first retry of unprocessed keys, doubled on every retry.
+
+    `shard_size` (`int | None`)
+        Maximum amount of tickets appended to a shard before starting a new one. `None` appends all the tickets
+        to the item of the id.
+
+    `ticket_type` (`type[ticket.Cuponazo]`)
+        The class of the tickets stored, every table keeps the tickets of a single lottery.
     """
 
-    def __init__(self, table: DynDBTableWrapper) -> None:
+    # DynamoDB limits for BatchGetItem and BatchWriteItem
+    batch_get_size = 100
+    batch_write_size = 25
+
+    # Tickets per item written by `put_tickets` without a `shard_size`: 360 KB of `TicketsBin`, below the
+    # 400 KB limit of a DynamoDB item
+    binary_shard_size = 90_000
+
+    # Header of `TicketsBin`: magic, format version and amount of tickets, followed by the little endian codes
+    binary_header = struct.Struct("<3sBI")
+    binary_magic = b"CUP"
+    binary_version = 1
+
+    append_expression = "SET TicketList = list_append(if_not_exists(TicketList, :empty), :tickets) ADD Version :one"
+    shard_append_expression = "SET TicketList = list_append(if_not_exists(TicketList, :empty), :tickets), ShardOf = :owner ADD Version :one"
+    # Only append to a shard without compacted or legacy tickets that has room for the new ones
+    shard_append_condition = (
+        "attribute_not_exists(Tickets) AND attribute_not_exists(TicketsBin) AND attribute_not_exists(TicketList)"
+        " OR attribute_not_exists(Tickets) AND attribute_not_exists(TicketsBin) AND size(TicketList) <= :room"
+    )
+
+    def __init__(
+        self,
+        table: DynDBTableWrapper,
+        max_workers: int = 8,
+        max_retries: int = 5,
+        backoff: float = 0.05,
+        shard_size: int | None = None,
+        ticket_type: type[ticket.Cuponazo] = ticket.Cuponazo,
+    ) -> None:
         self.table = table
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.shard_size = shard_size
+        self.ticket_type = ticket_type
+        # Last known amount of shards of every id appended to, to append to its last shard without reading it
+        self.__shards: dict[str, int] = {}
+        self.__shards_lock = threading.Lock()
+
+    @staticmethod
+    def shard_key(ticket_id: str, shard: int) -> str:
+        """Returns the `Id` of the item keeping the `shard` shard of `ticket_id`."""
+        return ticket_id if shard == 0 else f"{ticket_id}#{shard}"
 
     def get_tickets_by_id(self, ticket_id: str) -> list[ticket.Cuponazo]:
+        return self.get_ticket_batch_by_id(ticket_id).to_list()
+
+    def get_ticket_batch_by_id(self, ticket_id: str) -> ticket_batch.TicketBatch:
+        db_item = self.__get_db_item(ticket_id)
+        if db_item is None:
+            return ticket_batch.TicketBatch(ticket_type=self.ticket_type)
+        return self.__deserialize_shards([db_item])[ticket_id]
+
+    def add_ticket_to_id(self, ticket_id: str, t: ticket.Cuponazo) -> None:
+        self.add_tickets_to_id(ticket_id, [t])
+
+    def add_tickets_to_id(
+        self,
+        ticket_id: str,
+        tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch,
+    ) -> None:
+        if self.shard_size is not None:
+            serialized = self.__serialize_tickets(
+                ticket_batch.TicketBatch.from_tickets(tickets, self.ticket_type)
+            )
+            for chunk in self.__chunks(serialized, self.shard_size):
+                self.__append_to_last_shard(ticket_id, chunk)
+            return
+
+        try:
+            self.table.update_item(
+                Key={"Id": ticket_id},
+                UpdateExpression=self.append_expression,
+                ExpressionAttributeValues={
+                    ":empty": [],
+                    ":tickets": self.__serialize_tickets(
+                        ticket_batch.TicketBatch.from_tickets(tickets, self.ticket_type)
+                    ),
+                    ":one": 1,
+                },
+            )
+        except client_error() as err:
+            raise ticket_repository.Error(
+                f"Problem saving tickets for '{ticket_id}' to '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+            )
+
+    def get_tickets_by_ids(
+        self, ticket_ids: Iterable[str]
+    ) -> dict[str, ticket_batch.TicketBatch]:
+        """Returns the tickets of every id in `ticket_ids`, fetched with concurrent BatchGetItem requests. Ids
+        without tickets get an empty batch.
+        """
+        ids = list(dict.fromkeys(ticket_ids))
+        tickets = {
+            ticket_id: ticket_batch.TicketBatch(ticket_type=self.ticket_type)
+            for ticket_id in ids
+        }
+
+        from concurrent import futures
+
+        with futures.ThreadPoolExecutor(self.max_workers) as executor:
+            db_items = [
+                db_item
+                for db_items in executor.map(
+                    self.__batch_get, self.__chunks(ids, self.batch_get_size)
+                )
+                for db_item in db_items
+            ]
+        tickets.update(self.__deserialize_shards(db_items))
+
+        return tickets
+
+    def add_tickets(
+        self,
+        tickets: Mapping[str, Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch],
+    ) -> None:
+        """Adds the tickets of every id in `tickets`, appending them concurrently to every item. BatchWriteItem
+        only allows to overwrite whole items, so it can't be used to append without reading them first.
+        """
+        from concurrent import futures
+
+        with futures.ThreadPoolExecutor(self.max_workers) as executor:
+            # Consume the results to raise any error
+            list(executor.map(self.add_tickets_to_id, tickets.keys(), tickets.values()))
+
+    def iter_ticket_ids(self, page_size: int = 100) -> Iterator[list[str]]:
+        """Yields all the ids with tickets, scanning the table for `page_size` items at a time and only reading
+        their `Id` (and `ShardOf` and `IndexKey`, to skip the extra shards and the items of a ticket index).
+        """
+        scan_kwargs = {
+            "Limit": page_size,
+            "ProjectionExpression": "Id, ShardOf, IndexKey",
+        }
+        while True:
+            try:
+                response = self.table.scan(**scan_kwargs)
+            except client_error() as err:
+                raise ticket_repository.Error(
+                    f"Problem scanning ids from '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+
+            ids = [
+                db_item["Id"]
+                for db_item in response["Items"]
+                if self.__is_owner_item(db_item)
+            ]
+            if ids:
+                yield ids
+
+            if "LastEvaluatedKey" not in response:
+                return
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def scan_tickets(
+        self,
+        segment: int = 0,
+        total_segments: int = 1,
+        page_size: int = 100,
+        start_key: dict | None = None,
+    ) -> Iterator[tuple[dict[str, ticket_batch.TicketBatch], dict | None]]:
+        """Yields the tickets of every id in `segment` of a parallel Scan split in `total_segments`, reading
+        `page_size` items at a time. Every page comes with the key to resume the scan after it (`start_key`),
+        which is `None` after the last page.
+        """
+        scan_kwargs = {
+            "Limit": page_size,
+            "Segment": segment,
+            "TotalSegments": total_segments,
+        }
+        if start_key is not None:
+            scan_kwargs["ExclusiveStartKey"] = start_key
+
+        while True:
+            try:
+                response = self.table.scan(**scan_kwargs)
+            except client_error() as err:
+                raise ticket_repository.Error(
+                    f"Problem scanning tickets from '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+
+            last_key = response.get("LastEvaluatedKey")
+            yield self.__deserialize_shards(
+                [
+                    db_item
+                    for db_item in response["Items"]
+                    if self.__is_owner_item(db_item)
+                ]
+            ), last_key
+
+            if last_key is None:
+                return
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+    @staticmethod
+    def __is_owner_item(db_item: dict) -> bool:
+        """Whether `db_item` is the item of an id, and not an extra shard or an item of a ticket index."""
+        return "ShardOf" not in db_item and "IndexKey" not in db_item
+
+    def put_tickets(self, tickets: Mapping[str, ticket_batch.TicketBatch]) -> None:
+        """Replaces the items of every id in `tickets` with its (compacted) tickets, writing up to
+        `batch_write_size` items per BatchWriteItem request. Meant to restore tickets, any ticket previously
+        stored for those ids is lost.
+
+        Tickets are split in shards of `shard_size` tickets (or `binary_shard_size` without it), with the same
+        layout as `add_tickets_to_id`, and the extra shards of the previous items of those ids that aren't
+        overwritten are deleted. Items are replaced instead of appended to, so putting the same tickets again
+        (like when resuming an import) doesn't repeat them.
+        """
+        shard_size = self.shard_size or self.binary_shard_size
+        ids = list(tickets)
+
+        from concurrent import futures
+
+        with futures.ThreadPoolExecutor(self.max_workers) as executor:
+            previous_shards = {
+                db_item["Id"]: int(db_item.get("Shards", 1))
+                for db_items in executor.map(
+                    self.__batch_get, self.__chunks(ids, self.batch_get_size)
+                )
+                for db_item in db_items
+            }
+
+        db_items = []
+        stale_keys = []
+        for ticket_id in ids:
+            batch = ticket_batch.TicketBatch.from_tickets(
+                tickets[ticket_id], self.ticket_type
+            )
+            shards = max(1, -(-len(batch) // shard_size))
+            for shard in range(shards):
+                db_item = {
+                    "Id": self.shard_key(ticket_id, shard),
+                    "TicketsBin": self.__encode_tickets(
+                        batch[shard * shard_size : (shard + 1) * shard_size]
+                    ),
+                }
+                if shard > 0:
+                    db_item["ShardOf"] = ticket_id
+                elif shards > 1:
+                    db_item["Shards"] = shards
+                db_items.append(db_item)
+
+            stale_keys += [
+                {"Id": self.shard_key(ticket_id, shard)}
+                for shard in range(shards, previous_shards.get(ticket_id, 1))
+            ]
+
+        with self.__shards_lock:
+            for ticket_id in ids:
+                self.__shards.pop(ticket_id, None)
+
+        # Stale shards are deleted first: if it's interrupted before writing the new items, the previous ones
+        # point to shards that don't exist anymore, instead of leaving shards that a later append could reuse
+        for keys_chunk in self.__chunks(stale_keys, self.batch_write_size):
+            self.__batch_write([], keys_chunk)
+        for db_items_chunk in self.__chunks(db_items, self.batch_write_size):
+            self.__batch_write(db_items_chunk)
+
+    def compact_tickets(self, ticket_id: str) -> bool:
+        """Moves all the tickets of `ticket_id` (appended to `TicketList` or in the legacy JSON `Tickets`) to
+        the binary `TicketsBin` attribute. The item is only overwritten if its `Version` didn't change since it
+        was read, so no concurrent append is lost. Only the first shard of sharded ids is compacted.
+
+        Returns
+        -------
+        `bool`
+            `True` if the item had tickets that weren't compacted yet.
+        """
+        return self.__compact(
+            ticket_id, lambda db_item: "Tickets" in db_item or db_item.get("TicketList")
+        )
+
+    def migrate_legacy_tickets(self, ticket_id: str) -> bool:
+        """Same as `compact_tickets`, but only for items that still have legacy JSON `Tickets`.
+
+        Returns
+        -------
+        `bool`
+            `True` if the item had legacy tickets that were migrated.
+        """
+        return self.__compact(ticket_id, lambda db_item: "Tickets" in db_item)
+
+    def __compact(self, ticket_id: str, needs_compaction) -> bool:
+        for _ in range(self.max_retries + 1):
+            db_item = self.__get_db_item(ticket_id)
+            if db_item is None or not needs_compaction(db_item):
+                return False
+
+            version = int(db_item.get("Version", 0))
+            compacted = {
+                "Id": ticket_id,
+                "TicketsBin": self.__encode_tickets(
+                    self.__deserialize_tickets(db_item)
+                ),
+                "Version": version + 1,
+            }
+            if "Shards" in db_item:
+                compacted["Shards"] = db_item["Shards"]
+            try:
+                self.table.put_item(
+                    Item=compacted,
+                    ConditionExpression="attribute_not_exists(Version) OR Version = :version",
+                    ExpressionAttributeValues={":version": version},
+                )
+            except client_error() as err:
+                if err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                    continue
+                raise ticket_repository.Error(
+                    f"Problem compacting tickets for '{ticket_id}' on '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+            else:
+                return True
+
+        raise ticket_repository.Error(
+            f"Problem compacting tickets for '{ticket_id}' on '{self.table.name}': item kept changing after {self.max_retries} retries"
+        )
+
+    def __append_to_last_shard(self, ticket_id: str, tickets: list[str]) -> None:
+        with self.__shards_lock:
+            shards = self.__shards.get(ticket_id, 1)
+
+        for _ in range(self.max_retries + 1):
+            values = {
+                ":empty": [],
+                ":tickets": tickets,
+                ":one": 1,
+                ":room": self.shard_size - len(tickets),
+            }
+            if shards > 1:
+                values[":owner"] = ticket_id
+            try:
+                self.table.update_item(
+                    Key={"Id": self.shard_key(ticket_id, shards - 1)},
+                    UpdateExpression=(
+                        self.shard_append_expression
+                        if shards > 1
+                        else self.append_expression
+                    ),
+                    ConditionExpression=self.shard_append_condition,
+                    ExpressionAttributeValues=values,
+                )
+            except client_error() as err:
+                if err.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise ticket_repository.Error(
+                        f"Problem saving tickets for '{ticket_id}' to '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                    )
+                # The shard is full: start a new one
+                shards = self.__add_shard(ticket_id, shards)
+            else:
+                with self.__shards_lock:
+                    self.__shards[ticket_id] = shards
+                return
+
+        raise ticket_repository.Error(
+            f"Problem saving tickets for '{ticket_id}' to '{self.table.name}': no shard with room after {self.max_retries} retries"
+        )
+
+    def __add_shard(self, ticket_id: str, shards: int) -> int:
+        """Increases the amount of shards of `ticket_id` if it's still `shards`, returning the new amount. If
+        another writer already changed it, returns the current one instead.
+        """
+        try:
+            self.table.update_item(
+                Key={"Id": ticket_id},
+                UpdateExpression="SET Shards = :next",
+                ConditionExpression=(
+                    "attribute_not_exists(Shards) OR Shards = :current"
+                    if shards == 1
+                    else "Shards = :current"
+                ),
+                ExpressionAttributeValues={":next": shards + 1, ":current": shards},
+            )
+        except client_error() as err:
+            if err.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise ticket_repository.Error(
+                    f"Problem adding a shard for '{ticket_id}' to '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+            db_item = self.__get_db_item(ticket_id) or {}
+            return int(db_item.get("Shards", 1))
+
+        return shards + 1
+
+    def __get_db_item(self, ticket_id: str) -> dict | None:
         try:
             response = self.table.get_item(Key={"Id": ticket_id})
-        except ClientError as err:
+        except client_error() as err:
             raise ticket_repository.Error(
                 f"Problem getting tickets for '{ticket_id}' from '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
             )
 
-        try:
-            db_items = response["Item"]
-        except KeyError as err:
-            return []
-        else:
-            return [
-                ticket.Cuponazo(t["number"], t["serie"])
-                for t in json.loads(db_items["Tickets"])
+        return response.get("Item")
+
+    def __batch_get(self, ticket_ids: list[str]) -> list[dict]:
+        keys = [{"Id": ticket_id} for ticket_id in ticket_ids]
+        db_items = []
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+            try:
+                response = self.table.batch_get_item(keys)
+            except client_error() as err:
+                raise ticket_repository.Error(
+                    f"Problem getting tickets in batch from '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+
+            db_items += response["Responses"].get(self.table.name, [])
+            unprocessed = response.get("UnprocessedKeys", {}).get(self.table.name, {})
+            keys = unprocessed.get("Keys", [])
+            if not keys:
+                return db_items
+
+        raise ticket_repository.Error(
+            f"Problem getting tickets in batch from '{self.table.name}': {len(keys)} keys still unprocessed after {self.max_retries} retries"
+        )
+
+    def __batch_write(self, db_items: list[dict], delete_keys: list[dict] = ()) -> None:
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+            try:
+                response = self.table.batch_write_item(db_items, delete_keys)
+            except client_error() as err:
+                raise ticket_repository.Error(
+                    f"Problem saving tickets in batch to '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                )
+
+            unprocessed = response.get("UnprocessedItems", {}).get(self.table.name, [])
+            db_items = [
+                request["PutRequest"]["Item"]
+                for request in unprocessed
+                if "PutRequest" in request
             ]
+            delete_keys = [
+                request["DeleteRequest"]["Key"]
+                for request in unprocessed
+                if "DeleteRequest" in request
+            ]
+            if not db_items and not delete_keys:
+                return
 
-    def add_ticket_to_id(self, ticket_id: str, t: ticket.Cuponazo) -> None:
-        tickets = self.get_tickets_by_id(ticket_id)
-        tickets.append(t)
-        serialized_tickets = json.dumps(
-            [{"number": t.number, "serie": t.serie} for t in tickets]
+        raise ticket_repository.Error(
+            f"Problem saving tickets in batch to '{self.table.name}': {len(db_items) + len(delete_keys)} items still unprocessed after {self.max_retries} retries"
         )
-        try:
-            self.table.put_item(Item={"Id": ticket_id, "Tickets": serialized_tickets})
-        except ClientError as err:
+
+    def __chunks(self, items: list, size: int) -> list[list]:
+        return [items[i : i + size] for i in range(0, len(items), size)]
+
+    def __deserialize_shards(
+        self, db_items: list[dict]
+    ) -> dict[str, ticket_batch.TicketBatch]:
+        """Returns the tickets of every id in `db_items` (the items of their first shard), fetching the items of
+        the rest of their shards with BatchGetItem.
+        """
+        shard_ids = [
+            self.shard_key(db_item["Id"], shard)
+            for db_item in db_items
+            for shard in range(1, int(db_item.get("Shards", 1)))
+        ]
+        shard_items = {}
+        if shard_ids:
+            from concurrent import futures
+
+            with futures.ThreadPoolExecutor(self.max_workers) as executor:
+                for shard_db_items in executor.map(
+                    self.__batch_get, self.__chunks(shard_ids, self.batch_get_size)
+                ):
+                    for shard_db_item in shard_db_items:
+                        shard_items[shard_db_item["Id"]] = shard_db_item
+
+        tickets = {}
+        for db_item in db_items:
+            codes = self.__deserialize_tickets(db_item).codes
+            for shard in range(1, int(db_item.get("Shards", 1))):
+                shard_db_item = shard_items.get(self.shard_key(db_item["Id"], shard))
+                if shard_db_item is not None:
+                    codes.extend(self.__deserialize_tickets(shard_db_item).codes)
+            tickets[db_item["Id"]] = ticket_batch.TicketBatch(codes, self.ticket_type)
+
+        return tickets
+
+    def __serialize_tickets(self, batch: ticket_batch.TicketBatch) -> list[str]:
+        return [f"{code:08d}" for code in batch.codes]
+
+    def __deserialize_tickets(self, db_item: dict) -> ticket_batch.TicketBatch:
+        # Tickets were validated before storing them
+        batch = ticket_batch.TicketBatch(
+            (int(code) for code in db_item.get("TicketList", [])), self.ticket_type
+        )
+        if "TicketsBin" in db_item:
+            batch = self.__decode_tickets(db_item["Id"], db_item["TicketsBin"]) + batch
+        if "Tickets" in db_item:
+            batch = self.__deserialize_legacy_tickets(db_item["Tickets"]) + batch
+        return batch
+
+    def __encode_tickets(self, batch: ticket_batch.TicketBatch) -> bytes:
+        header = self.binary_header.pack(
+            self.binary_magic, self.binary_version, len(batch)
+        )
+        return header + batch.to_bytes()
+
+    def __decode_tickets(self, ticket_id: str, data) -> ticket_batch.TicketBatch:
+        # boto3 returns binary attributes wrapped in `boto3.dynamodb.types.Binary`
+        data = memoryview(getattr(data, "value", data))
+        size = self.binary_header.size
+        if len(data) < size:
             raise ticket_repository.Error(
-                f"Problem saving tickets for '{ticket_id}' to '{self.table.name}': {err.response['Error']['Code']}: {err.response['Error']['Message']}"
+                f"Problem decoding tickets for '{ticket_id}' from '{self.table.name}': truncated header"
             )
+
+        magic, version, count = self.binary_header.unpack(data[:size])
+        if magic != self.binary_magic or version != self.binary_version:
+            raise ticket_repository.Error(
+                f"Problem decoding tickets for '{ticket_id}' from '{self.table.name}': unknown format {magic!r} version {version}"
+            )
+        if len(data) - size != count * 4:
+            raise ticket_repository.Error(
+                f"Problem decoding tickets for '{ticket_id}' from '{self.table.name}': expected {count} tickets in {len(data) - size} bytes"
+            )
+
+        return ticket_batch.TicketBatch.from_bytes(data[size:], self.ticket_type)
+
+    def __deserialize_legacy_tickets(self, tickets: str) -> ticket_batch.TicketBatch:
+        serie_base = 10**ticket.Cuponazo.serie_length
+        return ticket_batch.TicketBatch(
+            (
+                int(t["number"]) * serie_base + int(t["serie"])
+                for t in json.loads(tickets)
+            ),
+            self.ticket_type,
+        )
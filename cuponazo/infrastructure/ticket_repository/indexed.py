@@ -0,0 +1,72 @@
+from typing import Iterable, Iterator, Mapping
+
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+from cuponazo.domain import ticket_index
+from cuponazo.domain import ticket_repository
+
+
+class IndexedTicketRepository(ticket_repository.Interface):
+    """Keeps a `ticket_index.Interface` up to date with the tickets added to another
+    `ticket_repository.Interface`, so winners can be found with `find_winners` without checking every ticket.
+    Tickets are indexed after they're stored.
+
+    Parameters
+    ----------
+    `repository` (`ticket_repository.Interface`)
+        The repository storing the tickets.
+
+    `index` (`ticket_index.Interface`)
+        The index of the tickets in `repository`.
+    """
+
+    def __init__(
+        self,
+        repository: ticket_repository.Interface,
+        index: ticket_index.Interface,
+    ) -> None:
+        self.repository = repository
+        self.index = index
+
+    def get_tickets_by_id(self, ticket_id: str) -> list[ticket.Cuponazo]:
+        return self.repository.get_tickets_by_id(ticket_id)
+
+    def get_ticket_batch_by_id(self, ticket_id: str) -> ticket_batch.TicketBatch:
+        return self.repository.get_ticket_batch_by_id(ticket_id)
+
+    def get_tickets_by_ids(
+        self, ticket_ids: Iterable[str]
+    ) -> dict[str, ticket_batch.TicketBatch]:
+        return self.repository.get_tickets_by_ids(ticket_ids)
+
+    def iter_ticket_ids(self, page_size: int = 100) -> Iterator[list[str]]:
+        return self.repository.iter_ticket_ids(page_size)
+
+    def add_ticket_to_id(self, ticket_id: str, t: ticket.Cuponazo) -> None:
+        self.repository.add_ticket_to_id(ticket_id, t)
+        self.index.add_tickets(ticket_id, [t])
+
+    def add_tickets_to_id(
+        self,
+        ticket_id: str,
+        tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch,
+    ) -> None:
+        tickets = ticket_batch.TicketBatch.from_tickets(tickets)
+        self.repository.add_tickets_to_id(ticket_id, tickets)
+        self.index.add_tickets(ticket_id, tickets)
+
+    def add_tickets(
+        self,
+        tickets: Mapping[str, Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch],
+    ) -> None:
+        tickets = {
+            ticket_id: ticket_batch.TicketBatch.from_tickets(id_tickets)
+            for ticket_id, id_tickets in tickets.items()
+        }
+        self.repository.add_tickets(tickets)
+        for ticket_id, id_tickets in tickets.items():
+            self.index.add_tickets(ticket_id, id_tickets)
+
+    def find_winners(self, result: ticket.Cuponazo, min_level: int) -> set[str]:
+        """Returns the ids owning a ticket that wins a prize level of `min_level` or better against `result`."""
+        return self.index.find_winners(result, min_level)
@@ -0,0 +1,321 @@
+import random
+import threading
+import time
+from typing import Callable
+
+from cuponazo.domain import metrics
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+# Error codes of the requests that can be retried. Throttled requests are rejected before doing anything, so
+# any request can be retried. After a transient failure of DynamoDB a write could have been applied anyway, so
+# only reads are retried, appending tickets twice is worse than failing.
+throttling_codes = frozenset(
+    [
+        "ProvisionedThroughputExceededException",
+        "ThrottlingException",
+        "RequestLimitExceeded",
+    ]
+)
+retryable_codes = throttling_codes | {"InternalServerError", "ServiceUnavailable"}
+
+
+class AdaptiveRateLimiter:
+    """Client-side token bucket limiting the requests per second, tuned from the throttling signals of the
+    server (additive increase, multiplicative decrease): every throttled request multiplies the rate by
+    `decrease` (at most once per `cooldown` seconds, so a burst of throttled requests only counts once) and
+    successful requests increase it by `increase` requests per second, every second.
+
+    Parameters
+    ----------
+    `rate` (`float`)
+        Initial requests per second.
+
+    `min_rate` (`float`)
+
+    `max_rate` (`float`)
+
+    `burst` (`float | None`)
+        Maximum amount of tokens kept, requests allowed at once after being idle. One second of `rate` if `None`.
+
+    `clock` (`Callable[[], float]`)
+        Returns the current time in seconds, only meant to be replaced in tests.
+
+    `sleep` (`Callable[[float], None]`)
+        Waits for the given seconds, only meant to be replaced in tests.
+    """
+
+    def __init__(
+        self,
+        rate: float = 100.0,
+        min_rate: float = 1.0,
+        max_rate: float = 1000.0,
+        burst: float | None = None,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+
+        self.__lock = threading.Lock()
+        self.__tokens = self.__capacity()
+        self.__updated = clock()
+        self.__decreased = float("-inf")
+
+    def acquire(self) -> None:
+        """Takes a token, waiting until there's one available. Tokens are reserved in order, so waiting requests
+        are served in arrival order.
+        """
+        with self.__lock:
+            self.__refill()
+            self.__tokens -= 1
+            wait = -self.__tokens / self.rate if self.__tokens < 0 else 0
+
+        if wait > 0:
+            self.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Takes a token if there's one available right now, without waiting."""
+        with self.__lock:
+            self.__refill()
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            return True
+
+    def succeeded(self) -> None:
+        with self.__lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def throttled(self) -> None:
+        with self.__lock:
+            now = self.clock()
+            if now - self.__decreased < self.cooldown:
+                return
+            self.__decreased = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.__tokens = min(self.__tokens, self.__capacity())
+
+    def __capacity(self) -> float:
+        return self.rate if self.burst is None else self.burst
+
+    def __refill(self) -> None:
+        now = self.clock()
+        self.__tokens = min(
+            self.__capacity(), self.__tokens + (now - self.__updated) * self.rate
+        )
+        self.__updated = now
+
+
+class ResilientTable:
+    """Wrapper of a table (`dynamodb.DynDBTableWrapper` or anything with the same methods) making its requests
+    resilient to throttling and to slow responses:
+
+    - Every request waits for a token of `rate_limiter`, which adapts its rate to the throttled requests.
+    - Requests failing with a retryable error (`retryable_codes` for reads, only `throttling_codes` for writes)
+      are retried up to `max_retries` times, waiting a random time (full jitter) up to `backoff` seconds doubled
+      on every retry (and at most `max_backoff`). The error is only raised once the retries are exhausted.
+    - With `hedge_after`, reads (`get_item`, `query`, `batch_get_item`) still running after that many seconds
+      are sent again, if the rate limiter has a token to spare, and the first response is used.
+
+    Retries, throttled requests and hedged reads are counted in `dynamodb_retries_total`,
+    `dynamodb_throttles_total`, `dynamodb_hedges_total` and `dynamodb_hedge_wins_total` (see
+    `metrics.set_recorder`), labeled by `operation` and `table`.
+
+    botocore retries failed requests on its own too, so the wrapped table should be created without them
+    (`dynamodb.get_table(..., max_attempts=1)`), otherwise every retry here is multiplied by its attempts.
+
+    Parameters
+    ----------
+    `table` (`dynamodb.DynDBTableWrapper`)
+
+    `rate_limiter` (`AdaptiveRateLimiter | None`)
+        `None` to send the requests without limiting them.
+
+    `hedge_workers` (`int`)
+        Threads sending the hedged reads.
+
+    `sleep` (`Callable[[float], None]`)
+        Waits for the given seconds, only meant to be replaced in tests.
+
+    `rng` (`random.Random | None`)
+        Source of the jitter of the retries, only meant to be replaced in tests.
+    """
+
+    def __init__(
+        self,
+        table: dynamodb.DynDBTableWrapper,
+        rate_limiter: AdaptiveRateLimiter | None = None,
+        max_retries: int = 5,
+        backoff: float = 0.05,
+        max_backoff: float = 5.0,
+        hedge_after: float | None = None,
+        hedge_workers: int = 8,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.table = table
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.hedge_workers = hedge_workers
+        self.sleep = sleep
+        self.rng = random.Random() if rng is None else rng
+
+        self.__executor = None
+        self.__executor_lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.table.name
+
+    def close(self) -> None:
+        """Stops the threads sending hedged reads, if any."""
+        with self.__executor_lock:
+            if self.__executor is not None:
+                self.__executor.shutdown()
+                self.__executor = None
+
+    def get_item(self, *args, **kwargs) -> dict:
+        return self.__read("get_item", self.table.get_item, *args, **kwargs)
+
+    def put_item(self, *args, **kwargs) -> dict:
+        return self.__request(
+            "put_item", throttling_codes, self.table.put_item, *args, **kwargs
+        )
+
+    def update_item(self, *args, **kwargs) -> dict:
+        return self.__request(
+            "update_item", throttling_codes, self.table.update_item, *args, **kwargs
+        )
+
+    def scan(self, *args, **kwargs) -> dict:
+        return self.__request("scan", retryable_codes, self.table.scan, *args, **kwargs)
+
+    def query(self, *args, **kwargs) -> dict:
+        return self.__read("query", self.table.query, *args, **kwargs)
+
+    def batch_get_item(self, keys: list[dict]) -> dict:
+        return self.__read("batch_get_item", self.table.batch_get_item, keys)
+
+    def batch_write_item(self, items: list[dict], delete_keys: list[dict] = ()) -> dict:
+        return self.__request(
+            "batch_write_item",
+            throttling_codes,
+            self.table.batch_write_item,
+            items,
+            delete_keys,
+        )
+
+    def __read(self, operation: str, method, *args, **kwargs) -> dict:
+        if self.hedge_after is None:
+            return self.__request(operation, retryable_codes, method, *args, **kwargs)
+
+        from concurrent import futures
+
+        executor = self.__get_executor()
+        first = executor.submit(
+            self.__request, operation, retryable_codes, method, *args, **kwargs
+        )
+        done, _ = futures.wait([first], timeout=self.hedge_after)
+        if done or not (self.rate_limiter is None or self.rate_limiter.try_acquire()):
+            return first.result()
+
+        recorder = metrics.get_recorder()
+        recorder.increment(
+            "dynamodb_hedges_total", operation=operation, table=self.name
+        )
+        hedge = executor.submit(
+            self.__request,
+            operation,
+            retryable_codes,
+            method,
+            *args,
+            acquired=True,
+            **kwargs,
+        )
+        done, pending = futures.wait(
+            [first, hedge], return_when=futures.FIRST_COMPLETED
+        )
+        winner = next(iter(done))
+        if winner.exception() is not None and pending:
+            # Use the other request, unless it fails too
+            winner = next(iter(pending))
+            winner.exception()
+
+        if winner is hedge and hedge.exception() is None:
+            recorder.increment(
+                "dynamodb_hedge_wins_total", operation=operation, table=self.name
+            )
+        return winner.result()
+
+    def __request(
+        self,
+        operation: str,
+        codes: frozenset[str],
+        method,
+        *args,
+        acquired: bool = False,
+        **kwargs,
+    ) -> dict:
+        recorder = metrics.get_recorder()
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None and not (acquired and attempt == 0):
+                self.rate_limiter.acquire()
+
+            try:
+                response = method(*args, **kwargs)
+            except dynamodb.client_error() as err:
+                code = err.response["Error"]["Code"]
+                if code not in codes:
+                    raise
+
+                if code in throttling_codes:
+                    recorder.increment(
+                        "dynamodb_throttles_total", operation=operation, table=self.name
+                    )
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.throttled()
+                if attempt == self.max_retries:
+                    raise
+
+                recorder.increment(
+                    "dynamodb_retries_total",
+                    operation=operation,
+                    table=self.name,
+                    code=code,
+                )
+                self.sleep(
+                    self.rng.uniform(
+                        0, min(self.max_backoff, self.backoff * 2**attempt)
+                    )
+                )
+            else:
+                if self.rate_limiter is not None:
+                    # Unprocessed keys or items of batch requests are throttled too
+                    if response.get("UnprocessedKeys") or response.get(
+                        "UnprocessedItems"
+                    ):
+                        self.rate_limiter.throttled()
+                    else:
+                        self.rate_limiter.succeeded()
+                return response
+
+    def __get_executor(self):
+        with self.__executor_lock:
+            if self.__executor is None:
+                from concurrent import futures
+
+                self.__executor = futures.ThreadPoolExecutor(self.hedge_workers)
+            return self.__executor
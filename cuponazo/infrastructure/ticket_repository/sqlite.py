@@ -0,0 +1,183 @@
+import sqlite3
+import threading
+from typing import Iterable, Iterator, Mapping
+
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+from cuponazo.domain import ticket_repository
+
+
+class TicketRepository(ticket_repository.Interface):
+    """Repository keeping the tickets in a local SQLite database, to run bulk checks (or tests) at disk speed
+    instead of going through the network.
+
+    Every ticket is a row with its id and its `ticket.Cuponazo.code`, indexed both by id (keeping the order the
+    tickets were added) and by code. The database uses WAL mode, so reads aren't blocked by a write, and every
+    bulk write is done in a single transaction.
+
+    Parameters
+    ----------
+    `path` (`str`)
+        Path of the database file, created if it doesn't exist. Use `":memory:"` for a database that only lives
+        as long as the repository.
+
+    `batch_size` (`int`)
+        Maximum amount of ids read by a single query in the bulk methods.
+
+    `ticket_type` (`type[ticket.Cuponazo]`)
+        The class of the tickets stored, every repository keeps the tickets of a single lottery.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS tickets (
+            seq INTEGER PRIMARY KEY,
+            ticket_id TEXT NOT NULL,
+            code INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS tickets_by_id ON tickets (ticket_id, seq);
+        CREATE INDEX IF NOT EXISTS tickets_by_code ON tickets (code);
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        ticket_type: type[ticket.Cuponazo] = ticket.Cuponazo,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.ticket_type = ticket_type
+        # The connection is shared by every thread, serialized by the lock
+        self.__lock = threading.Lock()
+        try:
+            self.__db = sqlite3.connect(path, check_same_thread=False)
+            self.__db.execute("PRAGMA journal_mode = WAL")
+            self.__db.execute("PRAGMA synchronous = NORMAL")
+            self.__db.executescript(self.schema)
+        except sqlite3.Error as err:
+            raise ticket_repository.Error(f"Problem opening '{path}': {err}")
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__db.close()
+
+    def __enter__(self) -> "TicketRepository":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get_tickets_by_id(self, ticket_id: str) -> list[ticket.Cuponazo]:
+        return self.get_ticket_batch_by_id(ticket_id).to_list()
+
+    def get_ticket_batch_by_id(self, ticket_id: str) -> ticket_batch.TicketBatch:
+        rows = self.__read(
+            f"getting tickets for '{ticket_id}'",
+            "SELECT code FROM tickets WHERE ticket_id = ? ORDER BY seq",
+            (ticket_id,),
+        )
+        return ticket_batch.TicketBatch((code for code, in rows), self.ticket_type)
+
+    def add_ticket_to_id(self, ticket_id: str, t: ticket.Cuponazo) -> None:
+        self.add_tickets_to_id(ticket_id, [t])
+
+    def add_tickets_to_id(
+        self,
+        ticket_id: str,
+        tickets: Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch,
+    ) -> None:
+        self.add_tickets({ticket_id: tickets})
+
+    def get_tickets_by_ids(
+        self, ticket_ids: Iterable[str]
+    ) -> dict[str, ticket_batch.TicketBatch]:
+        """Returns the tickets of every id in `ticket_ids`, reading up to `batch_size` ids per query. Ids
+        without tickets get an empty batch.
+        """
+        ids = list(dict.fromkeys(ticket_ids))
+        tickets = {
+            ticket_id: ticket_batch.TicketBatch(ticket_type=self.ticket_type)
+            for ticket_id in ids
+        }
+
+        for i in range(0, len(ids), self.batch_size):
+            chunk = ids[i : i + self.batch_size]
+            rows = self.__read(
+                "getting tickets in batch",
+                f"SELECT ticket_id, code FROM tickets WHERE ticket_id IN ({', '.join('?' * len(chunk))}) ORDER BY seq",
+                chunk,
+            )
+            for ticket_id, code in rows:
+                tickets[ticket_id].codes.append(code)
+
+        return tickets
+
+    def add_tickets(
+        self,
+        tickets: Mapping[str, Iterable[ticket.Cuponazo] | ticket_batch.TicketBatch],
+    ) -> None:
+        """Adds the tickets of every id in `tickets` in a single transaction, so either all of them or none are
+        stored.
+        """
+        rows = (
+            (ticket_id, code)
+            for ticket_id, id_tickets in tickets.items()
+            for code in ticket_batch.TicketBatch.from_tickets(
+                id_tickets, self.ticket_type
+            ).codes
+        )
+        with self.__lock:
+            try:
+                with self.__db:
+                    self.__db.executemany(
+                        "INSERT INTO tickets (ticket_id, code) VALUES (?, ?)", rows
+                    )
+            except sqlite3.Error as err:
+                raise ticket_repository.Error(
+                    f"Problem saving tickets to '{self.path}': {err}"
+                )
+
+    def iter_ticket_ids(self, page_size: int = 100) -> Iterator[list[str]]:
+        """Yields all the ids with tickets sorted, walking the id index for `page_size` ids at a time."""
+        last_id = ""
+        while True:
+            ids = [
+                ticket_id
+                for ticket_id, in self.__read(
+                    "getting ids",
+                    "SELECT DISTINCT ticket_id FROM tickets WHERE ticket_id > ? ORDER BY ticket_id LIMIT ?",
+                    (last_id, page_size),
+                )
+            ]
+            if not ids:
+                return
+
+            yield ids
+            last_id = ids[-1]
+
+    def get_ids_by_ticket(self, t: ticket.Cuponazo, serie: bool = True) -> set[str]:
+        """Returns the ids with the ticket `t`, or with any ticket with the number of `t` if `serie` is `False`,
+        looking them up in the code index.
+        """
+        if serie:
+            low, high = t.code, t.code
+        else:
+            serie_base = 10**ticket.Cuponazo.serie_length
+            low = t.code - t.code % serie_base
+            high = low + serie_base - 1
+
+        rows = self.__read(
+            f"getting ids with {t!r}",
+            "SELECT DISTINCT ticket_id FROM tickets WHERE code BETWEEN ? AND ?",
+            (low, high),
+        )
+        return {ticket_id for ticket_id, in rows}
+
+    def __read(self, action: str, query: str, parameters: Iterable) -> list[tuple]:
+        with self.__lock:
+            try:
+                return self.__db.execute(query, tuple(parameters)).fetchall()
+            except sqlite3.Error as err:
+                raise ticket_repository.Error(
+                    f"Problem {action} from '{self.path}': {err}"
+                )
@@ -0,0 +1,324 @@
+import array
+import glob
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from concurrent import futures
+from typing import BinaryIO, Callable, Iterator, Mapping
+
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+# Every block starts with: magic, format version, amount of ids and amount of tickets. It's followed by the
+# columns, as little endian arrays: length of every id, ids (UTF-8), tickets of every id, numbers and series.
+block_header = struct.Struct("<3sBII")
+block_magic = b"CTS"
+block_version = 1
+
+segment_pattern = "segment-*.cts"
+import_checkpoint = "import.checkpoint"
+
+
+class Error(Exception):
+    """Raised whenever a snapshot couldn't be read or written."""
+
+    pass
+
+
+class Progress:
+    """Amount of ids, tickets and bytes exported (or imported) so far, updated from several threads.
+
+    Parameters
+    ----------
+    `clock` (`Callable[[], float]`)
+        Returns the current time in seconds, used to compute the throughput.
+    """
+
+    __slots__ = ("ids", "tickets", "bytes", "started", "clock", "lock")
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ids = 0
+        self.tickets = 0
+        self.bytes = 0
+        self.clock = clock
+        self.started = clock()
+        self.lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    @property
+    def tickets_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.tickets / elapsed if elapsed > 0 else 0.0
+
+    def add(self, ids: int, tickets: int, nbytes: int) -> None:
+        with self.lock:
+            self.ids += ids
+            self.tickets += tickets
+            self.bytes += nbytes
+
+    def __repr__(self) -> str:
+        return f"Progress(ids={self.ids}, tickets={self.tickets}, bytes={self.bytes}, tickets_per_second={self.tickets_per_second:.0f})"
+
+
+def write_block(f: BinaryIO, tickets: Mapping[str, ticket_batch.TicketBatch]) -> int:
+    """Writes the tickets of every id in `tickets` to `f` as a columnar block.
+
+    Returns
+    -------
+    `int`
+        The amount of bytes written.
+    """
+    ids = [ticket_id.encode() for ticket_id in tickets]
+    numbers = array.array(ticket_batch.typecode)
+    series = array.array("H")
+    for batch in tickets.values():
+        batch_numbers, batch_series = batch.split()
+        numbers.fromlist(batch_numbers.tolist())
+        series.extend(batch_series)
+
+    block = b"".join(
+        [
+            block_header.pack(block_magic, block_version, len(ids), len(numbers)),
+            _to_bytes(array.array("H", map(len, ids))),
+            b"".join(ids),
+            _to_bytes(array.array(ticket_batch.typecode, map(len, tickets.values()))),
+            _to_bytes(numbers),
+            _to_bytes(series),
+        ]
+    )
+    f.write(block)
+    return len(block)
+
+
+def read_blocks(
+    f: BinaryIO,
+    ticket_type: type[ticket.Cuponazo] = ticket.Cuponazo,
+) -> Iterator[tuple[dict[str, ticket_batch.TicketBatch], int]]:
+    """Yields the tickets of every block written by `write_block` in `f`, from its current position, together
+    with the offset right after the block. Blocks don't keep the lottery of the tickets, they're read as
+    `ticket_type`.
+    """
+    serie_base = 10**ticket.Cuponazo.serie_length
+    while True:
+        header = f.read(block_header.size)
+        if not header:
+            return
+
+        magic, version, id_count, ticket_count = block_header.unpack(
+            _read_exactly(f, header, block_header.size)
+        )
+        if magic != block_magic or version != block_version:
+            raise Error(f"Unknown block format {magic!r} version {version}")
+
+        lengths = _from_bytes("H", _read_exactly(f, b"", id_count * 2))
+        ids = memoryview(_read_exactly(f, b"", sum(lengths)))
+        counts = _from_bytes(ticket_batch.typecode, _read_exactly(f, b"", id_count * 4))
+        numbers = _from_bytes(
+            ticket_batch.typecode, _read_exactly(f, b"", ticket_count * 4)
+        )
+        series = _from_bytes("H", _read_exactly(f, b"", ticket_count * 2))
+
+        tickets = {}
+        id_start = ticket_start = 0
+        for length, count in zip(lengths, counts):
+            ticket_id = str(ids[id_start : id_start + length], "utf-8")
+            tickets[ticket_id] = ticket_batch.TicketBatch(
+                (
+                    number * serie_base + serie
+                    for number, serie in zip(
+                        numbers[ticket_start : ticket_start + count],
+                        series[ticket_start : ticket_start + count],
+                    )
+                ),
+                ticket_type,
+            )
+            id_start += length
+            ticket_start += count
+
+        yield tickets, f.tell()
+
+
+def export_tickets(
+    repository: dynamodb.TicketRepository,
+    directory: str,
+    segments: int = 4,
+    page_size: int = 100,
+    progress: Callable[[Progress], None] | None = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> Progress:
+    """Exports all the tickets in `repository` to a snapshot in `directory`, scanning `segments` segments of
+    the table in parallel. Every segment is written to its own file, one block per page of `page_size` items,
+    so the memory used doesn't depend on the size of the table.
+
+    After every block, the offset of the file and the key to resume the scan are stored in a checkpoint next
+    to it. Calling it again after an interruption continues every segment from its checkpoint.
+
+    Parameters
+    ----------
+    `progress` (`Callable[[Progress], None]`)
+        Called after every block written.
+
+    Returns
+    -------
+    `Progress`
+        The amount of ids, tickets and bytes exported by this call.
+    """
+    os.makedirs(directory, exist_ok=True)
+    stats = Progress(clock)
+    with futures.ThreadPoolExecutor(segments) as executor:
+        # Consume the results to raise any error
+        list(
+            executor.map(
+                lambda segment: _export_segment(
+                    repository, directory, segment, segments, page_size, stats, progress
+                ),
+                range(segments),
+            )
+        )
+    return stats
+
+
+def import_tickets(
+    repository: dynamodb.TicketRepository,
+    directory: str,
+    workers: int = 4,
+    progress: Callable[[Progress], None] | None = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> Progress:
+    """Loads the snapshot in `directory` into `repository`, replacing the items of the ids in it (see
+    `dynamodb.TicketRepository.put_tickets`). Up to `workers` segment files are loaded in parallel.
+
+    The offset of every file already loaded is stored in a checkpoint in `directory`, so calling it again after
+    an interruption continues where it stopped. Remove the checkpoint to load the snapshot again.
+
+    Parameters
+    ----------
+    `progress` (`Callable[[Progress], None]`)
+        Called after every block loaded.
+
+    Returns
+    -------
+    `Progress`
+        The amount of ids, tickets and bytes imported by this call.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, segment_pattern)))
+    for path in paths:
+        checkpoint = _load_checkpoint(f"{path}.checkpoint")
+        if checkpoint is None or not checkpoint["done"]:
+            raise Error(f"Snapshot '{path}' wasn't completely exported")
+
+    checkpoint_path = os.path.join(directory, import_checkpoint)
+    offsets = _load_checkpoint(checkpoint_path) or {}
+    lock = threading.Lock()
+    stats = Progress(clock)
+
+    def import_segment(path: str) -> None:
+        name = os.path.basename(path)
+        with open(path, "rb") as f:
+            f.seek(offsets.get(name, 0))
+            start = f.tell()
+            for tickets, offset in read_blocks(f, repository.ticket_type):
+                repository.put_tickets(tickets)
+                with lock:
+                    offsets[name] = offset
+                    _store_checkpoint(checkpoint_path, offsets)
+
+                stats.add(len(tickets), sum(map(len, tickets.values())), offset - start)
+                start = offset
+                if progress is not None:
+                    progress(stats)
+
+    with futures.ThreadPoolExecutor(workers) as executor:
+        list(executor.map(import_segment, paths))
+    return stats
+
+
+def _export_segment(
+    repository: dynamodb.TicketRepository,
+    directory: str,
+    segment: int,
+    segments: int,
+    page_size: int,
+    stats: Progress,
+    progress: Callable[[Progress], None] | None,
+) -> None:
+    path = os.path.join(directory, f"segment-{segment:04d}.cts")
+    checkpoint_path = f"{path}.checkpoint"
+    checkpoint = _load_checkpoint(checkpoint_path) or {
+        "segments": segments,
+        "offset": 0,
+        "start_key": None,
+        "done": False,
+    }
+    if checkpoint["segments"] != segments:
+        raise Error(
+            f"Snapshot '{path}' was exported with {checkpoint['segments']} segments, not {segments}"
+        )
+    if checkpoint["done"]:
+        return
+
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        # Drop any block written after the last checkpoint
+        f.truncate(checkpoint["offset"])
+        f.seek(checkpoint["offset"])
+
+        for tickets, start_key in repository.scan_tickets(
+            segment, segments, page_size, checkpoint["start_key"]
+        ):
+            nbytes = write_block(f, tickets) if tickets else 0
+            f.flush()
+            os.fsync(f.fileno())
+
+            checkpoint.update(
+                offset=f.tell(), start_key=start_key, done=start_key is None
+            )
+            _store_checkpoint(checkpoint_path, checkpoint)
+
+            stats.add(len(tickets), sum(map(len, tickets.values())), nbytes)
+            if progress is not None:
+                progress(stats)
+
+
+def _to_bytes(values: array.array) -> bytes:
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array.array:
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _read_exactly(f: BinaryIO, data: bytes, size: int) -> bytes:
+    data += f.read(size - len(data))
+    if len(data) != size:
+        raise Error(f"Truncated block in '{getattr(f, 'name', f)}'")
+    return data
+
+
+def _load_checkpoint(path: str) -> dict | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _store_checkpoint(path: str, checkpoint: dict) -> None:
+    # Written atomically, an interruption leaves the previous checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,117 @@
+from unittest import TestCase
+
+from benchmark import fake_table
+from cuponazo.domain import ticket
+from cuponazo.infrastructure.ticket_repository import caching, dynamodb
+
+ticket_id = "2023-02-11"
+some_ticket = ticket.Cuponazo("12345", "321")
+other_ticket = ticket.Cuponazo("00000", "000")
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Test_CachingTicketRepository(TestCase):
+    def setUp(self) -> None:
+        self.table = fake_table.InMemoryTable()
+        self.repo = dynamodb.TicketRepository(self.table)
+        self.repo.add_ticket_to_id(ticket_id, some_ticket)
+        self.clock = FakeClock()
+        self.cache = caching.CachingTicketRepository(
+            self.repo, max_size=2, ttl=10, clock=self.clock
+        )
+
+    def test_second_read_is_a_hit(self):
+        self.assertEqual(self.cache.get_tickets_by_id(ticket_id), [some_ticket])
+        self.assertEqual(self.cache.get_tickets_by_id(ticket_id), [some_ticket])
+
+        self.assertEqual(self.table.calls["get_item"], 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_returned_tickets_are_copies(self):
+        self.cache.get_ticket_batch_by_id(ticket_id).codes.append(other_ticket.code)
+        self.cache.get_tickets_by_id(ticket_id).append(other_ticket)
+
+        self.assertEqual(self.cache.get_tickets_by_id(ticket_id), [some_ticket])
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.get_tickets_by_id(ticket_id)
+
+        self.clock.now = 9.9
+        self.cache.get_tickets_by_id(ticket_id)
+        self.clock.now = 10
+        self.cache.get_tickets_by_id(ticket_id)
+
+        self.assertEqual(self.table.calls["get_item"], 2)
+        self.assertEqual(self.cache.expirations, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.get_tickets_by_id("first")
+        self.cache.get_tickets_by_id("second")
+        self.cache.get_tickets_by_id("first")
+        self.cache.get_tickets_by_id("third")
+
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(len(self.cache), 2)
+        self.cache.get_tickets_by_id("first")
+        self.assertEqual(self.cache.hits, 2)
+        self.cache.get_tickets_by_id("second")
+        self.assertEqual(self.table.calls["get_item"], 4)
+
+    def test_writes_invalidate_the_id(self):
+        self.cache.get_tickets_by_id(ticket_id)
+
+        self.cache.add_ticket_to_id(ticket_id, other_ticket)
+
+        self.assertEqual(
+            self.cache.get_tickets_by_id(ticket_id), [some_ticket, other_ticket]
+        )
+        self.cache.add_tickets({ticket_id: [other_ticket]})
+        self.assertEqual(
+            self.cache.get_tickets_by_id(ticket_id),
+            [some_ticket, other_ticket, other_ticket],
+        )
+        self.assertEqual(self.table.calls["get_item"], 3)
+
+    def test_write_while_reading_is_not_cached(self):
+        get_ticket_batch_by_id = self.repo.get_ticket_batch_by_id
+
+        def read_and_write(ticket_id):
+            # Another writer adds a ticket after we read but before we cache it
+            batch = get_ticket_batch_by_id(ticket_id)
+            self.cache.add_ticket_to_id(ticket_id, other_ticket)
+            return batch
+
+        self.repo.get_ticket_batch_by_id = read_and_write
+        self.assertEqual(self.cache.get_tickets_by_id(ticket_id), [some_ticket])
+        self.repo.get_ticket_batch_by_id = get_ticket_batch_by_id
+
+        self.assertEqual(
+            self.cache.get_tickets_by_id(ticket_id), [some_ticket, other_ticket]
+        )
+
+    def test_get_tickets_by_ids_only_reads_misses(self):
+        self.cache.get_tickets_by_id(ticket_id)
+
+        resp = self.cache.get_tickets_by_ids([ticket_id, "unknown"])
+
+        self.assertEqual(resp[ticket_id].to_list(), [some_ticket])
+        self.assertEqual(resp["unknown"].to_list(), [])
+        self.assertEqual(self.table.calls["batch_get_item"], 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.cache.get_tickets_by_id("unknown")
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_failed_read_is_not_cached(self):
+        self.table.get_item = None
+
+        with self.assertRaises(TypeError):
+            self.cache.get_tickets_by_id(ticket_id)
+        self.assertEqual(len(self.cache), 0)
@@ -0,0 +1,101 @@
+import collections
+from unittest import TestCase
+
+from benchmark import fake_table
+from cuponazo.application import draw_runner, ticket_checker
+from cuponazo.domain import ticket
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+results = [ticket.Cuponazo("12345", "321"), ticket.Cuponazo("54321", "123")]
+
+
+def build_repository(users: int) -> dynamodb.TicketRepository:
+    repo = dynamodb.TicketRepository(fake_table.InMemoryTable())
+    repo.add_tickets(
+        {
+            f"user-{i}": [
+                ticket.Cuponazo(f"{(i * 7919 + j * 104729) % 100000:05d}", f"{j:03d}")
+                for j in range(i % 5)
+            ]
+            for i in range(users)
+        }
+    )
+    repo.add_ticket_to_id("winner", results[0])
+    return repo
+
+
+def expected_summaries(
+    repo: dynamodb.TicketRepository,
+) -> dict[str, draw_runner.PrizeSummary]:
+    checkers = [ticket_checker.TicketChecker(r) for r in results]
+    summaries = {}
+    for ids in repo.iter_ticket_ids():
+        for ticket_id in ids:
+            tickets = repo.get_tickets_by_id(ticket_id)
+            prizes = collections.Counter(
+                c.check_ticket(t) for t in tickets for c in checkers
+            )
+            del prizes[0]
+            summaries[ticket_id] = draw_runner.PrizeSummary(
+                ticket_id, len(tickets), dict(sorted(prizes.items()))
+            )
+    return summaries
+
+
+class PageCountingRepository(dynamodb.TicketRepository):
+    def __init__(self, table) -> None:
+        super().__init__(table)
+        self.pages = 0
+
+    def iter_ticket_ids(self, page_size: int = 100):
+        for page in super().iter_ticket_ids(page_size):
+            self.pages += 1
+            yield page
+
+
+class Test_DrawRunner_Run(TestCase):
+    def test_in_process(self):
+        repo = build_repository(300)
+
+        summaries = list(
+            draw_runner.DrawRunner(repo, results, workers=0, page_size=32).run()
+        )
+
+        self.assertEqual({s.ticket_id: s for s in summaries}, expected_summaries(repo))
+        self.assertEqual(len(summaries), 301)
+
+    def test_process_pool(self):
+        repo = build_repository(300)
+
+        summaries = list(
+            draw_runner.DrawRunner(repo, results, workers=2, page_size=32).run()
+        )
+
+        self.assertEqual({s.ticket_id: s for s in summaries}, expected_summaries(repo))
+        winner = next(s for s in summaries if s.ticket_id == "winner")
+        self.assertEqual(winner.best, 6)
+
+    def test_bounded_in_flight_pages(self):
+        table = build_repository(300).table
+        repo = PageCountingRepository(table)
+
+        run = draw_runner.DrawRunner(
+            repo, results, workers=1, page_size=10, max_in_flight=2
+        ).run()
+        next(run)
+
+        self.assertLessEqual(repo.pages, 3)
+        self.assertEqual(len(list(run)), 300)
+
+    def test_empty_repository(self):
+        repo = dynamodb.TicketRepository(fake_table.InMemoryTable())
+
+        self.assertEqual(
+            list(draw_runner.DrawRunner(repo, results, workers=2).run()), []
+        )
+
+
+class Test_PrizeSummary(TestCase):
+    def test_best(self):
+        self.assertEqual(draw_runner.PrizeSummary("id", 3, {1: 2, 4: 1}).best, 4)
+        self.assertEqual(draw_runner.PrizeSummary("id", 3, {}).best, 0)
@@ -1,12 +1,16 @@
 import json
 import logging
+import subprocess
+import sys
+from concurrent import futures
 
 from unittest import TestCase
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from botocore.exceptions import ClientError
 
-from cuponazo.domain import ticket, ticket_repository
+from benchmark import fake_table
+from cuponazo.domain import ticket, ticket_batch, ticket_repository
 from cuponazo.infrastructure.ticket_repository import dynamodb
 
 table_name = "some_table"
@@ -64,31 +68,106 @@ class Test_TicketRepository_GetTicketById(TestCase):
         mocked_dyndb.put_item.assert_not_called()
 
 
+class Test_TicketRepository_GetTicketBatchById(TestCase):
+    def test_returns_correct_batch_of_tickets(self):
+        mocked_dyndb = build_mocked_dyndb(get_item_returns=db_item)
+
+        repo = dynamodb.TicketRepository(mocked_dyndb)
+        resp = repo.get_ticket_batch_by_id(ticket_id)
+
+        self.assertEqual(
+            resp,
+            ticket_batch.TicketBatch.from_tickets(
+                [ticket.Cuponazo(ticket_number, ticket_serie)]
+            ),
+        )
+        mocked_dyndb.get_item.assert_called_once_with(Key={"Id": ticket_id})
+
+    def test_specified_ticket_id_does_not_exist(self):
+        mocked_dyndb = build_mocked_dyndb(get_item_returns={})
+
+        repo = dynamodb.TicketRepository(mocked_dyndb)
+        resp = repo.get_ticket_batch_by_id(ticket_id)
+
+        self.assertEqual(len(resp), 0)
+
+
+class Test_TicketRepository_TicketType(TestCase):
+    def test_keeps_the_ticket_class(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table, ticket_type=ticket.CuponDiario)
+        tickets = [
+            ticket.CuponDiario("12345", "321"),
+            ticket.CuponDiario("00001", "000"),
+        ]
+
+        repo.add_tickets_to_id(ticket_id, tickets[:1])
+        repo.add_tickets({ticket_id: tickets[1:]})
+
+        self.assertEqual(repo.get_tickets_by_id(ticket_id), tickets)
+        self.assertEqual(
+            repo.get_tickets_by_ids([ticket_id])[ticket_id].to_list(), tickets
+        )
+        repo.compact_tickets(ticket_id)
+        self.assertEqual(repo.get_tickets_by_id(ticket_id), tickets)
+        with self.assertRaises(TypeError):
+            repo.add_ticket_to_id(ticket_id, ticket.Cuponazo("12345", "321"))
+
+
 class Test_TicketRepository_AddTicketToId(TestCase):
     new_ticket_number = "12345"
     new_ticket_serie = "321"
 
     def test_adds_ticket_without_issues(self):
-        mocked_dyndb = build_mocked_dyndb(get_item_returns=db_item)
+        mocked_dyndb = build_mocked_dyndb()
         repo = dynamodb.TicketRepository(mocked_dyndb)
 
         repo.add_ticket_to_id(
             ticket_id, ticket.Cuponazo(self.new_ticket_number, self.new_ticket_serie)
         )
 
-        expected_tickets = json.dumps(
-            [
-                {"number": ticket_number, "serie": ticket_serie},
-                {"number": self.new_ticket_number, "serie": self.new_ticket_serie},
-            ]
+        mocked_dyndb.update_item.assert_called_once_with(
+            Key={"Id": ticket_id},
+            UpdateExpression=dynamodb.TicketRepository.append_expression,
+            ExpressionAttributeValues={
+                ":empty": [],
+                ":tickets": [self.new_ticket_number + self.new_ticket_serie],
+                ":one": 1,
+            },
         )
-        mocked_dyndb.put_item.assert_called_once_with(
-            Item={"Id": ticket_id, "Tickets": expected_tickets}
+        mocked_dyndb.get_item.assert_not_called()
+        mocked_dyndb.put_item.assert_not_called()
+
+    def test_adds_batch_of_tickets_with_a_single_write(self):
+        mocked_dyndb = build_mocked_dyndb()
+        repo = dynamodb.TicketRepository(mocked_dyndb)
+
+        repo.add_tickets_to_id(
+            ticket_id,
+            ticket_batch.TicketBatch.from_tickets(
+                [
+                    ticket.Cuponazo(self.new_ticket_number, self.new_ticket_serie),
+                    ticket.Cuponazo("00000", "000"),
+                ]
+            ),
         )
-        mocked_dyndb.get_item.assert_called_once_with(Key={"Id": ticket_id})
 
-    def test_aws_sdk_raises_client_error_when_getting_items(self):
-        mocked_dyndb = build_mocked_dyndb(get_item_raises=client_error)
+        mocked_dyndb.update_item.assert_called_once_with(
+            Key={"Id": ticket_id},
+            UpdateExpression=dynamodb.TicketRepository.append_expression,
+            ExpressionAttributeValues={
+                ":empty": [],
+                ":tickets": [
+                    self.new_ticket_number + self.new_ticket_serie,
+                    "00000000",
+                ],
+                ":one": 1,
+            },
+        )
+        mocked_dyndb.get_item.assert_not_called()
+
+    def test_aws_sdk_raises_client_error_when_updating_items(self):
+        mocked_dyndb = build_mocked_dyndb(update_item_raises=client_error)
         repo = dynamodb.TicketRepository(mocked_dyndb)
 
         with self.assertRaises(ticket_repository.Error):
@@ -96,46 +175,392 @@ class Test_TicketRepository_AddTicketToId(TestCase):
                 ticket_id,
                 ticket.Cuponazo(self.new_ticket_number, self.new_ticket_serie),
             )
-        mocked_dyndb.get_item.assert_called_once_with(Key={"Id": ticket_id})
-        mocked_dyndb.put_item.assert_not_called()
+        mocked_dyndb.update_item.assert_called_once()
+
+    def test_appends_after_legacy_tickets(self):
+        table = fake_table.InMemoryTable(table_name)
+        table.put_item(Item=db_item["Item"])
+        repo = dynamodb.TicketRepository(table)
+        new_ticket = ticket.Cuponazo("00000", "000")
+
+        repo.add_ticket_to_id(ticket_id, new_ticket)
+        repo.add_ticket_to_id(ticket_id, new_ticket)
+
+        self.assertEqual(
+            repo.get_tickets_by_id(ticket_id),
+            [ticket.Cuponazo(ticket_number, ticket_serie), new_ticket, new_ticket],
+        )
+        self.assertEqual(table.items[ticket_id]["Version"], 2)
+
+    def test_concurrent_appends_are_not_lost(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table)
+        tickets = [ticket.Cuponazo(f"{i:05d}", "000") for i in range(200)]
+
+        with futures.ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda t: repo.add_ticket_to_id(ticket_id, t), tickets))
+
+        self.assertCountEqual(repo.get_tickets_by_id(ticket_id), tickets)
+
+
+class Test_TicketRepository_MigrateLegacyTickets(TestCase):
+    def test_migrates_legacy_item(self):
+        table = fake_table.InMemoryTable(table_name)
+        table.put_item(Item=db_item["Item"])
+        repo = dynamodb.TicketRepository(table)
+
+        migrated = repo.migrate_legacy_tickets(ticket_id)
+
+        self.assertTrue(migrated)
+        self.assertEqual(
+            table.items[ticket_id],
+            {
+                "Id": ticket_id,
+                "TicketsBin": b"CUP\x01\x01\x00\x00\x00"
+                + int(ticket_number + ticket_serie).to_bytes(4, "little"),
+                "Version": 1,
+            },
+        )
+        self.assertEqual(
+            repo.get_tickets_by_id(ticket_id),
+            [ticket.Cuponazo(ticket_number, ticket_serie)],
+        )
+
+    def test_does_nothing_without_legacy_tickets(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table)
+        repo.add_ticket_to_id(ticket_id, ticket.Cuponazo("00000", "000"))
+
+        self.assertFalse(repo.migrate_legacy_tickets(ticket_id))
+        self.assertFalse(repo.migrate_legacy_tickets("unknown"))
+
+    def test_retries_when_item_changes_while_migrating(self):
+        table = fake_table.InMemoryTable(table_name)
+        table.put_item(Item=db_item["Item"])
+        repo = dynamodb.TicketRepository(table)
+        new_ticket = ticket.Cuponazo("00000", "000")
+        get_item = table.get_item
+
+        def get_item_and_append(**kwargs):
+            # Another writer appends between our read and our conditional write
+            response = get_item(**kwargs)
+            if table.calls["get_item"] == 1:
+                repo.add_ticket_to_id(ticket_id, new_ticket)
+            return response
+
+        table.get_item = get_item_and_append
+
+        self.assertTrue(repo.migrate_legacy_tickets(ticket_id))
+        self.assertEqual(table.calls["get_item"], 2)
+        self.assertEqual(
+            repo.get_tickets_by_id(ticket_id),
+            [ticket.Cuponazo(ticket_number, ticket_serie), new_ticket],
+        )
+        self.assertNotIn("Tickets", table.items[ticket_id])
+
+
+class Binary:
+    """Like `boto3.dynamodb.types.Binary`, the type boto3 returns for binary attributes."""
+
+    def __init__(self, value: bytes) -> None:
+        self.value = value
+
+
+class Test_TicketRepository_CompactTickets(TestCase):
+    def test_compacts_appended_and_legacy_tickets(self):
+        table = fake_table.InMemoryTable(table_name)
+        table.put_item(Item=db_item["Item"])
+        repo = dynamodb.TicketRepository(table)
+        tickets = [ticket.Cuponazo(f"{i:05d}", f"{i % 1000:03d}") for i in range(100)]
+        repo.add_tickets_to_id(ticket_id, tickets)
+        expected = [ticket.Cuponazo(ticket_number, ticket_serie)] + tickets
+        size = len(json.dumps(table.items[ticket_id]))
+
+        self.assertTrue(repo.compact_tickets(ticket_id))
+        self.assertFalse(repo.compact_tickets(ticket_id))
+        self.assertFalse(repo.compact_tickets("unknown"))
+        self.assertEqual(set(table.items[ticket_id]), {"Id", "TicketsBin", "Version"})
+        self.assertEqual(len(table.items[ticket_id]["TicketsBin"]), 8 + 4 * 101)
+        self.assertLess(len(table.items[ticket_id]["TicketsBin"]), size / 3)
+        self.assertEqual(repo.get_tickets_by_id(ticket_id), expected)
+
+        new_ticket = ticket.Cuponazo("99999", "999")
+        repo.add_ticket_to_id(ticket_id, new_ticket)
+
+        self.assertEqual(repo.get_tickets_by_id(ticket_id), expected + [new_ticket])
+        self.assertEqual(
+            repo.get_tickets_by_ids([ticket_id])[ticket_id].to_list(),
+            expected + [new_ticket],
+        )
+
+    def test_reads_boto3_binary_values(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table)
+        repo.add_ticket_to_id(ticket_id, ticket.Cuponazo(ticket_number, ticket_serie))
+        repo.compact_tickets(ticket_id)
+        table.items[ticket_id]["TicketsBin"] = Binary(
+            table.items[ticket_id]["TicketsBin"]
+        )
+
+        self.assertEqual(
+            repo.get_tickets_by_id(ticket_id),
+            [ticket.Cuponazo(ticket_number, ticket_serie)],
+        )
+
+    def test_rejects_unknown_or_corrupted_data(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table)
+        for data in [
+            b"CUP",
+            b"CUP\x02\x00\x00\x00\x00",
+            b"XYZ\x01\x00\x00\x00\x00",
+            b"CUP\x01\x02\x00\x00\x00\x00\x00\x00\x00",
+        ]:
+            table.put_item(Item={"Id": ticket_id, "TicketsBin": data})
+
+            with self.assertRaises(ticket_repository.Error):
+                repo.get_tickets_by_id(ticket_id)
+
+
+class Test_TicketRepository_Sharding(TestCase):
+    def test_rolls_over_to_new_shards(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table, shard_size=10)
+        tickets = [ticket.Cuponazo(f"{i:05d}", f"{i % 1000:03d}") for i in range(35)]
+
+        repo.add_tickets_to_id(ticket_id, tickets[:4])
+        for t in tickets[4:9]:
+            repo.add_ticket_to_id(ticket_id, t)
+        repo.add_tickets_to_id(ticket_id, tickets[9:35])
+
+        self.assertEqual(table.items[ticket_id]["Shards"], 4)
+        self.assertEqual(
+            [
+                len(table.items[repo.shard_key(ticket_id, s)]["TicketList"])
+                for s in range(4)
+            ],
+            [9, 10, 10, 6],
+        )
+        self.assertEqual(table.items[f"{ticket_id}#3"]["ShardOf"], ticket_id)
+
+        table.calls.clear()
+        self.assertEqual(repo.get_tickets_by_id(ticket_id), tickets)
+        self.assertEqual(table.calls, {"get_item": 1, "batch_get_item": 1})
+        self.assertEqual(
+            repo.get_tickets_by_ids([ticket_id, "unknown"])[ticket_id].to_list(),
+            tickets,
+        )
+        self.assertEqual(list(repo.iter_ticket_ids()), [[ticket_id]])
+        self.assertEqual(
+            [page for page, _ in repo.scan_tickets(page_size=2) if page],
+            [{ticket_id: ticket_batch.TicketBatch.from_tickets(tickets)}],
+        )
+
+    def test_only_appends_to_the_last_shard(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table, shard_size=10)
+        repo.add_tickets_to_id(ticket_id, [ticket.Cuponazo("12345", "321")] * 25)
+
+        table.calls.clear()
+        repo.add_ticket_to_id(ticket_id, ticket.Cuponazo("12345", "321"))
+
+        self.assertEqual(table.calls, {"update_item": 1})
+        self.assertEqual(len(table.items[f"{ticket_id}#2"]["TicketList"]), 6)
+
+    def test_writers_with_outdated_shards(self):
+        table = fake_table.InMemoryTable(table_name)
+        first = dynamodb.TicketRepository(table, shard_size=10)
+        second = dynamodb.TicketRepository(table, shard_size=10)
+        first.add_tickets_to_id(ticket_id, [ticket.Cuponazo("00001", "001")] * 10)
+        second.add_tickets_to_id(ticket_id, [ticket.Cuponazo("00002", "002")] * 10)
+
+        first.add_tickets_to_id(ticket_id, [ticket.Cuponazo("00003", "003")] * 10)
+
+        self.assertEqual(table.items[ticket_id]["Shards"], 3)
+        self.assertEqual(
+            first.get_tickets_by_id(ticket_id),
+            [ticket.Cuponazo("00001", "001")] * 10
+            + [ticket.Cuponazo("00002", "002")] * 10
+            + [ticket.Cuponazo("00003", "003")] * 10,
+        )
+
+    def test_single_item_ids(self):
+        table = fake_table.InMemoryTable(table_name)
+        table.put_item(Item=db_item["Item"])
+        repo = dynamodb.TicketRepository(table, shard_size=10)
+        new_ticket = ticket.Cuponazo("99999", "999")
+
+        repo.add_ticket_to_id(ticket_id, new_ticket)
+
+        self.assertIn("Tickets", table.items[ticket_id])
+        self.assertEqual(table.items[ticket_id]["Shards"], 2)
+        self.assertEqual(
+            repo.get_tickets_by_id(ticket_id),
+            [ticket.Cuponazo(ticket_number, ticket_serie), new_ticket],
+        )
+        self.assertTrue(repo.compact_tickets(ticket_id))
+        self.assertEqual(table.items[ticket_id]["Shards"], 2)
+        self.assertEqual(
+            dynamodb.TicketRepository(table).get_tickets_by_id(ticket_id),
+            [ticket.Cuponazo(ticket_number, ticket_serie), new_ticket],
+        )
+
+
+class Test_TicketRepository_PutTickets(TestCase):
+    def test_splits_big_ids_in_shards(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table)
+        repo.binary_shard_size = 10
+        batch = ticket_batch.TicketBatch(range(25))
+
+        repo.put_tickets({ticket_id: batch, "other": batch[:3]})
+        repo.put_tickets({ticket_id: batch})
+
+        self.assertEqual(table.items[ticket_id]["Shards"], 3)
+        self.assertEqual(len(table.items[f"{ticket_id}#2"]["TicketsBin"]), 8 + 4 * 5)
+        self.assertEqual(repo.get_ticket_batch_by_id(ticket_id), batch)
+        self.assertEqual(repo.get_ticket_batch_by_id("other"), batch[:3])
+        self.assertEqual(list(repo.iter_ticket_ids()), [[ticket_id, "other"]])
+
+    def test_removes_stale_shards(self):
+        table = fake_table.InMemoryTable(table_name)
+        repo = dynamodb.TicketRepository(table, shard_size=10)
+        repo.add_tickets_to_id(ticket_id, ticket_batch.TicketBatch(range(35)))
+
+        repo.put_tickets({ticket_id: ticket_batch.TicketBatch(range(12))})
 
-    def test_aws_sdk_raises_client_error_when_putting_items(self):
-        mocked_dyndb = build_mocked_dyndb(
-            get_item_returns=db_item,
-            put_item_raises=client_error,
+        self.assertEqual(set(table.items), {ticket_id, f"{ticket_id}#1"})
+        self.assertEqual(
+            repo.get_ticket_batch_by_id(ticket_id), ticket_batch.TicketBatch(range(12))
         )
 
+        repo.add_tickets_to_id(ticket_id, ticket_batch.TicketBatch([99]))
+        self.assertEqual(
+            repo.get_ticket_batch_by_id(ticket_id),
+            ticket_batch.TicketBatch([*range(12), 99]),
+        )
+        self.assertEqual(table.items[f"{ticket_id}#2"]["TicketList"], ["00000099"])
+
+
+class Test_TicketRepository_GetTicketsByIds(TestCase):
+    def test_returns_tickets_of_every_id(self):
+        table = build_in_memory_table(250)
+        repo = dynamodb.TicketRepository(table)
+
+        resp = repo.get_tickets_by_ids([f"user-{i}" for i in range(260)])
+
+        self.assertEqual(len(resp), 260)
+        for i in range(250):
+            self.assertEqual(resp[f"user-{i}"].to_list(), user_tickets(i))
+        for i in range(250, 260):
+            self.assertEqual(len(resp[f"user-{i}"]), 0)
+        # Chunked to the 100 keys limit
+        self.assertEqual(table.calls["batch_get_item"], 3)
+        self.assertEqual(table.calls["get_item"], 0)
+
+    def test_retries_unprocessed_keys(self):
+        table = build_in_memory_table(50, max_batch_processed=20)
+        repo = dynamodb.TicketRepository(table, backoff=0)
+
+        resp = repo.get_tickets_by_ids([f"user-{i}" for i in range(50)])
+
+        for i in range(50):
+            self.assertEqual(resp[f"user-{i}"].to_list(), user_tickets(i))
+        self.assertEqual(table.calls["batch_get_item"], 3)
+
+    def test_gives_up_when_keys_are_never_processed(self):
+        table = build_in_memory_table(5, max_batch_processed=0)
+        repo = dynamodb.TicketRepository(table, max_retries=2, backoff=0)
+
+        with self.assertRaises(ticket_repository.Error):
+            repo.get_tickets_by_ids([f"user-{i}" for i in range(5)])
+        self.assertEqual(table.calls["batch_get_item"], 3)
+
+    def test_aws_sdk_raises_client_error(self):
+        mocked_dyndb = build_mocked_dyndb()
+        mocked_dyndb.batch_get_item = Mock(side_effect=client_error)
         repo = dynamodb.TicketRepository(mocked_dyndb)
 
         with self.assertRaises(ticket_repository.Error):
-            repo.add_ticket_to_id(
-                ticket_id,
-                ticket.Cuponazo(self.new_ticket_number, self.new_ticket_serie),
+            repo.get_tickets_by_ids([ticket_id])
+
+
+class Test_TicketRepository_AddTickets(TestCase):
+    def test_adds_tickets_to_every_id(self):
+        table = build_in_memory_table(30)
+        repo = dynamodb.TicketRepository(table)
+        new_ticket = ticket.Cuponazo("00000", "000")
+
+        repo.add_tickets({f"user-{i}": [new_ticket] for i in range(60)})
+
+        for i in range(30):
+            self.assertEqual(
+                repo.get_tickets_by_id(f"user-{i}"), user_tickets(i) + [new_ticket]
             )
-        mocked_dyndb.get_item.assert_called_once_with(Key={"Id": ticket_id})
-        mocked_dyndb.put_item.assert_called_once_with(
+        for i in range(30, 60):
+            self.assertEqual(repo.get_tickets_by_id(f"user-{i}"), [new_ticket])
+        self.assertEqual(table.calls["update_item"], 60)
+        self.assertEqual(table.calls["put_item"], 0)
+
+    def test_aws_sdk_raises_client_error(self):
+        mocked_dyndb = build_mocked_dyndb(update_item_raises=client_error)
+        repo = dynamodb.TicketRepository(mocked_dyndb)
+
+        with self.assertRaises(ticket_repository.Error):
+            repo.add_tickets({ticket_id: [ticket.Cuponazo("00000", "000")]})
+
+
+class Test_TicketRepository_IterTicketIds(TestCase):
+    def test_yields_every_id_in_pages(self):
+        table = build_in_memory_table(25)
+        repo = dynamodb.TicketRepository(table)
+
+        pages = list(repo.iter_ticket_ids(page_size=10))
+
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), [f"user-{i}" for i in range(25)])
+
+    def test_empty_table(self):
+        repo = dynamodb.TicketRepository(build_in_memory_table(0))
+
+        self.assertEqual(list(repo.iter_ticket_ids()), [])
+
+    def test_aws_sdk_raises_client_error(self):
+        mocked_dyndb = build_mocked_dyndb()
+        mocked_dyndb.scan = Mock(side_effect=client_error)
+        repo = dynamodb.TicketRepository(mocked_dyndb)
+
+        with self.assertRaises(ticket_repository.Error):
+            list(repo.iter_ticket_ids())
+
+
+def user_tickets(i: int) -> list[ticket.Cuponazo]:
+    return [ticket.Cuponazo(f"{i:05d}", f"{j:03d}") for j in range(i % 3 + 1)]
+
+
+def build_in_memory_table(
+    users: int, max_batch_processed: int = None
+) -> fake_table.InMemoryTable:
+    table = fake_table.InMemoryTable(table_name)
+    for i in range(users):
+        table.put_item(
             Item={
-                "Id": ticket_id,
+                "Id": f"user-{i}",
                 "Tickets": json.dumps(
-                    [
-                        {
-                            "number": ticket_number,
-                            "serie": ticket_serie,
-                        },
-                        {
-                            "number": self.new_ticket_number,
-                            "serie": self.new_ticket_serie,
-                        },
-                    ]
+                    [{"number": t.number, "serie": t.serie} for t in user_tickets(i)]
                 ),
             }
         )
+    table.max_batch_processed = max_batch_processed
+    table.calls.clear()
+    return table
 
 
 def build_mocked_dyndb(
     get_item_returns: dict = None,
     get_item_raises: Exception = None,
     put_item_raises: Exception = None,
+    update_item_raises: Exception = None,
 ) -> Mock | dynamodb.DynDBTableWrapper:
     mocked_dyndb = Mock()
     mocked_dyndb.name = table_name
@@ -152,4 +577,51 @@ def build_mocked_dyndb(
     else:
         mocked_dyndb.put_item = Mock()
 
+    if update_item_raises is not None:
+        mocked_dyndb.update_item = Mock(side_effect=update_item_raises)
+    else:
+        mocked_dyndb.update_item = Mock()
+
     return mocked_dyndb
+
+
+class Test_GetTable(TestCase):
+    def setUp(self) -> None:
+        self.addCleanup(dynamodb._tables.clear)
+
+    @patch("boto3.resource")
+    def test_creates_the_resource_once(self, mocked_resource):
+        table = dynamodb.get_table(table_name, region_name="eu-west-1")
+
+        self.assertIs(dynamodb.get_table(table_name, region_name="eu-west-1"), table)
+        self.assertIsNot(dynamodb.get_table("other"), table)
+        self.assertEqual(mocked_resource.call_count, 2)
+        mocked_resource.return_value.Table.assert_any_call(table_name)
+
+    @patch("boto3.resource")
+    def test_max_attempts(self, mocked_resource):
+        dynamodb.get_table(table_name, max_attempts=1)
+
+        config = mocked_resource.call_args.kwargs["config"]
+        self.assertEqual(config.retries, {"max_attempts": 1, "mode": "standard"})
+        self.assertEqual(config.max_pool_connections, 10)
+
+    def test_botocore_is_not_imported_with_the_module(self):
+        modules = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; import cuponazo.infrastructure.ticket_repository.dynamodb; print('botocore' in sys.modules)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(modules.stdout.strip(), "False")
+
+    def test_client_errors_are_caught_once_botocore_is_imported(self):
+        dyndb = build_mocked_dyndb(get_item_raises=client_error)
+
+        with self.assertRaises(ticket_repository.Error):
+            dynamodb.TicketRepository(dyndb).get_tickets_by_id(ticket_id)
@@ -1,10 +1,23 @@
+import asyncio
+import datetime
 import http
+import http.server
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 import unittest.mock
 import urllib.error
+from concurrent import futures
 
 from cuponazo.domain import ticket
 from cuponazo.domain import results_fetcher
+from cuponazo.domain import results_history
+from cuponazo.infrastructure import async_results_fetcher
 from cuponazo.infrastructure import results_fetcher as infra
 
 JUEGOSONCE_URL = "https://juegosonce.local/result.xml"
@@ -79,6 +92,591 @@ class Test_ResultFetcher_FetchCuponazo(unittest.TestCase):
         mocked_http.assert_called_once_with(JUEGOSONCE_URL)
 
 
+class Test_ResultFetcher_FetchAll(unittest.TestCase):
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_correct_response(self, mocked_urlopen):
+        populate_mocked_urlopen(
+            mocked_urlopen,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text=load_fixture("correct_response"),
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+        result = fetcher.fetch_all()
+
+        self.assertEqual(
+            result,
+            {
+                "cuponazo": [ticket.Cuponazo("75727", "024")],
+                "cupon_diario": [ticket.CuponDiario("99475", "021")],
+            },
+        )
+        self.assertIs(type(result["cupon_diario"][0]), ticket.CuponDiario)
+        mocked_urlopen.assert_called_once_with(JUEGOSONCE_URL)
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_response_without_cuponazo(self, mocked_urlopen):
+        populate_mocked_urlopen(
+            mocked_urlopen,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text=load_fixture("response_without_cuponazo"),
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+        result = fetcher.fetch_all()
+
+        self.assertEqual(
+            result,
+            {"cuponazo": [], "cupon_diario": [ticket.CuponDiario("99475", "021")]},
+        )
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_fetch_cupon_diario(self, mocked_urlopen):
+        populate_mocked_urlopen(
+            mocked_urlopen,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text=load_fixture("correct_response"),
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+
+        self.assertEqual(
+            fetcher.fetch_cupon_diario(), [ticket.CuponDiario("99475", "021")]
+        )
+
+
+class Test_ResultFetcher_Import(unittest.TestCase):
+    def test_heavy_modules_are_not_imported_with_the_module(self):
+        modules = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; import cuponazo.infrastructure.results_fetcher; print(sorted({'xmltodict', 'urllib.request', 'xml.etree.ElementTree'} & set(sys.modules)))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(modules.stdout.strip(), "[]")
+
+
+class Test_ResultFetcher_FetchDraws(unittest.TestCase):
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_correct_response(self, mocked_urlopen):
+        populate_mocked_urlopen(
+            mocked_urlopen,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text=load_fixture("correct_response"),
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+        draws = fetcher.fetch_draws()
+
+        self.assertEqual(
+            draws,
+            [
+                results_history.Draw(
+                    "cupon_diario",
+                    datetime.date(2023, 9, 7),
+                    [ticket.CuponDiario("99475", "021")],
+                ),
+                results_history.Draw(
+                    "cuponazo",
+                    datetime.date(2023, 9, 8),
+                    [ticket.Cuponazo("75727", "024")],
+                ),
+            ],
+        )
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_invalid_date(self, mocked_urlopen):
+        populate_mocked_urlopen(
+            mocked_urlopen,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text="<items><item><tipo>Cuponazo</tipo><fecha>Viernes, 31/02/2023</fecha><numero>12345</numero><serie>321</serie></item></items>",
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+
+        with self.assertRaises(results_fetcher.Error):
+            fetcher.fetch_draws()
+
+
+class Test_ResultFetcher_IterCuponazo(unittest.TestCase):
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_correct_response(self, mocked_urlopen):
+        populate_mocked_urlopen(
+            mocked_urlopen,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text=load_fixture("correct_response"),
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+        result = list(fetcher.iter_cuponazo())
+
+        self.assertEqual(result, [ticket.Cuponazo("75727", "024")])
+        mocked_urlopen.assert_called_once_with(JUEGOSONCE_URL)
+        mocked_urlopen.return_value.close.assert_called_once()
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_response_without_cuponazo(self, mocked_http):
+        populate_mocked_urlopen(
+            mocked_http,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text=load_fixture("response_without_cuponazo"),
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+
+        self.assertEqual(list(fetcher.iter_cuponazo()), [])
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_many_items(self, mocked_http):
+        items = "".join(
+            f"<item><tipo><![CDATA[{tipo}]]></tipo><numero>{i:05d}</numero><serie>{i % 1000:03d}</serie></item>"
+            for i in range(5000)
+            for tipo in ["Cup&oacute;n Diario", "Cuponazo"]
+        )
+        populate_mocked_urlopen(
+            mocked_http,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text=f"<items>{items}</items>",
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+        result = list(fetcher.iter_cuponazo())
+
+        self.assertEqual(
+            result,
+            [ticket.Cuponazo(f"{i:05d}", f"{i % 1000:03d}") for i in range(5000)],
+        )
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_remote_returns_non_OK_response(self, mocked_http):
+        populate_mocked_urlopen(
+            mocked_http,
+            resp_status_code=http.HTTPStatus.NOT_FOUND,
+        )
+
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+
+        with self.assertRaises(results_fetcher.Error):
+            list(fetcher.iter_cuponazo())
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_response_payload_is_invalid_xml(self, mocked_http):
+        populate_mocked_urlopen(
+            mocked_http,
+            resp_status_code=http.HTTPStatus.OK,
+            resp_text="asad.</",
+        )
+        fetcher = infra.ResultsFetcher(JUEGOSONCE_URL)
+
+        with self.assertRaises(results_fetcher.Error):
+            list(fetcher.iter_cuponazo())
+        mocked_http.return_value.close.assert_called_once()
+
+
+class JuegosonceServer(http.server.ThreadingHTTPServer):
+    """Local stand-in of juegosonce, serving `body` with the `etag`/`last_modified` validators and answering
+    conditional requests with a 304 when they match. It answers the first `failures` requests with a 503 and
+    waits `delay` seconds before answering. The paths in `responses` are answered with their status and headers,
+    without body."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), JuegosonceHandler)
+        self.body = b""
+        self.etag = None
+        self.last_modified = None
+        self.failures = 0
+        self.delay = 0
+        self.responses = {}
+        self.requests = []
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients going away in the middle of a response are expected in some tests
+        pass
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/result.xml"
+
+
+class JuegosonceHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.server.requests.append(dict(self.headers))
+        time.sleep(self.server.delay)
+
+        if self.path in self.server.responses:
+            status, headers = self.server.responses[self.path]
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        if self.path != "/result.xml":
+            self.send_response(http.HTTPStatus.NOT_FOUND)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_response(http.HTTPStatus.SERVICE_UNAVAILABLE)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if (
+            self.server.etag is not None
+            and self.headers.get("If-None-Match") == self.server.etag
+        ) or (
+            self.server.last_modified is not None
+            and self.headers.get("If-Modified-Since") == self.server.last_modified
+        ):
+            self.send_response(http.HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return
+
+        self.send_response(http.HTTPStatus.OK)
+        if self.server.etag is not None:
+            self.send_header("ETag", self.server.etag)
+        if self.server.last_modified is not None:
+            self.send_header("Last-Modified", self.server.last_modified)
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Test_ResultFetcher_ConditionalFetch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = JuegosonceServer()
+        self.server.body = load_fixture("correct_response").encode()
+        self.server.etag = '"v1"'
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        self.clock = FakeClock()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fresh_results_are_not_requested_again(self):
+        fetcher = infra.ResultsFetcher(self.server.url, max_age=60, clock=self.clock)
+
+        first = fetcher.fetch_cuponazo()
+        self.clock.now += 59
+        second = fetcher.fetch_cuponazo()
+
+        self.assertEqual(first, [ticket.Cuponazo("75727", "024")])
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stale_results_are_revalidated(self):
+        fetcher = infra.ResultsFetcher(self.server.url, max_age=60, clock=self.clock)
+
+        first = fetcher.fetch_cuponazo()
+        self.clock.now += 60
+        second = fetcher.fetch_cuponazo()
+        third = fetcher.fetch_cuponazo()
+
+        self.assertEqual(second, first)
+        self.assertEqual(third, first)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn("If-None-Match", self.server.requests[0])
+        self.assertEqual(self.server.requests[1]["If-None-Match"], '"v1"')
+
+    def test_changed_results_are_parsed_again(self):
+        fetcher = infra.ResultsFetcher(self.server.url)
+
+        first = fetcher.fetch_cuponazo()
+        self.server.body = load_fixture("response_without_cuponazo").encode()
+        self.server.etag = '"v2"'
+        second = fetcher.fetch_cuponazo()
+
+        self.assertEqual(first, [ticket.Cuponazo("75727", "024")])
+        self.assertEqual(second, [])
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_revalidates_with_last_modified(self):
+        self.server.etag = None
+        self.server.last_modified = "Fri, 08 Sep 2023 21:00:00 GMT"
+        fetcher = infra.ResultsFetcher(self.server.url)
+
+        first = fetcher.fetch_cuponazo()
+        second = fetcher.fetch_cuponazo()
+
+        self.assertEqual(second, first)
+        self.assertEqual(
+            self.server.requests[1]["If-Modified-Since"], self.server.last_modified
+        )
+
+    def test_results_are_cached_on_disk(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_path = os.path.join(tmp_dir, "results.json")
+            fetcher = infra.ResultsFetcher(
+                self.server.url, max_age=60, cache_path=cache_path, clock=self.clock
+            )
+            first = fetcher.fetch_cuponazo()
+
+            other_fetcher = infra.ResultsFetcher(
+                self.server.url, max_age=60, cache_path=cache_path, clock=self.clock
+            )
+            second = other_fetcher.fetch_cuponazo()
+            self.clock.now += 60
+            third = other_fetcher.fetch_cuponazo()
+
+        self.assertEqual(second, first)
+        self.assertEqual(third, first)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1]["If-None-Match"], '"v1"')
+
+    def test_broken_disk_cache_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_path = os.path.join(tmp_dir, "results.json")
+            with open(cache_path, "w") as f:
+                f.write("{not json")
+            fetcher = infra.ResultsFetcher(
+                self.server.url, max_age=60, cache_path=cache_path, clock=self.clock
+            )
+
+            result = fetcher.fetch_cuponazo()
+
+        self.assertEqual(result, [ticket.Cuponazo("75727", "024")])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_successful_response_without_results(self):
+        self.server.responses = {"/result.xml": (http.HTTPStatus.NO_CONTENT, {})}
+        fetcher = infra.ResultsFetcher(self.server.url)
+
+        with self.assertRaisesRegex(results_fetcher.Error, r"\(204\)"):
+            fetcher.fetch_cuponazo()
+
+    def test_concurrent_requests_dont_wait_for_each_other(self):
+        self.server.delay = 0.3
+        fetcher = infra.ResultsFetcher(self.server.url)
+
+        start = time.perf_counter()
+        with futures.ThreadPoolExecutor(2) as executor:
+            results = list(executor.map(lambda _: fetcher.fetch_cuponazo(), range(2)))
+
+        self.assertLess(time.perf_counter() - start, 0.55)
+        self.assertEqual(results, [[ticket.Cuponazo("75727", "024")]] * 2)
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class Test_AsyncResultFetcher_FetchCuponazo(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.server = JuegosonceServer()
+        self.server.body = load_fixture("correct_response").encode()
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def start_raw_server(self, response: bytes) -> str:
+        """Starts a server answering every request with `response` and closing the connection, returning its
+        URL.
+        """
+
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(response)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        return f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/result.xml"
+
+    async def test_remote_returns_correct_response(self):
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url
+        ) as fetcher:
+            result = await fetcher.fetch_cuponazo()
+
+        self.assertEqual(result, [ticket.Cuponazo("75727", "024")])
+
+    async def test_fresh_results_are_not_requested_again(self):
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url, max_age=60
+        ) as fetcher:
+            for _ in range(3):
+                result = await fetcher.fetch_cuponazo()
+
+        self.assertEqual(result, [ticket.Cuponazo("75727", "024")])
+        self.assertEqual(len(self.server.requests), 1)
+
+    async def test_retries_server_errors(self):
+        self.server.failures = 2
+
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url, retries=2, backoff=0.01
+        ) as fetcher:
+            result = await fetcher.fetch_cuponazo()
+
+        self.assertEqual(result, [ticket.Cuponazo("75727", "024")])
+        self.assertEqual(len(self.server.requests), 3)
+
+    async def test_gives_up_after_retries(self):
+        self.server.failures = 3
+
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url, retries=2, backoff=0.01
+        ) as fetcher:
+            with self.assertRaises(results_fetcher.Error):
+                await fetcher.fetch_cuponazo()
+
+        self.assertEqual(len(self.server.requests), 3)
+
+    async def test_timeout(self):
+        self.server.delay = 0.2
+
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url, timeout=0.05, retries=0
+        ) as fetcher:
+            with self.assertRaises(results_fetcher.Error):
+                await fetcher.fetch_cuponazo()
+
+    async def test_does_not_retry_client_errors(self):
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url.replace("result.xml", "unknown.xml"),
+            retries=2,
+            backoff=0.01,
+        ) as fetcher:
+            with self.assertRaises(results_fetcher.Error):
+                await fetcher.fetch_cuponazo()
+
+        self.assertEqual(len(self.server.requests), 1)
+
+    async def test_newtork_connection_fails(self):
+        self.server.server_close()
+
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url, retries=1, backoff=0.01
+        ) as fetcher:
+            with self.assertRaises(results_fetcher.Error):
+                await fetcher.fetch_cuponazo()
+
+    async def test_sends_the_port_in_the_host_header(self):
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url
+        ) as fetcher:
+            await fetcher.fetch_cuponazo()
+
+        self.assertEqual(
+            self.server.requests[0]["Host"],
+            f"127.0.0.1:{self.server.server_address[1]}",
+        )
+
+    async def test_follows_redirections(self):
+        self.server.responses = {
+            "/moved.xml": (301, {"Location": "old.xml", "Content-Length": "0"}),
+            "/old.xml": (307, {"Location": self.server.url, "Content-Length": "0"}),
+        }
+
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url.replace("result.xml", "moved.xml")
+        ) as fetcher:
+            result = await fetcher.fetch_cuponazo()
+
+        self.assertEqual(result, [ticket.Cuponazo("75727", "024")])
+        self.assertEqual(len(self.server.requests), 3)
+
+    async def test_redirection_loop(self):
+        self.server.responses = {
+            "/loop.xml": (302, {"Location": "/loop.xml", "Content-Length": "0"}),
+        }
+
+        async with async_results_fetcher.AsyncResultsFetcher(
+            self.server.url.replace("result.xml", "loop.xml"), backoff=0.01
+        ) as fetcher:
+            with self.assertRaisesRegex(results_fetcher.Error, "redirect"):
+                await fetcher.fetch_cuponazo()
+
+        # It isn't retried
+        self.assertLessEqual(len(self.server.requests), 11)
+
+    async def test_responses_without_body(self):
+        # Neither has a Content-Length, the connection is kept open after them
+        self.server.responses = {"/empty.xml": (204, {}), "/same.xml": (304, {})}
+
+        for path, status in [("empty.xml", 204), ("same.xml", 304)]:
+            async with async_results_fetcher.AsyncResultsFetcher(
+                self.server.url.replace("result.xml", path), retries=0
+            ) as fetcher:
+                with self.assertRaisesRegex(results_fetcher.Error, str(status)):
+                    await fetcher.fetch_cuponazo()
+
+    async def test_invalid_status_line(self):
+        url = await self.start_raw_server(b"HTTP/1.1 OK\r\nContent-Length: 0\r\n\r\n")
+
+        async with async_results_fetcher.AsyncResultsFetcher(url, retries=0) as fetcher:
+            with self.assertRaisesRegex(results_fetcher.Error, "HTTP/1.1 OK"):
+                await fetcher.fetch_cuponazo()
+
+    async def test_invalid_chunk_size(self):
+        url = await self.start_raw_server(
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n<items/>\r\n0\r\n\r\n"
+        )
+
+        async with async_results_fetcher.AsyncResultsFetcher(url, retries=0) as fetcher:
+            with self.assertRaisesRegex(results_fetcher.Error, "IncompleteRead"):
+                await fetcher.fetch_cuponazo()
+
+    async def test_invalid_content_length(self):
+        # The length is ignored, the body is read until the connection is closed
+        body = self.server.body
+        url = await self.start_raw_server(
+            b"HTTP/1.1 200 OK\r\nContent-Length: many\r\n\r\n" + body
+        )
+
+        async with async_results_fetcher.AsyncResultsFetcher(url, retries=0) as fetcher:
+            result = await fetcher.fetch_cuponazo()
+
+        self.assertEqual(result, [ticket.Cuponazo("75727", "024")])
+
+    async def test_truncated_body(self):
+        body = self.server.body
+        url = await self.start_raw_server(
+            b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % (len(body) + 10) + body
+        )
+
+        async with async_results_fetcher.AsyncResultsFetcher(url, retries=0) as fetcher:
+            with self.assertRaisesRegex(results_fetcher.Error, "IncompleteRead"):
+                await fetcher.fetch_cuponazo()
+
+    async def test_gather_cuponazo(self):
+        fetchers = [
+            async_results_fetcher.AsyncResultsFetcher(self.server.url) for _ in range(3)
+        ]
+
+        results = await async_results_fetcher.gather_cuponazo(*fetchers)
+
+        self.assertEqual(results, [[ticket.Cuponazo("75727", "024")]] * 3)
+        self.assertEqual(len(self.server.requests), 3)
+
+
 def load_fixture(case: str) -> str:
     with open(f"test/unit/testdata/juegosonce_remote_{case}.xml") as f:
         return f.read()
@@ -92,8 +690,11 @@ def populate_mocked_urlopen(
 ) -> unittest.mock.Mock:
     if err is None:
         http_response = unittest.mock.Mock(name="http_response")
-        http_response.read.return_value = bytes(resp_text, encoding="utf8")
+        http_response.read.side_effect = io.BytesIO(
+            bytes(resp_text, encoding="utf8")
+        ).read
         http_response.code = resp_status_code.value
+        http_response.headers = {}
         mocked_urlopen.return_value = http_response
     else:
         mocked_urlopen.side_effect = err
@@ -1,7 +1,27 @@
+import array
+import pickle
 from unittest import TestCase
 
 from cuponazo.application import ticket_checker
 from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+
+
+def reference_level(result: ticket.Cuponazo, t: ticket.Cuponazo) -> int:
+    """Prize level of `t` against `result` computed on the number strings, like the checker did before encoding
+    the tickets as integers: the serie only counts with the 5 numbers, otherwise it's the longest run of equal
+    digits from the start (prefix) or from the end (suffix) of both numbers.
+    """
+    if t.number == result.number:
+        return 6 if t.serie == result.serie else 5
+
+    def coincidences(a: str, b: str) -> int:
+        return next(i for i, (x, y) in enumerate(zip(a, b)) if x != y)
+
+    return max(
+        coincidences(result.number, t.number),
+        coincidences(result.number[::-1], t.number[::-1]),
+    )
 
 
 class Test_CuponazoTicket(TestCase):
@@ -44,6 +64,38 @@ class Test_CuponazoTicket(TestCase):
             ticket.Cuponazo("12345", "123") != ticket.Cuponazo("54321", "321")
         )
 
+    def test_eq_tickets_of_different_lotteries(self):
+        self.assertNotEqual(
+            ticket.Cuponazo("12345", "123"), ticket.CuponDiario("12345", "123")
+        )
+        self.assertEqual(
+            ticket.CuponDiario("12345", "123"), ticket.CuponDiario("12345", "123")
+        )
+
+    def test_hash_equal_tickets(self):
+        tickets = {ticket.Cuponazo("12345", "123"), ticket.Cuponazo("12345", "123")}
+
+        self.assertEqual(tickets, {ticket.Cuponazo("12345", "123")})
+
+    def test_code(self):
+        t = ticket.Cuponazo("01234", "056")
+
+        self.assertEqual(t.code, 1234056)
+        self.assertEqual(ticket.Cuponazo.from_code(t.code), t)
+        self.assertEqual(ticket.Cuponazo.from_code(t.code).number, "01234")
+        self.assertEqual(ticket.Cuponazo.from_code(t.code).serie, "056")
+
+    def test_from_trusted(self):
+        self.assertEqual(
+            ticket.Cuponazo.from_trusted("01234", "056"),
+            ticket.Cuponazo("01234", "056"),
+        )
+
+    def test_pickle(self):
+        t = ticket.Cuponazo("01234", "056")
+
+        self.assertEqual(pickle.loads(pickle.dumps(t)), t)
+
 
 class Test_TicketChecker(TestCase):
     def test_check_ticket(self):
@@ -119,3 +171,245 @@ class Test_TicketChecker(TestCase):
                 case["expected"],
                 msg=f"failed at case '{case['case_name']}'",
             )
+
+    def test_check_tickets_matches_reference(self):
+        for result in [
+            ticket.Cuponazo("12345", "321"),
+            ticket.Cuponazo("00000", "000"),
+            ticket.Cuponazo("99099", "999"),
+        ]:
+            # Every ticket number sharing digits with the result, besides a sample of all the numbers
+            tickets = [
+                ticket.Cuponazo(f"{n:05d}", serie)
+                for n in range(0, 100000, 7)
+                for serie in [result.serie, "500"]
+            ]
+            tickets += [
+                ticket.Cuponazo(
+                    result.number[:i] + digit + result.number[i + 1 :], serie
+                )
+                for i in range(ticket.Cuponazo.number_length)
+                for digit in "0123456789"
+                for serie in [result.serie, "500"]
+            ]
+            expected = [reference_level(result, t) for t in tickets]
+
+            # Without and with the prize table
+            for table_threshold in [len(tickets) + 1, 0]:
+                checker = ticket_checker.TicketChecker(
+                    result=result, table_threshold=table_threshold
+                )
+
+                self.assertEqual(
+                    list(checker.check_tickets(tickets)),
+                    expected,
+                    msg=f"failed for {result} with table_threshold {table_threshold}",
+                )
+                self.assertEqual(
+                    [checker.check_ticket(t) for t in tickets],
+                    expected,
+                    msg=f"failed for {result}",
+                )
+
+    def test_prize_table_matches_check_tickets(self):
+        numbers = array.array("L", range(100000))
+        series = array.array("H", [999] * len(numbers))
+
+        for result in [
+            ticket.Cuponazo("12345", "321"),
+            ticket.Cuponazo("00000", "000"),
+        ]:
+            checker = ticket_checker.TicketChecker(
+                result=result, table_threshold=len(numbers) + 1
+            )
+
+            table = checker.prize_table
+
+            self.assertIs(table, checker.prize_table)
+            self.assertEqual(
+                list(table),
+                list(checker.check_encoded_tickets(numbers, series)),
+                msg=f"failed at result '{result.number}'",
+            )
+
+    def test_shared_prize_table(self):
+        result = ticket.Cuponazo("12345", "321")
+        checker = ticket_checker.TicketChecker(result=result)
+        shm = checker.share_prize_table()
+        try:
+            shared_checker = ticket_checker.TicketChecker(
+                result=result, prize_table=shm.buf, table_threshold=0
+            )
+
+            levels = shared_checker.check_tickets(
+                [result, ticket.Cuponazo("02345", "000")]
+            )
+
+            self.assertEqual(list(levels), [6, 4])
+            del shared_checker
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_check_tickets_generator(self):
+        result = ticket.Cuponazo("12345", "321")
+        tickets = [
+            result,
+            ticket.Cuponazo("12345", "000"),
+            ticket.Cuponazo("99999", "000"),
+        ]
+
+        for table_threshold in [len(tickets) + 1, 0]:
+            checker = ticket_checker.TicketChecker(
+                result=result, table_threshold=table_threshold
+            )
+
+            levels = checker.check_tickets(t for t in tickets)
+
+            self.assertEqual(list(levels), [6, 5, 0])
+
+        multi_checker = ticket_checker.MultiResultChecker([result])
+        best, prizes = multi_checker.check_tickets(t for t in tickets)
+        self.assertEqual(list(best), [6, 5, 0])
+        self.assertEqual(prizes, [{6: 1, 5: 1}])
+
+    def test_check_tickets_empty(self):
+        checker = ticket_checker.TicketChecker(result=ticket.Cuponazo("12345", "321"))
+
+        self.assertEqual(list(checker.check_tickets([])), [])
+
+    def test_count_prizes(self):
+        checker = ticket_checker.TicketChecker(result=ticket.Cuponazo("12345", "321"))
+        tickets = (
+            [ticket.Cuponazo("12345", "321")] * 3
+            + [ticket.Cuponazo("12345", "000")] * 2
+            + [ticket.Cuponazo("99999", "999")] * 4
+            + [ticket.Cuponazo("12399", "000")]
+        )
+
+        self.assertEqual(checker.count_prizes(tickets), {3: 1, 5: 2, 6: 3})
+        self.assertEqual(checker.count_prizes([]), {})
+
+    def test_checkers_by_lottery(self):
+        checkers = ticket_checker.checkers_by_lottery(
+            {
+                "cuponazo": [ticket.Cuponazo("12345", "321")],
+                "cupon_diario": [
+                    ticket.CuponDiario("12345", "321"),
+                    ticket.CuponDiario("54321", "123"),
+                ],
+            }
+        )
+
+        self.assertEqual(len(checkers["cuponazo"]), 1)
+        self.assertEqual(
+            [
+                c.check_ticket(ticket.CuponDiario("54321", "123"))
+                for c in checkers["cupon_diario"]
+            ],
+            [0, 6],
+        )
+        with self.assertRaises(TypeError):
+            checkers["cuponazo"][0].check_ticket(ticket.CuponDiario("12345", "321"))
+
+    def test_rejects_tickets_of_other_lotteries(self):
+        checker = ticket_checker.TicketChecker(ticket.Cuponazo("12345", "321"))
+        tickets = [ticket.CuponDiario("12345", "321")]
+
+        with self.assertRaises(TypeError):
+            checker.check_ticket(tickets[0])
+        with self.assertRaises(TypeError):
+            checker.check_tickets(tickets)
+        with self.assertRaises(TypeError):
+            checker.check_tickets(ticket_batch.TicketBatch.from_tickets(tickets))
+        with self.assertRaises(TypeError):
+            checker.count_prizes(tickets)
+        with self.assertRaises(TypeError):
+            ticket_checker.MultiResultChecker([checker.result]).check_tickets(tickets)
+        with self.assertRaises(TypeError):
+            ticket_checker.MultiResultChecker([checker.result, tickets[0]])
+
+
+class Test_MultiResultChecker(TestCase):
+    def test_same_levels_than_a_checker_per_result(self):
+        results = [
+            ticket.Cuponazo("12345", "321"),
+            ticket.Cuponazo("12345", "999"),
+            ticket.Cuponazo("54321", "123"),
+            ticket.Cuponazo("12399", "000"),
+        ]
+        checker = ticket_checker.MultiResultChecker(results)
+        tickets = (
+            [
+                ticket.Cuponazo(f"{i * 7919 % 100000:05d}", f"{i % 1000:03d}")
+                for i in range(5000)
+            ]
+            + results
+            + [ticket.Cuponazo("12345", "000")]
+        )
+
+        best, prizes = checker.check_tickets(tickets)
+
+        levels = [[reference_level(r, t) for r in results] for t in tickets]
+        self.assertEqual(list(best), [max(t_levels) for t_levels in levels])
+        self.assertEqual(
+            prizes,
+            [
+                {
+                    level: count
+                    for level in range(1, 7)
+                    if (count := sum(t_levels[r] == level for t_levels in levels))
+                }
+                for r in range(len(results))
+            ],
+        )
+        self.assertEqual(checker.check_ticket(results[1]), [5, 6, 0, 3])
+
+    def test_count_prizes_same_as_check_tickets(self):
+        results = [ticket.Cuponazo("12345", "321"), ticket.Cuponazo("54321", "000")]
+        checker = ticket_checker.MultiResultChecker(results)
+        distinct = [
+            ticket.Cuponazo(f"{i * 7919 % 100000:05d}", f"{i % 1000:03d}")
+            for i in range(1000)
+        ] + results
+        tickets = [t for i, t in enumerate(distinct) for _ in range(i % 4 + 1)]
+
+        self.assertEqual(
+            checker.count_prizes(tickets), checker.check_tickets(tickets)[1]
+        )
+
+    def test_without_results(self):
+        checker = ticket_checker.MultiResultChecker([])
+
+        best, prizes = checker.check_tickets([ticket.Cuponazo("12345", "321")])
+
+        self.assertEqual((list(best), prizes), ([0], []))
+
+    def test_shared_profile_table(self):
+        results = [ticket.Cuponazo("12345", "321"), ticket.Cuponazo("54321", "000")]
+        checker = ticket_checker.MultiResultChecker(results)
+        tickets = [
+            ticket.Cuponazo(f"{i * 7919 % 100000:05d}", f"{i % 1000:03d}")
+            for i in range(1000)
+        ] + results
+        shm = checker.share_profile_table()
+        try:
+            shared_checker = ticket_checker.MultiResultChecker(
+                results, profile_table=shm.buf, profiles=checker.profiles
+            )
+
+            self.assertEqual(
+                shared_checker.check_tickets(tickets), checker.check_tickets(tickets)
+            )
+            del shared_checker
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_profile_table_without_profiles(self):
+        checker = ticket_checker.MultiResultChecker([ticket.Cuponazo("12345", "321")])
+
+        with self.assertRaises(ValueError):
+            ticket_checker.MultiResultChecker(
+                checker.results, profile_table=checker.profile_table.tobytes()
+            )
@@ -0,0 +1,204 @@
+import http
+import socket
+import unittest.mock
+from unittest import TestCase
+
+from botocore.exceptions import ClientError
+
+from benchmark import fake_table
+from cuponazo.application import ticket_checker
+from cuponazo.domain import metrics, ticket
+from cuponazo.infrastructure import metrics as infra
+from cuponazo.infrastructure import results_fetcher
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+from juegosonce import JUEGOSONCE_URL, load_fixture, populate_mocked_urlopen
+
+
+class Test_Registry(TestCase):
+    def test_export_prometheus(self):
+        registry = infra.Registry(buckets=(0.1, 1))
+        registry.increment("requests_total", operation="get")
+        registry.increment("requests_total", 2, operation="get")
+        registry.increment("requests_total", operation='p"ut')
+        registry.observe("latency_seconds", 0.05)
+        registry.observe("latency_seconds", 0.1)
+        registry.observe("latency_seconds", 3)
+
+        self.assertEqual(
+            registry.export_prometheus(),
+            "\n".join(
+                [
+                    "# TYPE requests_total counter",
+                    'requests_total{operation="get"} 3',
+                    'requests_total{operation="p\\"ut"} 1',
+                    "# TYPE latency_seconds histogram",
+                    'latency_seconds_bucket{le="0.1"} 2',
+                    'latency_seconds_bucket{le="1"} 2',
+                    'latency_seconds_bucket{le="+Inf"} 3',
+                    "latency_seconds_sum 3.15",
+                    "latency_seconds_count 3",
+                    "",
+                ]
+            ),
+        )
+        self.assertEqual(registry.get_counter("requests_total", operation="get"), 3)
+        self.assertEqual(registry.get_histogram("latency_seconds"), (3, 3.15))
+
+    def test_time(self):
+        registry = infra.Registry()
+
+        with registry.time("block_seconds", name="test"):
+            pass
+
+        count, total = registry.get_histogram("block_seconds", name="test")
+        self.assertEqual(count, 1)
+        self.assertLess(total, 1)
+
+
+class Test_StatsdRecorder(TestCase):
+    def test_sends_every_measurement(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(5)
+        recorder = infra.StatsdRecorder(*server.getsockname())
+        self.addCleanup(recorder.close)
+
+        recorder.increment("items_total", 3, table="t")
+        recorder.observe("latency_seconds", 0.25)
+        recorder.observe("size", 10)
+
+        self.assertEqual(
+            [server.recv(1024) for _ in range(3)],
+            [
+                b"cuponazo.items_total:3|c|#table:t",
+                b"cuponazo.latency:250|ms",
+                b"cuponazo.size:10|h",
+            ],
+        )
+
+
+class Test_Instrumentation(TestCase):
+    def setUp(self) -> None:
+        self.registry = infra.Registry()
+        previous = metrics.set_recorder(self.registry)
+        self.addCleanup(metrics.set_recorder, previous)
+
+    def test_default_recorder_discards_everything(self):
+        recorder = metrics.Recorder()
+
+        recorder.increment("something")
+        with recorder.time("something_seconds"):
+            pass
+
+    def test_dynamodb_requests(self):
+        table = dynamodb.DynDBTableWrapper(fake_table.InMemoryTable("tickets"))
+        repo = dynamodb.TicketRepository(table)
+
+        repo.add_ticket_to_id("user", ticket.Cuponazo("12345", "321"))
+        repo.get_tickets_by_id("user")
+        repo.get_tickets_by_id("unknown")
+
+        labels = {"table": "tickets"}
+        self.assertEqual(
+            self.registry.get_histogram(
+                "dynamodb_request_seconds", operation="get_item", **labels
+            )[0],
+            2,
+        )
+        self.assertEqual(
+            self.registry.get_histogram(
+                "dynamodb_request_seconds", operation="update_item", **labels
+            )[0],
+            1,
+        )
+        self.assertEqual(
+            self.registry.get_counter(
+                "dynamodb_items_total", operation="get_item", **labels
+            ),
+            1,
+        )
+
+    def test_dynamodb_request_sizes(self):
+        table = dynamodb.DynDBTableWrapper(fake_table.InMemoryTable("tickets"))
+        item = {"Id": "user", "TicketsBin": b"\0" * 100}
+        size = dynamodb.attribute_size(item)
+
+        table.put_item(Item=item)
+        table.get_item(Key={"Id": "user"})
+
+        self.assertGreater(size, 100)
+        for name, operation, minimum, maximum in [
+            ("dynamodb_request_bytes_total", "put_item", size, size + 20),
+            ("dynamodb_response_bytes_total", "put_item", 0, 0),
+            ("dynamodb_request_bytes_total", "get_item", 1, 20),
+            ("dynamodb_response_bytes_total", "get_item", size, size + 20),
+        ]:
+            value = self.registry.get_counter(
+                name, operation=operation, table="tickets"
+            )
+            self.assertGreaterEqual(value, minimum, (name, operation))
+            self.assertLessEqual(value, maximum, (name, operation))
+
+    def test_dynamodb_errors(self):
+        dyndb_table = unittest.mock.Mock()
+        dyndb_table.name = "tickets"
+        dyndb_table.get_item.side_effect = ClientError(
+            operation_name="GetItem",
+            error_response={"Error": {"Code": "Throttled", "Message": "slow down"}},
+        )
+        table = dynamodb.DynDBTableWrapper(dyndb_table)
+
+        with self.assertRaises(ClientError):
+            table.get_item(Key={"Id": "user"})
+
+        self.assertEqual(
+            self.registry.get_counter(
+                "dynamodb_errors_total",
+                operation="get_item",
+                table="tickets",
+                code="Throttled",
+            ),
+            1,
+        )
+
+    @unittest.mock.patch("urllib.request.urlopen")
+    def test_results_fetcher(self, mocked_urlopen):
+        body = load_fixture("correct_response")
+        populate_mocked_urlopen(
+            mocked_urlopen, resp_status_code=http.HTTPStatus.OK, resp_text=body
+        )
+        fetcher = results_fetcher.ResultsFetcher(JUEGOSONCE_URL, max_age=60)
+
+        fetcher.fetch_cuponazo()
+        fetcher.fetch_cuponazo()
+
+        self.assertEqual(self.registry.get_histogram("results_fetch_seconds")[0], 1)
+        self.assertEqual(self.registry.get_histogram("results_parse_seconds")[0], 1)
+        self.assertEqual(
+            self.registry.get_counter("results_bytes_total"), len(body.encode())
+        )
+        self.assertEqual(self.registry.get_counter("results_items_total"), 2)
+        self.assertEqual(
+            self.registry.get_counter("results_cache_total", result="fresh"), 1
+        )
+
+    def test_ticket_checker(self):
+        checker = ticket_checker.TicketChecker(
+            ticket.Cuponazo("12345", "321"), table_threshold=10
+        )
+        tickets = [ticket.Cuponazo(f"{i:05d}", "000") for i in range(12)]
+
+        checker.check_tickets(tickets)
+        checker.check_tickets(tickets[:5])
+
+        self.assertEqual(
+            self.registry.get_counter("checker_tickets_total", method="table"), 12
+        )
+        self.assertEqual(
+            self.registry.get_counter("checker_tickets_total", method="scalar"), 5
+        )
+        self.assertEqual(
+            self.registry.get_histogram("checker_seconds", method="table")[0], 1
+        )
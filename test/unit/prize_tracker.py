@@ -0,0 +1,165 @@
+from concurrent import futures
+from unittest import TestCase
+
+from benchmark import fake_table
+from cuponazo.application import draw_runner, prize_tracker
+from cuponazo.domain import ticket
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+results = [ticket.Cuponazo("12345", "321"), ticket.Cuponazo("54321", "123")]
+
+
+class CountingRepository(dynamodb.TicketRepository):
+    def __init__(self) -> None:
+        super().__init__(fake_table.InMemoryTable())
+        self.loads = 0
+
+    def get_ticket_batch_by_id(self, ticket_id):
+        self.loads += 1
+        return super().get_ticket_batch_by_id(ticket_id)
+
+
+class LaggingRepository(CountingRepository):
+    """Reads don't see the tickets added last yet, like eventually consistent reads right after a write."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.pending = []
+
+    def add_ticket_to_id(self, ticket_id, t):
+        for pending_id, pending_ticket in self.pending:
+            super().add_ticket_to_id(pending_id, pending_ticket)
+        self.pending = [(ticket_id, t)]
+
+
+class Test_PrizeTracker(TestCase):
+    def setUp(self) -> None:
+        self.repo = CountingRepository()
+        self.repo.add_tickets_to_id(
+            "user", [ticket.Cuponazo("12345", "000"), ticket.Cuponazo("00001", "000")]
+        )
+        self.tracker = prize_tracker.PrizeTracker(self.repo, results)
+
+    def test_first_use_checks_all_tickets(self):
+        summary = self.tracker.get_summary("user")
+
+        self.assertEqual(summary, draw_runner.PrizeSummary("user", 2, {1: 1, 5: 1}))
+        self.assertEqual(self.repo.loads, 1)
+
+    def test_added_tickets_are_merged_without_reloading(self):
+        self.tracker.get_summary("user")
+
+        levels = self.tracker.add_ticket("user", ticket.Cuponazo("12345", "321"))
+        more_levels = self.tracker.add_tickets(
+            "user", [ticket.Cuponazo("54300", "000"), ticket.Cuponazo("99999", "999")]
+        )
+
+        self.assertEqual(levels, [6, 0])
+        self.assertEqual(more_levels, [[0, 3], [0, 0]])
+        self.assertEqual(
+            self.tracker.get_summary("user"),
+            draw_runner.PrizeSummary("user", 5, {1: 1, 3: 1, 5: 1, 6: 1}),
+        )
+        self.assertEqual(self.repo.loads, 1)
+        self.assertEqual(len(self.repo.get_tickets_by_id("user")), 5)
+
+    def test_add_to_unknown_id_loads_once(self):
+        self.tracker.add_ticket("user", ticket.Cuponazo("12345", "321"))
+        self.tracker.add_ticket("user", ticket.Cuponazo("12345", "321"))
+
+        self.assertEqual(
+            self.tracker.get_summary("user"),
+            draw_runner.PrizeSummary("user", 4, {1: 1, 5: 1, 6: 2}),
+        )
+        self.assertEqual(self.repo.loads, 1)
+
+    def test_seeded_summaries_are_not_reloaded(self):
+        self.tracker.publish_results(
+            results, [draw_runner.PrizeSummary("user", 2, {1: 2, 5: 1})]
+        )
+
+        self.tracker.add_ticket("user", ticket.Cuponazo("00000", "000"))
+
+        self.assertEqual(
+            self.tracker.get_summary("user"),
+            draw_runner.PrizeSummary("user", 3, {1: 2, 5: 1}),
+        )
+        self.assertEqual(self.repo.loads, 0)
+
+    def test_publishing_results_drops_summaries(self):
+        self.tracker.get_summary("user")
+
+        self.tracker.publish_results([ticket.Cuponazo("00001", "000")])
+
+        self.assertEqual(
+            self.tracker.get_summary("user"),
+            draw_runner.PrizeSummary("user", 2, {6: 1}),
+        )
+        self.assertEqual(self.tracker.results, [ticket.Cuponazo("00001", "000")])
+
+    def test_concurrent_adds(self):
+        tickets = [ticket.Cuponazo(f"{i:05d}", "321") for i in range(12300, 12400)]
+
+        with futures.ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda t: self.tracker.add_ticket("user", t), tickets))
+
+        expected = prize_tracker.PrizeTracker(self.repo, results).get_summary("user")
+        self.assertEqual(self.tracker.get_summary("user"), expected)
+        self.assertEqual(expected.tickets, 102)
+
+    def test_concurrent_adds_to_ids_sharing_a_lock(self):
+        tracker = prize_tracker.PrizeTracker(self.repo, results, lock_stripes=1)
+        ids = [f"user{i}" for i in range(4)]
+
+        with futures.ThreadPoolExecutor(8) as executor:
+            list(
+                executor.map(
+                    lambda i: tracker.add_ticket(
+                        ids[i % 4], ticket.Cuponazo("12345", "000")
+                    ),
+                    range(40),
+                )
+            )
+
+        for ticket_id in ids:
+            self.assertEqual(tracker.get_summary(ticket_id).tickets, 10)
+            self.assertEqual(tracker.get_summary(ticket_id).prizes, {5: 10})
+
+    def test_tickets_of_another_lottery_are_not_stored(self):
+        # The repository takes them, but they can't be checked against the results
+        repo = dynamodb.TicketRepository(
+            fake_table.InMemoryTable(), ticket_type=ticket.CuponDiario
+        )
+        tracker = prize_tracker.PrizeTracker(repo, results)
+
+        with self.assertRaises(TypeError):
+            tracker.add_tickets(
+                "user",
+                [
+                    ticket.CuponDiario("12345", "321"),
+                    ticket.CuponDiario("12345", "000"),
+                ],
+            )
+
+        self.assertEqual(repo.get_tickets_by_id("user"), [])
+
+    def test_added_tickets_are_counted_without_reading_them_back(self):
+        repo = LaggingRepository()
+        tracker = prize_tracker.PrizeTracker(repo, results)
+
+        tracker.add_ticket("new", ticket.Cuponazo("12345", "321"))
+
+        self.assertEqual(repo.get_tickets_by_id("new"), [])
+        self.assertEqual(
+            tracker.get_summary("new"), draw_runner.PrizeSummary("new", 1, {6: 1})
+        )
+
+    def test_loaded_tickets_of_another_lottery(self):
+        repo = dynamodb.TicketRepository(
+            fake_table.InMemoryTable(), ticket_type=ticket.CuponDiario
+        )
+        repo.add_ticket_to_id("user", ticket.CuponDiario("12345", "321"))
+        tracker = prize_tracker.PrizeTracker(repo, results)
+
+        with self.assertRaises(TypeError):
+            tracker.get_summary("user")
@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from unittest import TestCase
+
+from botocore.exceptions import ClientError
+
+from benchmark import fake_table
+from cuponazo.domain import metrics, ticket, ticket_repository
+from cuponazo.infrastructure import metrics as infra
+from cuponazo.infrastructure.ticket_repository import dynamodb, resilient
+
+table_name = "some_table"
+ticket_id = "2023-02-11"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Test_AdaptiveRateLimiter(TestCase):
+    def test_waits_for_tokens(self):
+        clock = FakeClock()
+        limiter = resilient.AdaptiveRateLimiter(
+            rate=10, burst=2, clock=clock, sleep=clock.sleep
+        )
+
+        for _ in range(4):
+            limiter.acquire()
+
+        self.assertEqual(clock.sleeps, [0.1, 0.1])
+        self.assertFalse(limiter.try_acquire())
+        clock.now += 0.1
+        self.assertTrue(limiter.try_acquire())
+
+    def test_adapts_rate_to_throttling(self):
+        clock = FakeClock()
+        limiter = resilient.AdaptiveRateLimiter(
+            rate=100, min_rate=30, max_rate=101, clock=clock, sleep=clock.sleep
+        )
+
+        limiter.throttled()
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 50)
+
+        clock.now += 1
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 30)
+
+        for _ in range(30):
+            limiter.succeeded()
+        self.assertAlmostEqual(limiter.rate, 31, delta=0.05)
+
+        for _ in range(10_000):
+            limiter.succeeded()
+        self.assertEqual(limiter.rate, 101)
+
+
+class Test_ResilientTable(TestCase):
+    def setUp(self) -> None:
+        self.registry = infra.Registry()
+        previous = metrics.set_recorder(self.registry)
+        self.addCleanup(metrics.set_recorder, previous)
+
+        self.throttling = fake_table.ThrottlingTable(
+            fake_table.InMemoryTable(table_name)
+        )
+        self.sleeps = []
+        self.table = resilient.ResilientTable(
+            self.throttling,
+            max_retries=3,
+            backoff=0.1,
+            sleep=self.sleeps.append,
+            rng=random.Random(42),
+        )
+        self.repo = dynamodb.TicketRepository(self.table)
+
+    def test_retries_throttled_requests(self):
+        tickets = [ticket.Cuponazo("12345", "321"), ticket.Cuponazo("00001", "000")]
+        self.throttling.throttle_next(3)
+
+        self.repo.add_tickets_to_id(ticket_id, tickets)
+
+        self.assertEqual(self.repo.get_tickets_by_id(ticket_id), tickets)
+        self.assertEqual(self.throttling.throttled, {"update_item": 3})
+        self.assertEqual(len(self.sleeps), 3)
+        for attempt, seconds in enumerate(self.sleeps):
+            self.assertLessEqual(seconds, 0.1 * 2**attempt)
+        self.assertEqual(
+            self.registry.get_counter(
+                "dynamodb_retries_total",
+                operation="update_item",
+                table=table_name,
+                code="ProvisionedThroughputExceededException",
+            ),
+            3,
+        )
+        self.assertEqual(
+            self.registry.get_counter(
+                "dynamodb_throttles_total", operation="update_item", table=table_name
+            ),
+            3,
+        )
+
+    def test_raises_once_retries_are_exhausted(self):
+        self.throttling.throttle_next(4)
+
+        with self.assertRaises(ticket_repository.Error):
+            self.repo.add_ticket_to_id(ticket_id, ticket.Cuponazo("12345", "321"))
+
+        self.assertEqual(len(self.sleeps), 3)
+
+    def test_does_not_retry_other_errors(self):
+        with self.assertRaises(ClientError):
+            self.table.put_item(
+                Item={"Id": ticket_id},
+                ConditionExpression="attribute_exists(Id)",
+            )
+
+        self.assertEqual(self.sleeps, [])
+
+    def test_only_retries_reads_after_server_errors(self):
+        throttling = fake_table.ThrottlingTable(
+            fake_table.InMemoryTable(table_name), code="InternalServerError"
+        )
+        table = resilient.ResilientTable(throttling, sleep=self.sleeps.append)
+        repo = dynamodb.TicketRepository(table)
+
+        # The append could have been applied, retrying it could store the tickets twice
+        throttling.throttle_next(1)
+        with self.assertRaises(ticket_repository.Error):
+            repo.add_ticket_to_id(ticket_id, ticket.Cuponazo("12345", "321"))
+        self.assertEqual(self.sleeps, [])
+
+        throttling.throttle_next(1)
+        self.assertEqual(repo.get_tickets_by_id(ticket_id), [])
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_throttling_slows_down_requests(self):
+        clock = FakeClock()
+        limiter = resilient.AdaptiveRateLimiter(
+            rate=100, burst=1, clock=clock, sleep=clock.sleep
+        )
+        table = resilient.ResilientTable(
+            fake_table.ThrottlingTable(
+                fake_table.InMemoryTable(table_name), throttle_rate=0.3
+            ),
+            rate_limiter=limiter,
+            max_retries=10,
+            sleep=clock.sleep,
+        )
+
+        for i in range(100):
+            table.put_item(Item={"Id": str(i)})
+
+        self.assertLess(limiter.rate, 100)
+        self.assertEqual(len(table.table.table.items), 100)
+
+    def test_hedged_reads(self):
+        slow = threading.Event()
+        slow.set()
+
+        def latency(operation: str) -> float:
+            # Only the first read is slow
+            if slow.is_set():
+                slow.clear()
+                return 0.5
+            return 0
+
+        self.throttling.table.put_item(Item={"Id": ticket_id, "TicketList": []})
+        self.throttling.latency = latency
+        table = resilient.ResilientTable(self.throttling, hedge_after=0.01)
+        self.addCleanup(table.close)
+
+        start = time.perf_counter()
+        response = table.get_item(Key={"Id": ticket_id})
+
+        self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual(response["Item"]["Id"], ticket_id)
+        for name in ["dynamodb_hedges_total", "dynamodb_hedge_wins_total"]:
+            self.assertEqual(
+                self.registry.get_counter(name, operation="get_item", table=table_name),
+                1,
+            )
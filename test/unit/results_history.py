@@ -0,0 +1,155 @@
+import datetime
+import os
+import random
+import tempfile
+from unittest import TestCase
+
+from cuponazo.application import ticket_checker
+from cuponazo.domain import results_history, ticket
+from cuponazo.infrastructure.results_history import sqlite
+
+
+def build_draws(days: int) -> list[results_history.Draw]:
+    rnd = random.Random(days)
+    start = datetime.date(2023, 1, 1)
+    draws = []
+    for day in range(days):
+        date = start + datetime.timedelta(days=day)
+        draws.append(
+            results_history.Draw(
+                "cupon_diario",
+                date,
+                [
+                    ticket.CuponDiario(f"{rnd.randrange(100000):05d}", "001")
+                    for _ in range(2)
+                ],
+            )
+        )
+        if date.weekday() == 4:
+            draws.append(
+                results_history.Draw(
+                    "cuponazo",
+                    date,
+                    [ticket.Cuponazo(f"{rnd.randrange(100000):05d}", "321")],
+                )
+            )
+    return draws
+
+
+class Test_ResultsHistory(TestCase):
+    def test_get_draws_by_range_and_lottery(self):
+        history = sqlite.ResultsHistory(":memory:")
+        draws = build_draws(60)
+        history.add_draws(reversed(draws))
+        start, end = datetime.date(2023, 1, 10), datetime.date(2023, 1, 31)
+
+        self.assertEqual(
+            history.get_draws(start, end),
+            [d for d in draws if start <= d.date <= end],
+        )
+        self.assertEqual(
+            history.get_draws(start, end, "cuponazo"),
+            [
+                d
+                for d in draws
+                if start <= d.date <= end and d.lottery_type == "cuponazo"
+            ],
+        )
+        self.assertEqual(
+            history.get_draw(datetime.date(2023, 1, 6), "cuponazo"),
+            draws[6],
+        )
+        self.assertIs(type(draws[6].results[0]), ticket.Cuponazo)
+        self.assertIsNone(history.get_draw(datetime.date(2023, 1, 5), "cuponazo"))
+
+    def test_add_draws_replaces_the_same_draw(self):
+        history = sqlite.ResultsHistory(":memory:")
+        date = datetime.date(2023, 9, 8)
+        history.add_draws(
+            [results_history.Draw("cuponazo", date, [ticket.Cuponazo("00000", "000")])]
+        )
+
+        draw = results_history.Draw("cuponazo", date, [ticket.Cuponazo("75727", "024")])
+        history.add_draws([draw])
+
+        self.assertEqual(history.get_draws(date, date), [draw])
+
+    def test_persists_between_connections(self):
+        draws = build_draws(10)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.db")
+            with sqlite.ResultsHistory(path) as history:
+                history.add_draws(draws)
+
+            with sqlite.ResultsHistory(path) as history:
+                self.assertEqual(
+                    history.get_draws(draws[0].date, draws[-1].date), draws
+                )
+
+    def test_closed_history_raises_error(self):
+        history = sqlite.ResultsHistory(":memory:")
+        history.close()
+
+        with self.assertRaises(results_history.Error):
+            history.get_draws(datetime.date(2023, 1, 1), datetime.date(2023, 1, 1))
+
+
+class Test_HistoryChecker_CheckTicket(TestCase):
+    def test_same_levels_than_a_checker_per_result(self):
+        draws = build_draws(400)
+        checker = ticket_checker.HistoryChecker(draws)
+        rnd = random.Random(0)
+        tickets = [
+            ticket.Cuponazo(f"{rnd.randrange(100000):05d}", "321") for _ in range(300)
+        ] + [r for d in draws[:20] for r in d.results]
+
+        checkers = [
+            (d, r, ticket_checker.TicketChecker(r)) for d in draws for r in d.results
+        ]
+
+        for t, prizes in zip(tickets, checker.check_tickets(tickets)):
+            expected = [
+                (d, r, level)
+                for d, r, c in checkers
+                if type(r) is type(t) and (level := c.check_ticket(t))
+            ]
+            self.assertEqual(prizes, expected)
+
+    def test_only_checks_draws_of_the_same_lottery(self):
+        date = datetime.date(2023, 9, 8)
+        cuponazo = results_history.Draw(
+            "cuponazo", date, [ticket.Cuponazo("12345", "321")]
+        )
+        cupon_diario = results_history.Draw(
+            "cupon_diario", date, [ticket.CuponDiario("12345", "321")]
+        )
+        checker = ticket_checker.HistoryChecker([cupon_diario, cuponazo])
+
+        self.assertEqual(
+            checker.check_ticket(ticket.Cuponazo("12345", "321")),
+            [(cuponazo, cuponazo.results[0], 6)],
+        )
+        self.assertEqual(
+            checker.check_ticket(ticket.CuponDiario("12399", "000")),
+            [(cupon_diario, cupon_diario.results[0], 3)],
+        )
+        self.assertEqual(
+            ticket_checker.HistoryChecker([cuponazo]).check_ticket(
+                ticket.CuponDiario("12345", "321")
+            ),
+            [],
+        )
+
+    def test_from_history(self):
+        history = sqlite.ResultsHistory(":memory:")
+        draws = build_draws(30)
+        history.add_draws(draws)
+        draw = [d for d in draws if d.lottery_type == "cuponazo"][-1]
+        result = draw.results[0]
+
+        checker = ticket_checker.HistoryChecker.from_history(
+            history, draws[0].date, draws[-1].date, "cuponazo"
+        )
+
+        self.assertTrue(all(d.lottery_type == "cuponazo" for d in checker.draws))
+        self.assertEqual(checker.check_ticket(result)[-1], (draw, result, 6))
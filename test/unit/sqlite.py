@@ -0,0 +1,136 @@
+import os
+import tempfile
+from concurrent import futures
+from unittest import TestCase
+
+from cuponazo.application import draw_runner
+from cuponazo.domain import ticket, ticket_batch, ticket_repository
+from cuponazo.infrastructure.ticket_repository import sqlite
+
+
+def user_tickets(i: int) -> list[ticket.Cuponazo]:
+    return [ticket.Cuponazo(f"{i:05d}", f"{j:03d}") for j in range(i % 4)]
+
+
+class Test_TicketRepository_GetTicketsById(TestCase):
+    def test_returns_tickets_in_insertion_order(self):
+        repo = sqlite.TicketRepository(":memory:")
+        tickets = [ticket.Cuponazo("99999", "999"), ticket.Cuponazo("00000", "000")]
+        repo.add_ticket_to_id("user", tickets[0])
+        repo.add_ticket_to_id("other", tickets[1])
+        repo.add_ticket_to_id("user", tickets[1])
+
+        self.assertEqual(repo.get_tickets_by_id("user"), tickets)
+        self.assertEqual(
+            repo.get_ticket_batch_by_id("user"),
+            ticket_batch.TicketBatch.from_tickets(tickets),
+        )
+        self.assertEqual(repo.get_tickets_by_id("unknown"), [])
+
+    def test_persists_between_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tickets.db")
+            with sqlite.TicketRepository(path) as repo:
+                repo.add_ticket_to_id("user", ticket.Cuponazo("12345", "321"))
+
+            with sqlite.TicketRepository(path) as repo:
+                self.assertEqual(
+                    repo.get_tickets_by_id("user"), [ticket.Cuponazo("12345", "321")]
+                )
+
+    def test_closed_repository_raises_error(self):
+        repo = sqlite.TicketRepository(":memory:")
+        repo.close()
+
+        with self.assertRaises(ticket_repository.Error):
+            repo.get_tickets_by_id("user")
+        with self.assertRaises(ticket_repository.Error):
+            repo.add_ticket_to_id("user", ticket.Cuponazo("12345", "321"))
+
+
+class Test_TicketRepository_Bulk(TestCase):
+    def test_get_and_add_tickets_of_many_ids(self):
+        repo = sqlite.TicketRepository(":memory:", batch_size=7)
+        users = {f"user-{i}": user_tickets(i) for i in range(50)}
+        repo.add_tickets(users)
+
+        tickets = repo.get_tickets_by_ids(list(users) + ["unknown"])
+
+        self.assertEqual(
+            {ticket_id: batch.to_list() for ticket_id, batch in tickets.items()},
+            {**users, "unknown": []},
+        )
+
+    def test_iter_ticket_ids(self):
+        repo = sqlite.TicketRepository(":memory:")
+        repo.add_tickets({f"user-{i:03d}": user_tickets(i) for i in range(50)})
+
+        pages = list(repo.iter_ticket_ids(page_size=10))
+
+        self.assertTrue(all(len(page) <= 10 for page in pages))
+        self.assertEqual(
+            [ticket_id for page in pages for ticket_id in page],
+            [f"user-{i:03d}" for i in range(50) if i % 4],
+        )
+
+    def test_get_ids_by_ticket(self):
+        repo = sqlite.TicketRepository(":memory:")
+        repo.add_tickets({f"user-{i}": user_tickets(i) for i in range(50)})
+        repo.add_ticket_to_id("other", ticket.Cuponazo("00007", "999"))
+
+        self.assertEqual(
+            repo.get_ids_by_ticket(ticket.Cuponazo("00007", "002")), {"user-7"}
+        )
+        self.assertEqual(
+            repo.get_ids_by_ticket(ticket.Cuponazo("00007", "500"), serie=False),
+            {"user-7", "other"},
+        )
+        self.assertEqual(repo.get_ids_by_ticket(ticket.Cuponazo("00004", "000")), set())
+
+    def test_concurrent_writes(self):
+        repo = sqlite.TicketRepository(":memory:")
+
+        with futures.ThreadPoolExecutor(8) as executor:
+            list(
+                executor.map(
+                    lambda i: repo.add_ticket_to_id(
+                        f"user-{i % 10}", ticket.Cuponazo(f"{i:05d}", "000")
+                    ),
+                    range(200),
+                )
+            )
+
+        tickets = repo.get_tickets_by_ids(f"user-{i}" for i in range(10))
+        self.assertEqual(sum(len(batch) for batch in tickets.values()), 200)
+
+    def test_draw_runner(self):
+        repo = sqlite.TicketRepository(":memory:")
+        repo.add_tickets({f"user-{i}": user_tickets(i) for i in range(50)})
+        repo.add_ticket_to_id("user-1", ticket.Cuponazo("12345", "321"))
+
+        summaries = {
+            s.ticket_id: s
+            for s in draw_runner.DrawRunner(
+                repo, [ticket.Cuponazo("12345", "321")], workers=0
+            ).run()
+        }
+
+        self.assertEqual(len(summaries), 37)
+        self.assertEqual(summaries["user-1"].best, 6)
+
+    def test_draw_runner_with_other_lotteries(self):
+        repo = sqlite.TicketRepository(":memory:", ticket_type=ticket.CuponDiario)
+        repo.add_ticket_to_id("user-1", ticket.CuponDiario("12345", "321"))
+
+        self.assertEqual(
+            repo.get_tickets_by_id("user-1"), [ticket.CuponDiario("12345", "321")]
+        )
+        self.assertEqual(
+            [
+                s.best
+                for s in draw_runner.DrawRunner(
+                    repo, [ticket.CuponDiario("12345", "321")], workers=1
+                ).run()
+            ],
+            [6],
+        )
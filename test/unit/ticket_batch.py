@@ -0,0 +1,122 @@
+from unittest import TestCase
+
+from cuponazo.application import ticket_checker
+from cuponazo.domain import ticket
+from cuponazo.domain import ticket_batch
+
+tickets = [
+    ticket.Cuponazo("12345", "321"),
+    ticket.Cuponazo("00001", "000"),
+    ticket.Cuponazo("12345", "321"),
+    ticket.Cuponazo("99999", "999"),
+]
+
+
+class Test_TicketBatch(TestCase):
+    def test_from_tickets_and_to_list(self):
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        self.assertEqual(len(batch), len(tickets))
+        self.assertEqual(batch.to_list(), tickets)
+        self.assertEqual(list(batch), tickets)
+
+    def test_indexing_and_slicing(self):
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        self.assertEqual(batch[1], tickets[1])
+        self.assertEqual(batch[-1], tickets[-1])
+        self.assertEqual(
+            batch[1:3], ticket_batch.TicketBatch.from_tickets(tickets[1:3])
+        )
+
+    def test_contains(self):
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        self.assertIn(ticket.Cuponazo("99999", "999"), batch)
+        self.assertNotIn(ticket.Cuponazo("99999", "998"), batch)
+
+    def test_concatenation(self):
+        first = ticket_batch.TicketBatch.from_tickets(tickets[:2])
+        second = ticket_batch.TicketBatch.from_tickets(tickets[2:])
+
+        self.assertEqual((first + second).to_list(), tickets)
+        self.assertEqual(first.to_list(), tickets[:2])
+
+    def test_dedup(self):
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        self.assertEqual(
+            batch.dedup().to_list(),
+            [tickets[0], tickets[1], tickets[3]],
+        )
+
+    def test_counts(self):
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        distinct, counts = batch.counts()
+
+        self.assertEqual(distinct.to_list(), [tickets[0], tickets[1], tickets[3]])
+        self.assertEqual(list(counts), [2, 1, 1])
+
+    def test_keeps_the_ticket_class(self):
+        tickets = [
+            ticket.CuponDiario("12345", "321"),
+            ticket.CuponDiario("00001", "000"),
+        ]
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        self.assertIs(batch.ticket_type, ticket.CuponDiario)
+        self.assertEqual(batch.to_list(), tickets)
+        self.assertEqual(batch[0], tickets[0])
+        self.assertIn(tickets[1], batch)
+        self.assertNotIn(ticket.Cuponazo("12345", "321"), batch)
+        self.assertEqual((batch[:1] + batch[1:]).to_list(), tickets)
+        self.assertEqual(batch.dedup().to_list(), tickets)
+        self.assertEqual(
+            ticket_batch.TicketBatch.from_bytes(
+                batch.to_bytes(), ticket.CuponDiario
+            ).to_list(),
+            tickets,
+        )
+        self.assertNotEqual(batch, ticket_batch.TicketBatch(batch.codes))
+
+    def test_rejects_tickets_of_different_lotteries(self):
+        with self.assertRaises(TypeError):
+            ticket_batch.TicketBatch.from_tickets(
+                [ticket.Cuponazo("12345", "321"), ticket.CuponDiario("12345", "321")]
+            )
+        with self.assertRaises(TypeError):
+            ticket_batch.TicketBatch.from_tickets(tickets, ticket.CuponDiario)
+        with self.assertRaises(TypeError):
+            ticket_batch.TicketBatch.from_tickets(tickets) + ticket_batch.TicketBatch(
+                ticket_type=ticket.CuponDiario
+            )
+
+    def test_bytes_roundtrip(self):
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        data = batch.to_bytes()
+
+        self.assertEqual(len(data), 4 * len(tickets))
+        self.assertEqual(ticket_batch.TicketBatch.from_bytes(data), batch)
+        self.assertEqual(
+            ticket_batch.TicketBatch.from_bytes(memoryview(data)[4:8]),
+            batch[1:2],
+        )
+
+    def test_memoryview_does_not_copy(self):
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        view = batch.memoryview()
+
+        self.assertTrue(view.readonly)
+        self.assertEqual(view.nbytes, 4 * len(tickets))
+        self.assertEqual(view.tolist(), list(batch.codes))
+
+    def test_checker_accepts_batch(self):
+        checker = ticket_checker.TicketChecker(result=ticket.Cuponazo("12345", "321"))
+        batch = ticket_batch.TicketBatch.from_tickets(tickets)
+
+        self.assertEqual(
+            list(checker.check_tickets(batch)), list(checker.check_tickets(tickets))
+        )
@@ -0,0 +1,103 @@
+import random
+from unittest import TestCase
+
+from benchmark import fake_table
+from cuponazo.application import ticket_checker
+from cuponazo.domain import ticket, ticket_index
+from cuponazo.infrastructure.ticket_index import dynamodb as dynamodb_index
+from cuponazo.infrastructure.ticket_index import memory as memory_index
+from cuponazo.infrastructure.ticket_repository import dynamodb, indexed
+
+
+def random_tickets(rnd: random.Random, n: int) -> list[ticket.Cuponazo]:
+    # Few different numbers, so there are winners at every level
+    return [
+        ticket.Cuponazo(
+            "".join(rnd.choice("1234") for _ in range(5)), f"{rnd.randrange(3):03d}"
+        )
+        for _ in range(n)
+    ]
+
+
+class Test_WinnerKeys(TestCase):
+    def test_keys(self):
+        result = ticket.Cuponazo("12345", "321")
+
+        self.assertEqual(ticket_index.winner_keys(result, 2), ["p2:12", "s2:45"])
+        self.assertEqual(ticket_index.winner_keys(result, 5), ["n:12345"])
+        self.assertEqual(ticket_index.winner_keys(result, 6), ["c:12345321"])
+
+    def test_invalid_level(self):
+        for level in [0, 7]:
+            with self.assertRaises(ValueError):
+                ticket_index.winner_keys(ticket.Cuponazo("12345", "321"), level)
+
+
+class Test_IndexedTicketRepository_FindWinners(TestCase):
+    def assert_matches_brute_force(self, index: ticket_index.Interface) -> None:
+        rnd = random.Random(42)
+        repo = indexed.IndexedTicketRepository(
+            dynamodb.TicketRepository(fake_table.InMemoryTable()), index
+        )
+        for i in range(40):
+            repo.add_ticket_to_id(f"user-{i}", random_tickets(rnd, 1)[0])
+            repo.add_tickets_to_id(f"user-{i}", random_tickets(rnd, 2))
+        repo.add_tickets({f"user-{i}": random_tickets(rnd, 2) for i in range(40, 60)})
+
+        for result in random_tickets(rnd, 5) + [repo.get_tickets_by_id("user-0")[0]]:
+            checker = ticket_checker.TicketChecker(result)
+            for level in range(1, 7):
+                expected = {
+                    f"user-{i}"
+                    for i in range(60)
+                    if any(
+                        checker.check_ticket(t) >= level
+                        for t in repo.get_tickets_by_id(f"user-{i}")
+                    )
+                }
+
+                self.assertEqual(
+                    repo.find_winners(result, level),
+                    expected,
+                    msg=f"failed at result {result}, level {level}",
+                )
+
+    def test_in_memory_index(self):
+        self.assert_matches_brute_force(memory_index.TicketIndex())
+
+    def test_dynamodb_index(self):
+        table = fake_table.InMemoryTable()
+        self.assert_matches_brute_force(dynamodb_index.TicketIndex(table))
+        self.assertGreater(table.calls["query"], 0)
+
+    def test_dynamodb_index_retries_unprocessed_items(self):
+        table = fake_table.InMemoryTable(max_batch_processed=3)
+        index = dynamodb_index.TicketIndex(table, backoff=0)
+
+        index.add_tickets("user", [ticket.Cuponazo("12345", "321")])
+
+        self.assertEqual(
+            index.find_winners(ticket.Cuponazo("12345", "321"), 6), {"user"}
+        )
+        self.assertEqual(table.calls["batch_write_item"], 4)
+
+    def test_dynamodb_index_sharing_the_ticket_table(self):
+        table = fake_table.InMemoryTable()
+        repo = indexed.IndexedTicketRepository(
+            dynamodb.TicketRepository(table, shard_size=2),
+            dynamodb_index.TicketIndex(table),
+        )
+        tickets = {f"user-{i}": random_tickets(random.Random(i), 3) for i in range(5)}
+        repo.add_tickets(tickets)
+
+        self.assertEqual(
+            sorted(i for page in repo.iter_ticket_ids(page_size=7) for i in page),
+            sorted(tickets),
+        )
+        scanned = {
+            ticket_id: batch.to_list()
+            for page, _ in repo.repository.scan_tickets(page_size=7)
+            for ticket_id, batch in page.items()
+        }
+        self.assertEqual(scanned, tickets)
+        self.assertIn("user-0", repo.find_winners(tickets["user-0"][0], 6))
@@ -0,0 +1,170 @@
+import io
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmark import fake_table
+from cuponazo.domain import ticket, ticket_batch
+from cuponazo.infrastructure import ticket_snapshot
+from cuponazo.infrastructure.ticket_repository import dynamodb
+
+
+def build_repository(users: int) -> dynamodb.TicketRepository:
+    repo = dynamodb.TicketRepository(fake_table.InMemoryTable())
+    repo.add_tickets(
+        {
+            f"user-{i}": [
+                ticket.Cuponazo(f"{i * 31 % 100000:05d}", f"{j:03d}")
+                for j in range(i % 6)
+            ]
+            for i in range(users)
+        }
+    )
+    for i in range(0, users, 3):
+        repo.compact_tickets(f"user-{i}")
+    return repo
+
+
+def all_tickets(repo: dynamodb.TicketRepository) -> dict[str, list]:
+    return {
+        ticket_id: batch.to_list()
+        for ids in repo.iter_ticket_ids()
+        for ticket_id, batch in repo.get_tickets_by_ids(ids).items()
+    }
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FailingRepository(dynamodb.TicketRepository):
+    def __init__(self, table, fail_after: int) -> None:
+        super().__init__(table)
+        self.fail_after = fail_after
+        self.puts = 0
+
+    def put_tickets(self, tickets) -> None:
+        if self.puts == self.fail_after:
+            raise Interrupted()
+        self.puts += 1
+        super().put_tickets(tickets)
+
+
+class Test_Blocks(TestCase):
+    def test_round_trip(self):
+        tickets = {
+            "user": ticket_batch.TicketBatch.from_tickets(
+                [ticket.Cuponazo("12345", "321"), ticket.Cuponazo("00000", "999")]
+            ),
+            "ñandú": ticket_batch.TicketBatch([99999999]),
+            "empty": ticket_batch.TicketBatch(),
+        }
+        f = io.BytesIO()
+        size = ticket_snapshot.write_block(f, tickets)
+        ticket_snapshot.write_block(f, {"other": ticket_batch.TicketBatch([1])})
+        f.seek(0)
+
+        blocks = list(ticket_snapshot.read_blocks(f))
+
+        self.assertEqual(blocks[0], (tickets, size))
+        self.assertEqual(blocks[1][0], {"other": ticket_batch.TicketBatch([1])})
+
+    def test_truncated_or_unknown_blocks(self):
+        f = io.BytesIO()
+        ticket_snapshot.write_block(f, {"user": ticket_batch.TicketBatch([1, 2])})
+        data = f.getvalue()
+
+        for corrupted in [data[:-1], data[:5], b"XYZ" + data[3:]]:
+            with self.assertRaises(ticket_snapshot.Error):
+                list(ticket_snapshot.read_blocks(io.BytesIO(corrupted)))
+
+
+class Test_ExportImport(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_round_trip(self):
+        repo = build_repository(200)
+        reports = []
+
+        exported = ticket_snapshot.export_tickets(
+            repo, self.directory.name, segments=3, page_size=7, progress=reports.append
+        )
+        restored = dynamodb.TicketRepository(fake_table.InMemoryTable())
+        imported = ticket_snapshot.import_tickets(restored, self.directory.name)
+
+        expected = all_tickets(repo)
+        self.assertEqual(all_tickets(restored), expected)
+        self.assertEqual(exported.ids, 200)
+        self.assertEqual(exported.tickets, sum(map(len, expected.values())))
+        self.assertEqual((imported.ids, imported.tickets), (200, exported.tickets))
+        self.assertEqual(imported.bytes, exported.bytes)
+        self.assertGreaterEqual(len(reports), 200 / 7)
+        self.assertEqual(
+            len(os.listdir(self.directory.name)), 3 * 2 + 1
+        )  # segments, their checkpoints and the import checkpoint
+
+    def test_resumes_interrupted_export(self):
+        repo = build_repository(200)
+
+        def interrupt(progress):
+            if progress.ids >= 50:
+                raise Interrupted()
+
+        with self.assertRaises(Interrupted):
+            ticket_snapshot.export_tickets(
+                repo, self.directory.name, segments=2, page_size=10, progress=interrupt
+            )
+        with self.assertRaises(ticket_snapshot.Error):
+            ticket_snapshot.import_tickets(
+                dynamodb.TicketRepository(fake_table.InMemoryTable()),
+                self.directory.name,
+            )
+
+        resumed = ticket_snapshot.export_tickets(
+            repo, self.directory.name, segments=2, page_size=10
+        )
+        restored = dynamodb.TicketRepository(fake_table.InMemoryTable())
+        ticket_snapshot.import_tickets(restored, self.directory.name)
+
+        self.assertLess(resumed.ids, 200)
+        self.assertEqual(all_tickets(restored), all_tickets(repo))
+
+    def test_export_needs_the_same_segments_to_resume(self):
+        repo = build_repository(20)
+        ticket_snapshot.export_tickets(repo, self.directory.name, segments=2)
+
+        with self.assertRaises(ticket_snapshot.Error):
+            ticket_snapshot.export_tickets(repo, self.directory.name, segments=3)
+
+    def test_resumes_interrupted_import(self):
+        repo = build_repository(200)
+        ticket_snapshot.export_tickets(
+            repo, self.directory.name, segments=1, page_size=10
+        )
+        table = fake_table.InMemoryTable()
+
+        with self.assertRaises(Interrupted):
+            ticket_snapshot.import_tickets(
+                FailingRepository(table, fail_after=5), self.directory.name
+            )
+        resumed = FailingRepository(table, fail_after=-1)
+        ticket_snapshot.import_tickets(resumed, self.directory.name)
+
+        self.assertEqual(resumed.puts, 20 - 5)
+        self.assertEqual(
+            all_tickets(dynamodb.TicketRepository(table)), all_tickets(repo)
+        )
+
+
+class Test_TicketRepository_PutTickets(TestCase):
+    def test_retries_unprocessed_items(self):
+        table = fake_table.InMemoryTable(max_batch_processed=10)
+        repo = dynamodb.TicketRepository(table, backoff=0)
+        tickets = {f"user-{i}": ticket_batch.TicketBatch([i, i + 1]) for i in range(60)}
+
+        repo.put_tickets(tickets)
+
+        self.assertEqual(repo.get_tickets_by_ids(tickets), tickets)
+        self.assertGreater(table.calls["batch_write_item"], 3)